@@ -0,0 +1,143 @@
+# scripts/bill_index.py
+import os
+import re
+import threading
+
+
+class BillIndex:
+    """In-memory set of scraped bill IDs backed by a compact append-only index file.
+
+    Each line of the index file is ``session<TAB>number<TAB>kind`` where kind is
+    ``bill`` (raw record saved) or ``text`` (full text saved). The file is read
+    once at startup, so duplicate checks never touch the raw directory.
+    Pending lines are guarded by a lock: the listing thread saves while the
+    writer thread adds bills.
+    """
+
+    INDEX_FILENAME = "bill_index.tsv"
+
+    def __init__(self, data_dir, raw_dir=None, text_dir=None, store=None):
+        self.path = f"{data_dir}/{self.INDEX_FILENAME}"
+        self.raw_dir = raw_dir
+        self.text_dir = text_dir
+        self.store = store
+        self.bills = {}        # number -> set of sessions
+        self.with_text = {}    # number -> set of sessions
+        self._pending = []
+        self.lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            self._load()
+        else:
+            self.rebuild()
+
+    def _load(self):
+        """Load the index file into memory"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 3:
+                    continue
+                session, number, kind = parts
+                self._remember(session, number, kind)
+
+    def _remember(self, session, number, kind):
+        """Record an entry in memory, returning True if it is new"""
+        table = self.with_text if kind == 'text' else self.bills
+        sessions = table.setdefault(number, set())
+        if session in sessions:
+            return False
+        sessions.add(session)
+        if kind == 'text':
+            # A bill with text is also a known bill
+            self.bills.setdefault(number, set()).add(session)
+        return True
+
+    def rebuild(self):
+        """Rebuild the index once from the corpus store and the raw and text directories"""
+        self.bills = {}
+        self.with_text = {}
+        self._pending = []
+
+        if self.raw_dir and os.path.exists(self.raw_dir):
+            for filename in os.listdir(self.raw_dir):
+                # "194th_H_2212.json" -> ("194th", "H.2212")
+                match = re.match(r'(\w+?)_([HS][D_]?\d+)\.json$', filename)
+                if match:
+                    session, bill_num = match.groups()
+                    self._remember(session, bill_num.replace('_', '.'), 'bill')
+
+        if self.store is not None:
+            for record in self.store.iter_records():
+                session = record.get('metadata', {}).get('session', 'unknown_session')
+                if record.get('number'):
+                    self._remember(session, record['number'], 'bill')
+
+        if self.text_dir and os.path.exists(self.text_dir):
+            for filename in os.listdir(self.text_dir):
+                match = re.match(r'(\w+?)_([HS][D_]?\d+)\.txt$', filename)
+                if match:
+                    session, bill_num = match.groups()
+                    self._remember(session, bill_num.replace('_', '.'), 'text')
+
+        self.compact()
+
+    def has_bill(self, number, session=None):
+        """Check whether a bill has already been scraped"""
+        sessions = self.bills.get(number)
+        if not sessions:
+            return False
+        return session is None or session in sessions
+
+    def has_text(self, number, session=None):
+        """Check whether a bill already has its full text saved"""
+        sessions = self.with_text.get(number)
+        if not sessions:
+            return False
+        return session is None or session in sessions
+
+    def add_bill(self, number, session):
+        """Mark a bill as scraped"""
+        with self.lock:
+            if self._remember(session, number, 'bill'):
+                self._pending.append(f"{session}\t{number}\tbill\n")
+
+    def mark_text(self, number, session):
+        """Mark a bill as having its full text saved"""
+        with self.lock:
+            if self._remember(session, number, 'text'):
+                self._pending.append(f"{session}\t{number}\ttext\n")
+
+    def bill_ids(self):
+        """Return the set of all known bill numbers"""
+        with self.lock:
+            return set(self.bills)
+
+    def text_ids(self):
+        """Return the set of all bill numbers that have text"""
+        with self.lock:
+            return set(self.with_text)
+
+    def __len__(self):
+        return len(self.bills)
+
+    def save(self):
+        """Append pending entries to the index file"""
+        with self.lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(pending)
+
+    def compact(self):
+        """Rewrite the index file from memory, dropping any stale lines"""
+        tmp_path = f"{self.path}.tmp"
+        with self.lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for number, sessions in sorted(self.bills.items()):
+                    for session in sorted(sessions):
+                        kind = 'text' if session in self.with_text.get(number, ()) else 'bill'
+                        f.write(f"{session}\t{number}\t{kind}\n")
+            os.replace(tmp_path, self.path)
+            self._pending = []
@@ -0,0 +1,176 @@
+# scripts/bill_segmenter.py
+import argparse
+import json
+import os
+import re
+import time
+from itertools import islice
+from multiprocessing import Pool
+
+from corpus_reader import FEDERAL_DIR, MA_DATA_DIR, iter_corpus_texts
+
+# "SECTION 1." (MA), "Section 2A." and "SEC. 2." (federal) at the start of a line
+SECTION_PATTERN = re.compile(r'^[ \t]*(?:SECTION|Section|SEC\.)[ \t]+(\d+[A-Za-z]*)\.', re.MULTILINE)
+
+# "(a)", "(1)", "(A)", "(iv)" at the start of a line or right after a section heading
+SUBSECTION_PATTERN = re.compile(r'(?:^|(?<=\.)[ \t])[ \t]*\(([a-z]{1,4}|\d{1,3}|[A-Z]{1,3})\)', re.MULTILINE)
+
+ROMAN_PATTERN = re.compile(r'^(?=[ivxl]+$)l?x{0,3}(?:ix|iv|v?i{0,3})$')
+
+# Nesting depth of each subsection label style: (a) > (1) > (A) > (i)
+LEVEL_LETTER, LEVEL_NUMBER, LEVEL_UPPER, LEVEL_ROMAN = 1, 2, 3, 4
+
+
+def subsection_level(label, previous_letter):
+    """Nesting level for a subsection label; (i)/(v)/(x) are roman unless they continue a letter run"""
+    if label.isdigit():
+        return LEVEL_NUMBER
+    if label.isupper():
+        return LEVEL_UPPER
+    if ROMAN_PATTERN.match(label):
+        # "(i)" right after "(h)" is the letter i, otherwise a roman numeral
+        if len(label) == 1 and previous_letter and ord(label) == ord(previous_letter) + 1:
+            return LEVEL_LETTER
+        return LEVEL_ROMAN
+    return LEVEL_LETTER
+
+
+def segment_text(text):
+    """Split bill text into a section tree with character offsets
+
+    Returns a list of ``[label, start, end, children]`` nodes, where children
+    use the same shape. Text before the first section is left out.
+    """
+    sections = [(match.group(1), match.start()) for match in SECTION_PATTERN.finditer(text)]
+    tree = []
+    for i, (label, start) in enumerate(sections):
+        end = sections[i + 1][1] if i + 1 < len(sections) else len(text)
+        tree.append([label, start, end, segment_subsections(text, start, end)])
+    return tree
+
+
+def segment_subsections(text, start, end):
+    """Nest (a)/(1)/(A)/(i) markers found inside one section"""
+    root = []
+    stack = []              # (level, node)
+    previous_letter = None
+    for match in SUBSECTION_PATTERN.finditer(text, start, end):
+        label = match.group(1)
+        level = subsection_level(label, previous_letter)
+        if level == LEVEL_LETTER:
+            previous_letter = label
+        node = [label, match.start(1) - 1, end, []]
+
+        while stack and stack[-1][0] >= level:
+            stack.pop()[1][2] = node[1]
+        (stack[-1][1][3] if stack else root).append(node)
+        stack.append((level, node))
+    # The last open node at every level runs to the end of the section
+    return root
+
+
+def count_nodes(tree):
+    return sum(1 + count_nodes(node[3]) for node in tree)
+
+
+def segment_batch(batch):
+    """Worker: segment a batch of (doc_id, source, text) tuples"""
+    return [(doc_id, source, len(text), segment_text(text)) for doc_id, source, text in batch]
+
+
+def iter_batches(documents, batch_size):
+    iterator = iter(documents)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def segment_corpus(output_path, data_dir=MA_DATA_DIR, federal_dir=FEDERAL_DIR, sources=('ma', 'federal'),
+                   processes=None, batch_size=64):
+    """Stream the corpus through the segmenter and write a compact JSONL side index"""
+    documents = ((doc_id, source, text) for doc_id, source, text, _ in
+                 iter_corpus_texts(data_dir, federal_dir, sources))
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    start_time = time.monotonic()
+    count = 0
+    node_count = 0
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if processes == 1:
+            results = map(segment_batch, iter_batches(documents, batch_size))
+            pool = None
+        else:
+            pool = Pool(processes)
+            results = pool.imap(segment_batch, iter_batches(documents, batch_size))
+        try:
+            for batch in results:
+                for doc_id, source, length, tree in batch:
+                    f.write(json.dumps({'id': doc_id, 'source': source, 'length': length, 'tree': tree},
+                                       separators=(',', ':')) + '\n')
+                    count += 1
+                    node_count += count_nodes(tree)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    os.replace(tmp_path, output_path)
+
+    elapsed = max(time.monotonic() - start_time, 1e-9)
+    print(f"✂️  Segmented {count} documents into {node_count} sections/subsections "
+          f"in {elapsed:.1f}s ({count / elapsed:.0f} docs/s) -> {output_path}")
+    return count
+
+
+def load_section_index(path):
+    """Load the side index as {doc_id: tree}"""
+    index = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            index[entry['id']] = entry['tree']
+    return index
+
+
+def benchmark(data_dir=MA_DATA_DIR, processes=None, batch_size=64):
+    """Measure segmentation throughput (bills/sec) on the scraped MA set"""
+    documents = [(doc_id, source, text) for doc_id, source, text, _ in
+                 iter_corpus_texts(data_dir, sources=('ma',))]
+    if not documents:
+        print("❌ No scraped MA bill texts found")
+        return
+    total_chars = sum(len(text) for _, _, text in documents)
+
+    start_time = time.monotonic()
+    for batch in iter_batches(documents, batch_size):
+        segment_batch(batch)
+    single = time.monotonic() - start_time
+
+    start_time = time.monotonic()
+    with Pool(processes) as pool:
+        for _ in pool.imap(segment_batch, iter_batches(documents, batch_size)):
+            pass
+    parallel = time.monotonic() - start_time
+
+    print(f"📊 Segmenter benchmark on {len(documents)} MA bills ({total_chars / 1e6:.1f} M chars):")
+    print(f"   1 process:  {len(documents) / single:8.0f} bills/s ({total_chars / single / 1e6:.1f} M chars/s)")
+    print(f"   Pool({processes or os.cpu_count()}):    {len(documents) / parallel:8.0f} bills/s "
+          f"(includes pickling texts to workers)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Segment bill texts into a section/subsection side index")
+    parser.add_argument('--output', default="data/segments/sections.jsonl")
+    parser.add_argument('--sources', default='ma,federal')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--benchmark', action='store_true', help="Measure bills/sec on the scraped MA set")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(processes=args.processes, batch_size=args.batch_size)
+    else:
+        segment_corpus(args.output, sources=tuple(args.sources.split(',')),
+                       processes=args.processes, batch_size=args.batch_size)
@@ -0,0 +1,282 @@
+# scripts/catalog.py
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from corpus_reader import FEDERAL_DIR, MA_DATA_DIR, iter_federal_documents
+from corpus_store import CorpusStore
+from search_index import document_fields
+
+CATALOG_PATH = "data/catalog.sqlite"
+
+COLUMNS = ('doc_id', 'source', 'bill_number', 'session', 'state', 'type', 'year', 'title',
+           'text_source', 'text_length', 'text_hash', 'near_duplicate_of', 'location', 'scraped_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    bill_number TEXT,
+    session TEXT,
+    state TEXT,
+    type TEXT,
+    year INTEGER,
+    title TEXT,
+    text_source TEXT,
+    text_length INTEGER NOT NULL DEFAULT 0,
+    text_hash TEXT,
+    near_duplicate_of TEXT,
+    location TEXT,
+    scraped_at TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS documents_bill_number ON documents (bill_number);
+CREATE INDEX IF NOT EXISTS documents_session ON documents (session);
+CREATE INDEX IF NOT EXISTS documents_state ON documents (state);
+CREATE INDEX IF NOT EXISTS documents_type ON documents (type);
+CREATE INDEX IF NOT EXISTS documents_year ON documents (year);
+CREATE INDEX IF NOT EXISTS documents_text_source ON documents (text_source);
+CREATE INDEX IF NOT EXISTS documents_text_length ON documents (text_length);
+"""
+
+# Equality filters accepted by the query API (a list or tuple value means "any of")
+FILTER_COLUMNS = ('source', 'bill_number', 'session', 'state', 'type', 'year', 'text_source', 'near_duplicate_of')
+
+
+def ma_row(key, record, text_length=None):
+    """Catalog row for a scraped MA bill record"""
+    metadata = record.get('metadata') or {}
+    fields = document_fields(key, 'ma', record)
+    if text_length is None:
+        text_length = record.get('text_length')
+    if text_length is None:
+        text_length = len(record.get('full_text') or '')
+    return {'doc_id': key, 'source': 'ma', 'bill_number': record.get('number'), 'session': metadata.get('session'),
+            'state': fields['state'], 'type': fields['type'], 'year': fields['year'] or None,
+            'title': fields['title'], 'text_source': record.get('text_source'), 'text_length': int(text_length),
+            'text_hash': record.get('text_hash'), 'near_duplicate_of': record.get('near_duplicate_of'),
+            'location': None, 'scraped_at': metadata.get('scraped_at')}
+
+
+def federal_row(doc_id, record, location=None):
+    """Catalog row for a federal foundations record, e.g. ``billsum:110_hr37``"""
+    fields = document_fields(doc_id, 'federal', record)
+    return {'doc_id': doc_id, 'source': doc_id.split(':', 1)[0], 'bill_number': record.get('bill_id') or None,
+            'session': None, 'state': fields['state'], 'type': fields['type'], 'year': fields['year'] or None,
+            'title': fields['title'], 'text_source': None,
+            'text_length': len(record.get('text') or ''), 'text_hash': None, 'near_duplicate_of': None,
+            'location': location, 'scraped_at': None}
+
+
+class Catalog:
+    """Indexed SQLite catalog of every document's metadata (never its text)
+
+    Rows are upserted by ``doc_id`` into a buffer and written every
+    ``batch_size`` rows in a single transaction, so a crash loses at most
+    one uncommitted batch and never leaves half of one. The database runs in
+    WAL mode, so readers never block the scraper and the parallel federal
+    ingest workers can each hold their own writer connection.
+    """
+
+    def __init__(self, path=CATALOG_PATH, batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = {}
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def upsert(self, row):
+        """Add or replace a row by doc_id; commits a batch when the buffer is full"""
+        with self.lock:
+            self.buffer[row['doc_id']] = row
+            full = len(self.buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows in one transaction; returns the number written"""
+        with self.lock:
+            rows, self.buffer = list(self.buffer.values()), {}
+            if not rows:
+                return 0
+            now = time.time()
+            updates = ', '.join(f"{column} = excluded.{column}" for column in COLUMNS[1:])
+            with self.conn:
+                self.conn.executemany(
+                    f"INSERT INTO documents ({', '.join(COLUMNS)}, updated_at) "
+                    f"VALUES ({', '.join('?' * len(COLUMNS))}, ?) "
+                    f"ON CONFLICT(doc_id) DO UPDATE SET {updates}, updated_at = excluded.updated_at",
+                    [tuple(row.get(column) for column in COLUMNS) + (now,) for row in rows])
+        return len(rows)
+
+    def _where(self, doc_ids=None, min_length=None, max_length=None, **filters):
+        clauses = []
+        params = []
+        for column, value in filters.items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Unknown catalog filter: {column} (known: {', '.join(FILTER_COLUMNS)})")
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set, frozenset)):
+                clauses.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if min_length is not None:
+            clauses.append("text_length >= ?")
+            params.append(min_length)
+        if max_length is not None:
+            clauses.append("text_length <= ?")
+            params.append(max_length)
+        if doc_ids is not None:
+            # One JSON parameter instead of thousands of placeholders
+            clauses.append("doc_id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(doc_ids)))
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ''), params
+
+    def count(self, **filters):
+        """Number of documents matching the filters"""
+        self.flush()
+        where, params = self._where(**filters)
+        return self.conn.execute(f"SELECT COUNT(*) FROM documents{where}", params).fetchone()[0]
+
+    def group_counts(self, column, **filters):
+        """{value: document count} of one column over the matching documents"""
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot group by {column}")
+        self.flush()
+        where, params = self._where(**filters)
+        rows = self.conn.execute(f"SELECT {column}, COUNT(*) FROM documents{where} "
+                                 f"GROUP BY {column} ORDER BY COUNT(*) DESC", params)
+        return {value: count for value, count in rows}
+
+    def query(self, columns=COLUMNS, order_by='doc_id', limit=None, **filters):
+        """Stream matching rows as dicts"""
+        unknown = [column for column in columns if column not in COLUMNS]
+        if unknown or order_by.split()[0] not in COLUMNS:
+            raise ValueError(f"Unknown catalog columns: {', '.join(unknown) or order_by}")
+        self.flush()
+        where, params = self._where(**filters)
+        sql = f"SELECT {', '.join(columns)} FROM documents{where} ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for row in self.conn.execute(sql, params):
+            yield dict(row)
+
+    def __len__(self):
+        return self.count()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def catalog_ma_corpus(catalog, data_dir=MA_DATA_DIR):
+    """Upsert a row for every record in the MA corpus store; returns the number of records"""
+    corpus_dir = f"{data_dir}/corpus"
+    if not os.path.exists(f"{corpus_dir}/{CorpusStore.INDEX_FILENAME}"):
+        return 0
+    store = CorpusStore(corpus_dir)
+    count = 0
+    try:
+        for key, record in store.iter_records(with_keys=True):
+            catalog.upsert(ma_row(key, record))
+            count += 1
+    finally:
+        store.close()
+    catalog.flush()
+    return count
+
+
+def ensure_ma_catalogued(catalog, data_dir=MA_DATA_DIR):
+    """Catalog the MA corpus when the catalog has fewer MA rows than the store has records
+
+    Corpora scraped before the catalog existed, or migrated into the store,
+    have no rows yet; catalogue readers call this instead of silently
+    finding nothing. Returns the number of records catalogued (0 if none).
+    """
+    corpus_dir = f"{data_dir}/corpus"
+    if not os.path.exists(f"{corpus_dir}/{CorpusStore.INDEX_FILENAME}"):
+        return 0
+    store = CorpusStore(corpus_dir)
+    try:
+        records = len(store)
+    finally:
+        store.close()
+    catalogued = catalog.count(source='ma')
+    if catalogued >= records:
+        return 0
+    print(f"🗂️  Catalog has {catalogued} of {records} MA bills; cataloguing {corpus_dir}")
+    return catalog_ma_corpus(catalog, data_dir)
+
+
+def rebuild(path=CATALOG_PATH, data_dir=MA_DATA_DIR, federal_dir=FEDERAL_DIR, sources=('ma', 'federal')):
+    """Catalog every existing record (upserting, so it is safe to rerun)"""
+    catalog = Catalog(path, batch_size=5000)
+    start_time = time.monotonic()
+    count = 0
+    if 'ma' in sources:
+        count += catalog_ma_corpus(catalog, data_dir)
+    if 'federal' in sources:
+        for doc_id, record in iter_federal_documents(federal_dir):
+            if not record.get('text'):
+                continue  # framework documents and other records without text
+            catalog.upsert(federal_row(doc_id, record))
+            count += 1
+    catalog.flush()
+    elapsed = max(time.monotonic() - start_time, 1e-9)
+    print(f"🗂️  Catalogued {count} documents in {elapsed:.1f}s ({count / elapsed:.0f} docs/s); "
+          f"{len(catalog)} documents in {path}")
+    return catalog
+
+
+def parse_filters(items):
+    """CLI ``column=value`` filters; commas give alternatives, numbers stay numbers"""
+    filters = {}
+    for item in items:
+        column, value = item.split('=', 1)
+        values = [int(v) if v.isdigit() and column in ('year', 'min_length', 'max_length') else v
+                  for v in value.split(',')]
+        filters[column] = values[0] if len(values) == 1 else values
+    return filters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query or rebuild the document metadata catalog")
+    parser.add_argument('command', choices=['rebuild', 'count', 'query', 'summary'])
+    parser.add_argument('filters', nargs='*', metavar='COLUMN=VALUE',
+                        help=f"Filters on {', '.join(FILTER_COLUMNS)}, min_length or max_length")
+    parser.add_argument('--catalog', default=CATALOG_PATH)
+    parser.add_argument('--sources', default='ma,federal', help="Sources to rebuild from")
+    parser.add_argument('--group-by', default='text_source', help="Column counted by the summary command")
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_intermixed_args()
+
+    if args.command == 'rebuild':
+        rebuild(args.catalog, sources=tuple(args.sources.split(','))).close()
+        raise SystemExit(0)
+
+    catalog = Catalog(args.catalog)
+    filters = parse_filters(args.filters)
+    if args.command == 'count':
+        print(catalog.count(**filters))
+    elif args.command == 'summary':
+        counts = catalog.group_counts(args.group_by, **filters)
+        print(f"📊 {sum(counts.values())} documents by {args.group_by}:")
+        for value, count in counts.items():
+            print(f"   {value}: {count}")
+    else:
+        for row in catalog.query(limit=args.limit, **filters):
+            print(f"{row['doc_id']:<32} {row['text_source'] or '-':<14} {row['text_length']:>8}  "
+                  f"{row['year'] or '':<5} {(row['title'] or '')[:60]}")
+    catalog.close()
@@ -0,0 +1,156 @@
+# scripts/checkpoint.py
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class ScrapeCheckpoint:
+    """Crash-safe record of where a pipeline run is
+
+    Tracks the session being listed, the listing cursor (next search page),
+    bills listed but not yet saved (``pending``), bills a text worker has
+    picked up (``in_flight``) and failures. Every write goes to a temp file that is fsynced and then
+    renamed over the checkpoint, so a crash never leaves a torn file.
+    """
+
+    def __init__(self, path, start_page=1, end_page=1, session=None, min_save_interval=1.0):
+        self.path = path
+        self.min_save_interval = min_save_interval
+        self.lock = threading.Lock()
+        self._last_save = 0.0
+        self.state = {
+            'status': 'running',
+            'started_at': datetime.now().isoformat(),
+            'updated_at': None,
+            'session': session,
+            'start_page': start_page,
+            'end_page': end_page,
+            'next_page': start_page,
+            'listing_done': False,
+            'saved_count': 0,
+            'pending': {},
+            'in_flight': {},
+            'failed_bills': {},
+            'failed_pages': [],
+        }
+
+    @classmethod
+    def load(cls, path):
+        """Load a checkpoint from disk, or return None if there is none"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        checkpoint = cls(path)
+        checkpoint.state.update(state)
+        return checkpoint
+
+    @property
+    def is_complete(self):
+        return self.state['status'] == 'complete'
+
+    def save(self, force=True):
+        """Atomically write the checkpoint (throttled unless force=True)"""
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self._last_save < self.min_save_interval:
+                return
+            self._last_save = now
+            self.state['updated_at'] = datetime.now().isoformat()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def page_done(self, page, bills):
+        """Record a listed page: its bills become pending and the cursor advances"""
+        with self.lock:
+            for bill in bills:
+                self.state['pending'][bill['number']] = dict(bill)
+            self.state['next_page'] = max(self.state['next_page'], page + 1)
+            if page in self.state['failed_pages']:
+                self.state['failed_pages'].remove(page)
+        self.save()
+
+    def page_failed(self, page):
+        with self.lock:
+            if page not in self.state['failed_pages']:
+                self.state['failed_pages'].append(page)
+            self.state['next_page'] = max(self.state['next_page'], page + 1)
+        self.save()
+
+    def pages_to_resume(self):
+        """Failed pages first, then the rest of the range from the cursor"""
+        with self.lock:
+            pages = list(self.state['failed_pages'])
+            self.state['failed_pages'] = []
+            if not self.state['listing_done']:
+                pages += range(self.state['next_page'], self.state['end_page'] + 1)
+            self.state['listing_done'] = False
+        return pages
+
+    def listing_finished(self):
+        with self.lock:
+            self.state['listing_done'] = True
+        self.save()
+
+    def bill_started(self, bill):
+        with self.lock:
+            self.state['pending'].pop(bill['number'], None)
+            self.state['in_flight'][bill['number']] = dict(bill)
+        self.save(force=False)
+
+    def bill_saved(self, bill):
+        with self.lock:
+            stub = self.state['in_flight'].pop(bill['number'], None)
+            self.state['pending'].pop(bill['number'], None)
+            self.state['failed_bills'].pop(bill['number'], None)
+            self.state['saved_count'] += 1
+        self.save(force=False)
+        return stub
+
+    def bill_failed(self, bill, error):
+        """Remember a bill whose text could not be fetched so --resume retries it"""
+        with self.lock:
+            self.state['in_flight'].pop(bill['number'], None)
+            stub = {key: value for key, value in bill.items()
+                    if key in ('number', 'detail_url', 'sponsor', 'title', 'general_court')}
+            previous = self.state['failed_bills'].get(bill['number'], {})
+            self.state['failed_bills'][bill['number']] = {
+                'bill': stub,
+                'error': error,
+                'attempts': previous.get('attempts', 0) + 1,
+            }
+        self.save(force=False)
+
+    def bills_to_resume(self):
+        """Stubs that were listed but never saved: in-flight, pending, then failed"""
+        with self.lock:
+            bills = list(self.state['in_flight'].values()) + list(self.state['pending'].values())
+            bills += [entry['bill'] for entry in self.state['failed_bills'].values()]
+            self.state['pending'].update({bill['number']: bill for bill in bills})
+            self.state['in_flight'] = {}
+            self.state['failed_bills'] = {}
+            self.state['status'] = 'running'
+        return bills
+
+    def has_unfinished_work(self):
+        state = self.state
+        return (not state['listing_done'] or state['pending'] or state['in_flight']
+                or state['failed_bills'] or state['failed_pages'])
+
+    def mark_complete(self):
+        with self.lock:
+            self.state['status'] = 'complete'
+        self.save()
+
+    def summary(self):
+        state = self.state
+        return (f"next page {state['next_page']}/{state['end_page']}, "
+                f"{len(state['pending'])} pending, {len(state['in_flight'])} in flight, "
+                f"{len(state['failed_bills'])} failed bills, {len(state['failed_pages'])} failed pages, "
+                f"{state['saved_count']} saved")
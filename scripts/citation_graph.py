@@ -0,0 +1,280 @@
+# scripts/citation_graph.py
+import argparse
+import bisect
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from corpus_reader import FEDERAL_DIR, MA_DATA_DIR, iter_corpus_texts
+
+CITATIONS_DIR = "data/citations"
+
+# One pass per text: each citation form is a named alternative
+CITATION_PATTERN = re.compile(
+    r"(?P<mgl_section>\bsections?\s+(?P<mgl_s>\d+[A-Z]{0,3}(?:\s?1/2)?)\s+of\s+chapter\s+(?P<mgl_sc>\d+[A-Z]{0,2})"
+    r"\s+of\s+the\s+General\s+Laws)"
+    r"|(?P<mgl_chapter>\bchapter\s+(?P<mgl_c>\d+[A-Z]{0,2})\s+of\s+the\s+General\s+Laws)"
+    r"|(?P<mgl_short>\b(?:M\.?\s?G\.?\s?L\.?|G\.\s?L\.)\s*c\.?\s*(?P<short_c>\d+[A-Z]{0,2})"
+    r"(?:,?\s*(?:§+|s\.)\s*(?P<short_s>\d+[A-Z]{0,3}))?)"
+    r"|(?P<acts>\bchapter\s+(?P<acts_c>\d+)\s+of\s+the\s+acts\s+of\s+(?P<acts_y>\d{4}))"
+    r"|(?P<usc>\b(?P<usc_t>\d+)\s+U\.\s?S\.\s?C\.?\s*(?:§+\s*)?(?P<usc_s>\d+[a-z]?(?:-\d+)?))"
+    r"|(?P<usc_long>\bsection\s+(?P<usc_ls>\d+[a-z]?(?:-\d+)?)\s+of\s+title\s+(?P<usc_lt>\d+),?\s+United\s+States\s+Code)"
+    r"|(?P<public_law>\bPublic\s+Law\s+(?P<pl>\d+[-–]\d+))"
+    r"|(?P<bill>\b(?:(?P<chamber>House|Senate)(?:\s+Bill)?,?\s+No\.\s?|(?P<prefix>H\.\s?R\.|H\.|S\.)\s?)"
+    r"(?P<bill_n>\d{1,5})\b)",
+    re.IGNORECASE,
+)
+
+
+def extract_citations(text, session=None, state='MA'):
+    """Counter of citation node names in a text, e.g. MGL:c111:s2, USC:42:s1983, MA_194th_H_12
+
+    References to other parts of the same bill ("section 2 of this act")
+    are internal and not part of the graph. Bill numbers resolve to the
+    citing document's state, and for MA to the record key of that bill in
+    the citing bill's session, so they are the cited bill's own node.
+    H.R. numbers are federal from any state and carry no Congress, so
+    they become BILL:US:hr37.
+    """
+    targets = Counter()
+    for match in CITATION_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == 'mgl_section':
+            section = match.group('mgl_s').replace(' ', '')
+            targets[f"MGL:c{match.group('mgl_sc').upper()}:s{section.upper()}"] += 1
+        elif kind == 'mgl_chapter':
+            targets[f"MGL:c{match.group('mgl_c').upper()}"] += 1
+        elif kind == 'mgl_short':
+            chapter = f"MGL:c{match.group('short_c').upper()}"
+            section = match.group('short_s')
+            targets[f"{chapter}:s{section.upper()}" if section else chapter] += 1
+        elif kind == 'acts':
+            targets[f"ACTS:{match.group('acts_y')}:c{match.group('acts_c')}"] += 1
+        elif kind == 'usc':
+            targets[f"USC:{match.group('usc_t')}:s{match.group('usc_s').lower()}"] += 1
+        elif kind == 'usc_long':
+            targets[f"USC:{match.group('usc_lt')}:s{match.group('usc_ls').lower()}"] += 1
+        elif kind == 'public_law':
+            targets[f"PL:{match.group('pl').replace('–', '-')}"] += 1
+        elif kind == 'bill':
+            prefix = match.group('prefix')
+            if prefix and not prefix.isupper():
+                continue        # "s. 5" is a section abbreviation, not a Senate bill
+            if prefix and prefix.replace(' ', '') == 'H.R.':
+                targets[f"BILL:US:hr{match.group('bill_n')}"] += 1
+                continue        # a House of Representatives bill is federal whoever cites it
+            chamber = (match.group('chamber') or prefix)[0].upper()
+            if state == 'MA':
+                targets[f"MA_{session or 'unknown_session'}_{chamber}_{match.group('bill_n')}"] += 1
+            else:
+                chamber = 'hr' if chamber == 'H' else 's'
+                targets[f"BILL:{state}:{chamber}{match.group('bill_n')}"] += 1
+    return targets
+
+
+def parse_reference(query):
+    """Node name for a user query such as "MGL c.111 §2" or "42 U.S.C. 1983" (node names and record keys pass through)"""
+    if re.match(r'^[A-Z]+:', query) or re.match(r'^MA_\w+_[HS]D?_\d+$', query):
+        return query
+    found = extract_citations(query)
+    return next(iter(found), None)
+
+
+def build_csr(edges, node_count):
+    """CSR arrays (indptr, indices, weights) for (source, target, weight) edges grouped by source"""
+    if edges:
+        sources, targets, weights = (np.asarray(column, dtype=np.int64) for column in zip(*edges))
+    else:
+        sources = targets = weights = np.zeros(0, dtype=np.int64)
+    order = np.lexsort((targets, sources))
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=node_count), out=indptr[1:])
+    return indptr, targets[order].astype(np.int32), weights[order].astype(np.int32)
+
+
+class CitationGraph:
+    """Document -> citation graph in CSR form with a reverse index
+
+    ``nodes.txt`` is the sorted node table (documents and cited statutes,
+    acts and bills share one id space: a cited MA bill is its record key,
+    so bill -> bill edges are ordinary edges). The forward and reverse adjacency are CSR arrays loaded with
+    ``mmap_mode='r'``. Documents added since the last ``compact()`` live in
+    ``edges.tsv``, an append-only log whose edges replace a document's
+    compacted edges, so the scraper can add bills one at a time.
+    """
+
+    def __init__(self, root=CITATIONS_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.log_path = f"{root}/edges.tsv"
+
+        self.nodes = []
+        self.forward = self.reverse = None
+        if os.path.exists(f"{root}/nodes.txt"):
+            with open(f"{root}/nodes.txt", 'r', encoding='utf-8') as f:
+                self.nodes = f.read().splitlines()
+            self.forward = tuple(np.load(f"{root}/forward_{name}.npy", mmap_mode='r')
+                                 for name in ('indptr', 'indices', 'weights'))
+            self.reverse = tuple(np.load(f"{root}/reverse_{name}.npy", mmap_mode='r')
+                                 for name in ('indptr', 'indices', 'weights'))
+        self.node_ids = {name: i for i, name in enumerate(self.nodes)}
+
+        # Documents re-extracted since the last compaction: doc_id -> Counter(target -> mentions)
+        self.recent = {}
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    doc_id, target, count = line.rstrip('\n').split('\t')
+                    if target == '*':
+                        self.recent[doc_id] = Counter()     # start of a (re)extracted document
+                    else:
+                        self.recent.setdefault(doc_id, Counter())[target] += int(count)
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+
+    def add_document(self, doc_id, text, session=None, state='MA'):
+        """Extract a document's citations and log them, replacing any earlier edges"""
+        targets = extract_citations(text, session, state)
+        lines = [f"{doc_id}\t*\t0\n"] + [f"{doc_id}\t{target}\t{count}\n" for target, count in targets.items()]
+        with self.lock:
+            self.recent[doc_id] = targets
+            self._log.write(''.join(lines))
+            self._log.flush()
+        return targets
+
+    def _compacted_edges(self, node):
+        """(neighbour, weight) pairs of a node in a compacted CSR, or [] if unknown"""
+        i = self.node_ids.get(node)
+        if i is None or self.forward is None:
+            return []
+        indptr, indices, weights = self.forward
+        return [(self.nodes[j], int(w)) for j, w in zip(indices[indptr[i]:indptr[i + 1]], weights[indptr[i]:indptr[i + 1]])]
+
+    def cites(self, doc_id):
+        """{target: mentions} cited by a document"""
+        with self.lock:
+            if doc_id in self.recent:
+                return dict(self.recent[doc_id])
+        return dict(self._compacted_edges(doc_id))
+
+    def _matching_nodes(self, node, include_parts):
+        """Node ids equal to ``node`` or, with include_parts, nested under it (MGL:c111 -> MGL:c111:s2)"""
+        start = bisect.bisect_left(self.nodes, node)
+        ids = []
+        if start < len(self.nodes) and self.nodes[start] == node:
+            ids.append(start)
+        if include_parts:
+            prefix = node + ':'
+            i = bisect.bisect_left(self.nodes, prefix)
+            while i < len(self.nodes) and self.nodes[i].startswith(prefix):
+                ids.append(i)
+                i += 1
+        return ids
+
+    def cited_by(self, node, include_parts=True):
+        """{doc_id: mentions} of documents citing a node (and, by default, its sections)"""
+        citing = Counter()
+        if self.reverse is not None:
+            indptr, indices, weights = self.reverse
+            for target in self._matching_nodes(node, include_parts):
+                for source, weight in zip(indices[indptr[target]:indptr[target + 1]],
+                                          weights[indptr[target]:indptr[target + 1]]):
+                    citing[self.nodes[source]] += int(weight)
+        with self.lock:
+            recent = {doc_id: dict(targets) for doc_id, targets in self.recent.items()}
+        for doc_id in recent:
+            citing.pop(doc_id, None)        # superseded by the logged extraction
+        prefix = node + ':'
+        for doc_id, targets in recent.items():
+            for target, count in targets.items():
+                if target == node or (include_parts and target.startswith(prefix)):
+                    citing[doc_id] += count
+        return dict(citing.most_common())
+
+    def compact(self):
+        """Fold the edge log into fresh CSR arrays"""
+        with self.lock:
+            documents = {}
+            if self.forward is not None:
+                indptr = self.forward[0]
+                for i, name in enumerate(self.nodes):
+                    if indptr[i + 1] > indptr[i] and name not in self.recent:
+                        documents[name] = dict(self._compacted_edges(name))
+            documents.update({doc_id: dict(targets) for doc_id, targets in self.recent.items() if targets})
+
+            nodes = sorted(set(documents).union(*documents.values()))
+            node_ids = {name: i for i, name in enumerate(nodes)}
+            edges = [(node_ids[doc_id], node_ids[target], count)
+                     for doc_id, targets in documents.items() for target, count in targets.items()]
+            forward = build_csr(edges, len(nodes))
+            reverse = build_csr([(target, source, count) for source, target, count in edges], len(nodes))
+
+            # Release the old memory maps before their files are replaced
+            self.forward = self.reverse = None
+            for prefix, arrays in (('forward', forward), ('reverse', reverse)):
+                for name, array in zip(('indptr', 'indices', 'weights'), arrays):
+                    np.save(f"{self.root}/{prefix}_{name}.tmp.npy", array)
+                    os.replace(f"{self.root}/{prefix}_{name}.tmp.npy", f"{self.root}/{prefix}_{name}.npy")
+            tmp_path = f"{self.root}/nodes.txt.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(''.join(f"{name}\n" for name in nodes))
+            os.replace(tmp_path, f"{self.root}/nodes.txt")
+
+            self._log.close()
+            self._log = open(self.log_path, 'w', encoding='utf-8')
+            self.recent = {}
+            self.nodes = nodes
+            self.node_ids = node_ids
+            self.forward, self.reverse = forward, reverse
+        return len(edges)
+
+    def close(self):
+        self._log.close()
+
+
+def build_graph(root=CITATIONS_DIR, data_dir=MA_DATA_DIR, federal_dir=FEDERAL_DIR, sources=('ma', 'federal')):
+    """Extract citations from the whole corpus and compact them into CSR arrays"""
+    graph = CitationGraph(root)
+    start_time = time.monotonic()
+    documents = 0
+    for doc_id, source, text, record in iter_corpus_texts(data_dir, federal_dir, sources):
+        if source == 'ma':
+            graph.add_document(doc_id, text, record.get('metadata', {}).get('session'))
+        else:
+            graph.add_document(doc_id, text, state='US')
+        documents += 1
+    edges = graph.compact()
+    print(f"🔗 {documents} documents -> {len(graph.nodes)} nodes, {edges} citation edges "
+          f"in {time.monotonic() - start_time:.1f}s -> {root}")
+    return graph
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Citation graph between bills, statutes and acts")
+    parser.add_argument('command', choices=['build', 'compact', 'cited-by', 'cites'])
+    parser.add_argument('reference', nargs='?', help='e.g. "MGL c.111 §2", "42 U.S.C. 1983" or a document id')
+    parser.add_argument('--graph', default=CITATIONS_DIR)
+    parser.add_argument('--sources', default='ma,federal')
+    parser.add_argument('--exact', action='store_true', help="Don't include sections nested under a chapter")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_graph(args.graph, sources=tuple(args.sources.split(','))).close()
+    elif args.command == 'compact':
+        graph = CitationGraph(args.graph)
+        print(f"🔗 {graph.compact()} edges over {len(graph.nodes)} nodes")
+        graph.close()
+    elif args.command == 'cited-by':
+        node = parse_reference(args.reference)
+        start = time.perf_counter()
+        citing = CitationGraph(args.graph).cited_by(node, include_parts=not args.exact) if node else {}
+        print(f"🔗 {len(citing)} documents cite {node} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        for doc_id, mentions in citing.items():
+            print(f"   {doc_id:<32} {mentions} mention(s)")
+    else:
+        for target, mentions in sorted(CitationGraph(args.graph).cites(args.reference).items()):
+            print(f"   {target:<32} {mentions} mention(s)")
@@ -0,0 +1,274 @@
+# scripts/consistency_engine.py
+import argparse
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from multiprocessing import Pool
+
+from bill_segmenter import iter_batches, segment_text
+from corpus_reader import FEDERAL_DIR, MA_DATA_DIR, iter_corpus_texts
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9,
+    'ten': 10, 'eleven': 11, 'twelve': 12, 'fourteen': 14, 'fifteen': 15, 'twenty': 20, 'twenty-one': 21,
+    'thirty': 30, 'forty-five': 45, 'forty': 40, 'sixty': 60, 'ninety': 90, 'one hundred eighty': 180,
+}
+UNIT_DAYS = {'day': 1, 'week': 7, 'month': 30, 'year': 365}
+PERIOD_DAYS = {'weekly': 7, 'monthly': 30, 'quarterly': 91, 'semi-annually': 182, 'semiannually': 182,
+               'annually': 365, 'biennially': 730}
+
+_NUMBER = '|'.join(re.escape(word) for word in sorted(NUMBER_WORDS, key=len, reverse=True))
+_PERIODS = '|'.join(sorted(PERIOD_DAYS, key=len, reverse=True))
+
+# Every extractor is one named alternative of a single pattern, so a bill is scanned once
+MATCHER = re.compile(
+    rf"(?P<duration>\b(?P<count>\d+|{_NUMBER})(?:\s*\(\d+\))?[\s-]+(?:calendar\s+|business\s+)?"
+    rf"(?P<unit>day|week|month|year)s?\b|\b(?P<period>{_PERIODS})\b)"
+    r"|(?P<amount>\$\s?(?P<dollars>\d[\d,]*(?:\.\d{2})?)(?:\s+(?P<scale>thousand|million|billion))?)"
+    r"|(?P<definition>[\"“](?P<term>[^\"”\n]{2,60})[\"”],?\s+(?:shall\s+mean|means|shall\s+include|includes)\b)"
+    r"|(?P<agency>\b(?:Executive\s+Office|Department|Office|Division|Board|Commission|Bureau|Authority|Council)"
+    r"\s+of\s+(?:the\s+)?(?-i:[A-Z][A-Za-z]+(?:\s+(?:and\s+)?[A-Z][A-Za-z]+)*))",
+    re.IGNORECASE,
+)
+
+# What an obligation is about, looked up in the sentence around a duration or amount
+ACTION_PATTERN = re.compile(
+    r"\b(report|notif|notice|submi|file|filing|hearing|appeal|review|respond|renew|inspect|publish|certif|"
+    r"fine|penalt|fee|appropriat|grant)\w*", re.IGNORECASE)
+
+# Readable names for ACTION_PATTERN stems that are not words themselves
+ACTION_NAMES = {'notif': 'notification', 'submi': 'submission', 'certif': 'certification',
+                'penalt': 'penalty', 'appropriat': 'appropriation'}
+
+SCALES = {None: 1, 'thousand': 1_000, 'million': 1_000_000, 'billion': 1_000_000_000}
+
+RULES = ('deadline_conflict', 'amount_conflict', 'duplicate_definition', 'unused_definition', 'agency_variant')
+
+
+def sentence_around(text, start, end):
+    """The sentence containing text[start:end]"""
+    left = max(text.rfind('. ', 0, start), text.rfind('\n', 0, start)) + 1
+    right_candidates = [i for i in (text.find('. ', end), text.find('\n', end)) if i != -1]
+    right = min(right_candidates) if right_candidates else len(text)
+    return text[left:right]
+
+
+def locate(tree, offset):
+    """Section label for a character offset, e.g. "5(a)(1)", or None before the first section"""
+    label = None
+    nodes = tree
+    while nodes:
+        for name, start, end, children in nodes:
+            if start <= offset < end:
+                label = name if label is None else f"{label}({name})"
+                nodes = children
+                break
+        else:
+            break
+    return label
+
+
+def action_of(sentence):
+    match = ACTION_PATTERN.search(sentence)
+    return match.group(1).lower() if match else None
+
+
+def extract_facts(text, tree):
+    """One pass of the combined matcher: durations, amounts, definitions and agencies with locations"""
+    facts = {'duration': [], 'amount': [], 'definition': [], 'agency': []}
+    for match in MATCHER.finditer(text):
+        kind = match.lastgroup
+        where = locate(tree, match.start())
+        if where is None:
+            continue
+        if kind == 'duration':
+            if match.group('period'):
+                days = PERIOD_DAYS[match.group('period').lower()]
+            else:
+                count = match.group('count').lower()
+                days = (int(count) if count.isdigit() else NUMBER_WORDS[count]) * UNIT_DAYS[match.group('unit').lower()]
+            sentence = sentence_around(text, match.start(), match.end())
+            facts['duration'].append((where, match.group(0), days, action_of(sentence)))
+        elif kind == 'amount':
+            value = float(match.group('dollars').replace(',', '')) * SCALES[(match.group('scale') or '').lower() or None]
+            sentence = sentence_around(text, match.start(), match.end())
+            facts['amount'].append((where, match.group(0), value, action_of(sentence)))
+        elif kind == 'definition':
+            definition_end = text.find('.', match.end())
+            body = text[match.end():definition_end if definition_end != -1 else len(text)].strip()
+            facts['definition'].append((where, match.group('term').strip(), body, match.start(), match.end()))
+        else:
+            facts['agency'].append((where, ' '.join(match.group(0).split())))
+    return facts
+
+
+def conflicting_values(facts, describe):
+    """Group (where, raw, value, action) facts by action and report actions that differ across sections"""
+    by_action = defaultdict(list)
+    for where, raw, value, action in facts:
+        if action:
+            by_action[action].append((where, raw, value))
+    findings = []
+    for action, items in by_action.items():
+        values = {value for _, _, value in items}
+        sections = {where.split('(')[0] for where, _, _ in items}
+        if len(values) > 1 and len(sections) > 1:
+            # Report the first occurrence of each distinct value
+            seen = {}
+            for where, raw, value in items:
+                seen.setdefault(value, (where, raw))
+            findings.append({'message': describe(action, list(seen.values())),
+                             'locations': [where for where, _ in seen.values()],
+                             'values': [raw for _, raw in seen.values()]})
+    return findings
+
+
+def _describe(action, items):
+    return '; '.join(f"Section {where} says {raw}" for where, raw in items) + f" ({ACTION_NAMES.get(action, action)})"
+
+
+def check_deadlines(text, facts):
+    """Same kind of obligation (report, notice, appeal...) given different time limits in different sections"""
+    return conflicting_values(facts['duration'], _describe)
+
+
+def check_amounts(text, facts):
+    """Same kind of charge (fine, fee, appropriation...) given different dollar amounts in different sections"""
+    return conflicting_values(facts['amount'], _describe)
+
+
+def check_duplicate_definitions(text, facts):
+    """A term defined more than once with different wording"""
+    definitions = defaultdict(list)
+    for where, term, body, _, _ in facts['definition']:
+        definitions[term.lower()].append((where, term, body))
+    findings = []
+    for items in definitions.values():
+        if len({' '.join(body.lower().split()) for _, _, body in items}) > 1:
+            findings.append({'message': f"\"{items[0][1]}\" is defined differently in "
+                                        + ' and '.join(f"Section {where}" for where, _, _ in items),
+                             'locations': [where for where, _, _ in items]})
+    return findings
+
+
+def check_unused_definitions(text, facts):
+    """A defined term that never appears outside its own definition"""
+    lowered = None
+    findings = []
+    for where, term, _, start, end in facts['definition']:
+        lowered = lowered or text.lower()
+        uses = lowered.count(term.lower()) - lowered.count(term.lower(), start, end)
+        if uses <= 0:
+            findings.append({'message': f"\"{term}\" is defined in Section {where} but never used",
+                             'locations': [where]})
+    return findings
+
+
+def check_agency_variants(text, facts):
+    """One agency named two ways, e.g. "Department of Public Health" vs "Department of Health\""""
+    names = {}
+    for where, name in facts['agency']:
+        names.setdefault(name.lower(), (where, name))
+    findings = []
+    keys = sorted(names)
+    for i, first in enumerate(keys):
+        first_words = set(first.split())
+        for second in keys[i + 1:]:
+            second_words = set(second.split())
+            if first.split()[0] == second.split()[0] and (first_words < second_words or second_words < first_words):
+                (where_a, name_a), (where_b, name_b) = names[first], names[second]
+                findings.append({'message': f"Section {where_a} names the {name_a}; Section {where_b} the {name_b}",
+                                 'locations': [where_a, where_b]})
+    return findings
+
+
+RULE_CHECKS = {
+    'deadline_conflict': check_deadlines,
+    'amount_conflict': check_amounts,
+    'duplicate_definition': check_duplicate_definitions,
+    'unused_definition': check_unused_definitions,
+    'agency_variant': check_agency_variants,
+}
+
+
+def check_bill(text):
+    """Findings for one bill plus seconds spent per stage"""
+    timings = {}
+    start = time.perf_counter()
+    tree = segment_text(text)
+    timings['segment'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    facts = extract_facts(text, tree)
+    timings['extract'] = time.perf_counter() - start
+
+    findings = []
+    for rule, check in RULE_CHECKS.items():
+        start = time.perf_counter()
+        for finding in check(text, facts):
+            findings.append({'rule': rule, **finding})
+        timings[rule] = time.perf_counter() - start
+    return findings, timings
+
+
+def check_batch(batch):
+    """Worker: check a batch of (doc_id, text) pairs"""
+    return [(doc_id, *check_bill(text)) for doc_id, text in batch]
+
+
+def run_engine(output_path, data_dir=MA_DATA_DIR, federal_dir=FEDERAL_DIR, sources=('ma',), processes=None,
+               batch_size=32):
+    """Check every bill in the corpus and write one JSON line per bill with findings"""
+    documents = ((doc_id, text) for doc_id, _, text, _ in iter_corpus_texts(data_dir, federal_dir, sources))
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    start_time = time.monotonic()
+    bills = 0
+    flagged = 0
+    rule_counts = dict.fromkeys(RULES, 0)
+    stage_seconds = defaultdict(float)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f, Pool(processes) as pool:
+        for batch in pool.imap(check_batch, iter_batches(documents, batch_size)):
+            for doc_id, findings, timings in batch:
+                bills += 1
+                for stage, seconds in timings.items():
+                    stage_seconds[stage] += seconds
+                if not findings:
+                    continue
+                flagged += 1
+                for finding in findings:
+                    rule_counts[finding['rule']] += 1
+                f.write(json.dumps({'id': doc_id, 'findings': findings}, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, output_path)
+
+    elapsed = max(time.monotonic() - start_time, 1e-9)
+    print(f"⚖️  Checked {bills} bills in {elapsed:.1f}s ({bills / elapsed:.0f} bills/s): "
+          f"{flagged} with findings -> {output_path}")
+    for rule in RULES:
+        print(f"   {rule:<22} {rule_counts[rule]:6d} findings  {stage_seconds[rule] * 1000:9.1f} ms")
+    for stage in ('segment', 'extract'):
+        print(f"   {'(' + stage + ')':<22} {'':6s}           {stage_seconds[stage] * 1000:9.1f} ms")
+    return {'bills': bills, 'flagged': flagged, 'findings': rule_counts,
+            'seconds': {stage: round(seconds, 4) for stage, seconds in stage_seconds.items()}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag internal inconsistencies in bill texts")
+    parser.add_argument('--output', default="data/consistency/findings.jsonl")
+    parser.add_argument('--sources', default='ma')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--file', default=None, help="Check a single plain-text bill and print its findings")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            findings, _ = check_bill(f.read())
+        for finding in findings:
+            print(f"[{finding['rule']}] {finding['message']}")
+    else:
+        run_engine(args.output, sources=tuple(args.sources.split(',')), processes=args.processes,
+                   batch_size=args.batch_size)
@@ -0,0 +1,77 @@
+# scripts/corpus_reader.py
+import glob
+import json
+import os
+
+from corpus_store import CorpusStore
+from jsonl_shards import iter_jsonl_shards
+from text_store import TextStore
+
+MA_DATA_DIR = "data/states/massachusetts"
+FEDERAL_DIR = "data/federal_foundations"
+
+# Written next to the federal corpus by setup_federal_foundations, but not a corpus itself
+INGEST_REPORT_FILENAME = "ingest_report.json"
+
+
+def iter_ma_bills(data_dir=MA_DATA_DIR, with_text=True):
+    """Stream (record_key, record, text) for scraped MA bills that have full text"""
+    corpus_dir = f"{data_dir}/corpus"
+    if not os.path.exists(f"{corpus_dir}/{CorpusStore.INDEX_FILENAME}"):
+        return
+    store = CorpusStore(corpus_dir)
+    texts = TextStore(f"{data_dir}/texts") if with_text else None
+    try:
+        for key, record in store.iter_records(with_keys=True):
+            if record.get('text_hash'):
+                text = texts.get(record['text_hash']) if with_text else None
+            elif record.get('text_source') in ('view_text', 'print_preview', 'direct_page'):
+                text = record.get('full_text')  # records saved before the text store existed
+            else:
+                continue
+            yield key, record, text
+    finally:
+        store.close()
+
+
+def iter_federal_documents(base_dir=FEDERAL_DIR, sources=None):
+    """Stream (doc_id, record) from federal foundation shards and legacy JSON arrays
+
+    Sharded sources live in ``<base_dir>/<source>/*.jsonl``; sample-mode
+    outputs are single JSON arrays (``billsum_congressional.json`` etc.),
+    which have to be loaded whole. ``sources`` limits the walk to sources
+    whose name starts with one of the given prefixes.
+    """
+    if not os.path.isdir(base_dir):
+        return
+    for shard_dir in sorted(glob.glob(f"{base_dir}/*/")):
+        source = os.path.basename(os.path.normpath(shard_dir))
+        if sources and not source.startswith(tuple(sources)):
+            continue
+        for n, record in enumerate(iter_jsonl_shards(shard_dir)):
+            yield f"{source}:{record.get('bill_id') or n}", record
+
+    for path in sorted(glob.glob(f"{base_dir}/*.json")):
+        if os.path.basename(path) == INGEST_REPORT_FILENAME:
+            continue
+        source = os.path.splitext(os.path.basename(path))[0]
+        if sources and not source.startswith(tuple(sources)):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        if not isinstance(records, list):
+            continue  # framework documents, not corpora
+        for n, record in enumerate(records):
+            yield f"{source}:{record.get('bill_id') or n}", record
+
+
+def iter_corpus_texts(data_dir=MA_DATA_DIR, federal_dir=FEDERAL_DIR, sources=('ma', 'federal')):
+    """Stream (doc_id, source, text, record) across the MA and federal corpora"""
+    if 'ma' in sources:
+        for key, record, text in iter_ma_bills(data_dir):
+            if text:
+                yield key, 'ma', text, record
+    if 'federal' in sources:
+        for doc_id, record in iter_federal_documents(federal_dir):
+            if record.get('text'):
+                yield doc_id, 'federal', record['text'], record
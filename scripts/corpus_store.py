@@ -0,0 +1,191 @@
+# scripts/corpus_store.py
+import argparse
+import json
+import mmap
+import os
+import threading
+
+
+class CorpusStore:
+    """Append-only record store: sharded JSONL files plus an offset index
+
+    Records are appended as single JSON lines to ``shard-NNNNN.jsonl`` files
+    that roll over at ``shard_max_bytes``. ``index.tsv`` maps each key to
+    ``shard<TAB>offset<TAB>length`` of its latest version, so lookups by key
+    are one seek and one read. Re-saving a key appends a new version; the
+    old line stays in its shard until ``compact()``.
+    """
+
+    INDEX_FILENAME = "index.tsv"
+
+    def __init__(self, root, shard_max_bytes=64 * 1024 * 1024, use_mmap=False):
+        self.root = root
+        self.shard_max_bytes = shard_max_bytes
+        self.use_mmap = use_mmap
+        self.index = {}          # key -> (shard, offset, length)
+        self.lock = threading.Lock()
+        self._maps = {}
+        os.makedirs(root, exist_ok=True)
+
+        self.index_path = f"{root}/{self.INDEX_FILENAME}"
+        if os.path.exists(self.index_path):
+            self._load_index()
+
+        shards = self.shard_numbers()
+        self.current_shard = shards[-1] if shards else 0
+        self._shard_file = open(self.shard_path(self.current_shard), 'ab')
+        self._index_file = open(self.index_path, 'a', encoding='utf-8')
+
+    def _load_index(self):
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) == 4:
+                    key, shard, offset, length = parts
+                    self.index[key] = (int(shard), int(offset), int(length))
+
+    def shard_path(self, shard):
+        return f"{self.root}/shard-{shard:05d}.jsonl"
+
+    def shard_numbers(self):
+        """Sorted list of shard numbers present on disk"""
+        numbers = []
+        for filename in os.listdir(self.root):
+            if filename.startswith('shard-') and filename.endswith('.jsonl'):
+                numbers.append(int(filename[6:-6]))
+        return sorted(numbers)
+
+    def put(self, key, record):
+        """Append a record (a new version if the key already exists)"""
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self.lock:
+            offset = self._shard_file.tell()
+            if offset > 0 and offset + len(line) > self.shard_max_bytes:
+                self._shard_file.close()
+                self.current_shard += 1
+                self._shard_file = open(self.shard_path(self.current_shard), 'ab')
+                offset = 0
+            self._shard_file.write(line)
+            self._shard_file.flush()
+            self.index[key] = (self.current_shard, offset, len(line))
+            self._index_file.write(f"{key}\t{self.current_shard}\t{offset}\t{len(line)}\n")
+            self._index_file.flush()
+
+    def _read(self, shard, offset, length):
+        if self.use_mmap and shard != self.current_shard:
+            # Sealed shards never change, so they can be mapped once
+            shard_map = self._maps.get(shard)
+            if shard_map is None:
+                with open(self.shard_path(shard), 'rb') as f:
+                    shard_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[shard] = shard_map
+            return shard_map[offset:offset + length]
+        with open(self.shard_path(shard), 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def get(self, key, default=None):
+        """Look up the latest version of a record by key"""
+        location = self.index.get(key)
+        if location is None:
+            return default
+        return json.loads(self._read(*location))
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def iter_records(self, with_keys=False):
+        """Stream the latest version of every record, shard by shard"""
+        live = {(shard, offset) for shard, offset, _ in self.index.values()}
+        keys_by_location = None
+        if with_keys:
+            keys_by_location = {(shard, offset): key for key, (shard, offset, _) in self.index.items()}
+
+        for shard in self.shard_numbers():
+            with open(self.shard_path(shard), 'rb') as f:
+                offset = 0
+                for line in f:
+                    location = (shard, offset)
+                    offset += len(line)
+                    if location not in live:
+                        continue  # superseded by a later version
+                    record = json.loads(line)
+                    if with_keys:
+                        yield keys_by_location[location], record
+                    else:
+                        yield record
+
+    def compact(self):
+        """Rewrite live records into fresh shards and drop superseded versions"""
+        with self.lock:
+            records = self.iter_records(with_keys=True)
+            tmp_root = f"{self.root}.compact"
+            os.makedirs(tmp_root, exist_ok=True)
+            fresh = CorpusStore(tmp_root, self.shard_max_bytes)
+            for key, record in records:
+                fresh.put(key, record)
+            fresh.close()
+
+            self.close()
+            for shard in self.shard_numbers():
+                os.remove(self.shard_path(shard))
+            for filename in os.listdir(tmp_root):
+                os.replace(f"{tmp_root}/{filename}", f"{self.root}/{filename}")
+            os.rmdir(tmp_root)
+
+            self.__init__(self.root, self.shard_max_bytes, self.use_mmap)
+
+    def close(self):
+        for shard_map in self._maps.values():
+            shard_map.close()
+        self._maps = {}
+        self._shard_file.close()
+        self._index_file.close()
+
+
+def migrate_raw_dir(raw_dir, store, remove=False):
+    """One-time import of legacy raw/*.json bill files into a CorpusStore"""
+    migrated = 0
+    for filename in sorted(os.listdir(raw_dir)):
+        if not filename.endswith('.json'):
+            continue
+        filepath = os.path.join(raw_dir, filename)
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                bill_data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Error loading {filename}: {e}")
+            continue
+
+        key = bill_data.get('metadata', {}).get('bill_id') or f"MA_{filename[:-5]}"
+        store.put(key, bill_data)
+        migrated += 1
+        if remove:
+            os.remove(filepath)
+
+    print(f"📦 Migrated {migrated} bills from {raw_dir} into {store.root}")
+    return migrated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the sharded bill corpus store")
+    parser.add_argument('command', choices=['migrate', 'compact', 'stats'])
+    parser.add_argument('--store', default="data/states/massachusetts/corpus")
+    parser.add_argument('--raw-dir', default="data/states/massachusetts/raw")
+    parser.add_argument('--remove', action='store_true', help="Delete raw JSON files after migrating them")
+    args = parser.parse_args()
+
+    store = CorpusStore(args.store)
+    if args.command == 'migrate':
+        migrate_raw_dir(args.raw_dir, store, remove=args.remove)
+    elif args.command == 'compact':
+        store.compact()
+        print(f"🧹 Compacted {len(store)} records into {len(store.shard_numbers())} shards")
+    print(f"📊 {len(store)} records in {len(store.shard_numbers())} shards under {store.root}")
+    store.close()
@@ -0,0 +1,317 @@
+# scripts/curriculum_builder.py
+import argparse
+import glob
+import json
+import os
+import random
+import time
+
+from catalog import CATALOG_PATH, Catalog, ensure_ma_catalogued
+from corpus_reader import FEDERAL_DIR, MA_DATA_DIR, iter_federal_documents
+from corpus_store import CorpusStore
+from near_duplicates import DEDUP_DIR, load_duplicate_ids
+from search_index import document_fields
+from text_store import TextStore
+
+CURRICULUM_DIR = "data/curriculum"
+
+# README §9.1 stages, weights and §9.2 folders. Extra documents dropped into a
+# stage folder (.jsonl, .json or .txt) are mixed in with the scraped/ingested sources.
+STAGES = {
+    1: {'name': 'federal_foundations', 'weight': 0.10, 'dir': 'data/1_federal_foundations'},
+    2: {'name': 'court_cases', 'weight': 0.10, 'dir': 'data/2_court_cases'},
+    3: {'name': 'federal_bills', 'weight': 0.25, 'dir': 'data/3_federal_bills'},
+    4: {'name': 'massachusetts_bills', 'weight': 0.25, 'dir': 'data/4_massachusetts_bills'},
+    5: {'name': 'drafting_manuals', 'weight': 0.10, 'dir': 'data/5_drafting_manuals'},
+    6: {'name': 'other_states', 'weight': 0.15, 'dir': 'data/6_other_states'},
+    7: {'name': 'summaries_and_analyses', 'weight': 0.05, 'dir': 'data/7_summaries_and_analyses'},
+}
+
+# Federal foundation sources (by output name prefix) feeding each stage
+FEDERAL_STAGE_SOURCES = {
+    1: ('cornell_legal_corpus', 'pile_of_law'),
+    2: ('harvard_legal_corpus', 'pile_of_law'),
+    3: ('billsum',),
+    7: ('billsum',),
+}
+
+COURT_TYPES = ('court', 'opinion', 'case')
+
+
+def training_document(doc_id, stage, content, fields, level, state=None, topic=None, status=None):
+    """One training example in the README §9.2 format"""
+    return {'id': doc_id, 'stage': stage, 'type': fields.get('type', '').upper(), 'level': level,
+            'state': state or fields.get('state'), 'topic': topic, 'status': status,
+            'year': fields.get('year') or None, 'content': content}
+
+
+def iter_stage_folder(stage):
+    """Documents placed in a README stage folder: JSONL/JSON records or plain text files"""
+    folder = STAGES[stage]['dir']
+    for path in sorted(glob.glob(f"{folder}/**/*", recursive=True)):
+        relative = os.path.relpath(path, folder)
+        if path.endswith('.txt'):
+            with open(path, 'r', encoding='utf-8') as f:
+                yield training_document(f"{stage}:{relative}", stage, f.read(), {}, level=None)
+            continue
+        if path.endswith('.jsonl'):
+            with open(path, 'r', encoding='utf-8') as f:
+                records = (json.loads(line) for line in f if line.strip())
+                yield from _folder_records(stage, relative, records)
+        elif path.endswith('.json'):
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            yield from _folder_records(stage, relative, records if isinstance(records, list) else [records])
+
+
+def _folder_records(stage, relative, records):
+    for n, record in enumerate(records):
+        content = record.get('content') or record.get('text')
+        if not content:
+            continue
+        fields = {'type': record.get('type', ''), 'year': record.get('year')}
+        yield training_document(f"{stage}:{relative}:{n}", stage, content, fields, level=record.get('level'),
+                                state=record.get('state'), topic=record.get('topic'), status=record.get('status'))
+
+
+def iter_ma_stage(data_dir=MA_DATA_DIR, catalog_path=CATALOG_PATH):
+    """Stage 4: MA bills with text, listed from the catalog instead of reading every record"""
+    catalog = Catalog(catalog_path)
+    ensure_ma_catalogued(catalog, data_dir)
+    texts = TextStore(f"{data_dir}/texts")
+    store = None
+    rows = catalog.query(('doc_id', 'type', 'year', 'text_hash'), source='ma', min_length=1,
+                         text_source=('view_text', 'print_preview', 'direct_page', 'pdf'))
+    try:
+        for row in rows:
+            if row['text_hash']:
+                text = texts.get(row['text_hash'])
+            else:
+                # Records saved before the text store existed keep their text inline
+                store = store or CorpusStore(f"{data_dir}/corpus")
+                text = (store.get(row['doc_id']) or {}).get('full_text')
+            if text:
+                yield training_document(row['doc_id'], 4, text, row, 'STATE', state='Massachusetts')
+    finally:
+        catalog.close()
+        if store is not None:
+            store.close()
+
+
+def iter_stage(stage, data_dir=MA_DATA_DIR, federal_dir=FEDERAL_DIR, catalog_path=CATALOG_PATH):
+    """Stream one stage's documents in a fixed order"""
+    if stage == 4:
+        yield from iter_ma_stage(data_dir, catalog_path)
+
+    federal_sources = FEDERAL_STAGE_SOURCES.get(stage)
+    records = iter_federal_documents(federal_dir, federal_sources) if federal_sources else ()
+    for doc_id, record in records:
+        fields = document_fields(doc_id, 'federal', record)
+        if stage == 7:
+            if record.get('summary'):
+                yield training_document(f"{doc_id}:summary", stage, record['summary'], fields, 'FEDERAL')
+            continue
+        if not record.get('text'):
+            continue
+        if doc_id.startswith('pile_of_law'):
+            # Pile of Law mixes court opinions (stage 2) with statutes and regulations (stage 1)
+            is_court = any(word in fields['type'].lower() for word in COURT_TYPES)
+            if is_court != (stage == 2):
+                continue
+        yield training_document(doc_id, stage, record['text'], fields, 'FEDERAL')
+
+    yield from iter_stage_folder(stage)
+
+
+def weighted_mix(stages, seed=0, buffer_size=10000, total=None, upsample=False, skip_ids=frozenset(),
+                 data_dir=MA_DATA_DIR, federal_dir=FEDERAL_DIR, catalog_path=CATALOG_PATH):
+    """Interleave stage streams by weight through a seeded shuffle buffer
+
+    Each draw picks a stage with probability proportional to its weight
+    (renormalised over stages that still have documents) and pulls that
+    stage's next document into the buffer; a random buffer slot is emitted
+    once it is full. With ``upsample`` an exhausted stage starts over (so
+    ``total`` is required) instead of dropping out of the mix. The output
+    depends only on the inputs and the seed.
+    """
+    if upsample and total is None:
+        raise ValueError("upsample needs a total document count")
+    rng = random.Random(seed)
+    streams = {stage: iter_stage(stage, data_dir, federal_dir, catalog_path) for stage in stages}
+    epochs = dict.fromkeys(stages, 0)
+    pulled = dict.fromkeys(stages, 0)     # documents taken from the current pass over each stage
+    buffer = []
+    drawn = 0
+    while streams and (total is None or drawn < total):
+        active = sorted(streams)
+        stage = rng.choices(active, weights=[stages[s] for s in active])[0]
+        doc = next(streams[stage], None)
+        while doc is not None and doc['id'] in skip_ids:
+            doc = next(streams[stage], None)
+        if doc is None:
+            if upsample and pulled[stage]:
+                streams[stage] = iter_stage(stage, data_dir, federal_dir, catalog_path)
+                epochs[stage] += 1
+                pulled[stage] = 0
+            else:
+                del streams[stage]
+            continue
+        pulled[stage] += 1
+        if epochs[stage] > 0:
+            doc['epoch'] = epochs[stage]
+        drawn += 1
+        if len(buffer) < buffer_size:
+            buffer.append(doc)
+            continue
+        slot = rng.randrange(buffer_size)
+        yield buffer[slot]
+        buffer[slot] = doc
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+class CurriculumBuilder:
+    """Write the mixed stream as fixed-size JSONL training shards
+
+    Shards ``train-NNNNN.jsonl`` hold exactly ``shard_records`` documents
+    (the last may be short) and are written under a temp name, then renamed.
+    ``progress.json`` records the configuration, finished shards and the
+    realized mix; because the mix is deterministic, ``resume`` regenerates
+    the stream and skips the documents already in finished shards.
+    """
+
+    def __init__(self, out_dir=CURRICULUM_DIR, seed=0, buffer_size=10000, shard_records=5000, total=None,
+                 upsample=False, weights=None, dedup=True, data_dir=MA_DATA_DIR, federal_dir=FEDERAL_DIR,
+                 catalog_path=CATALOG_PATH):
+        self.out_dir = out_dir
+        self.data_dir = data_dir
+        self.federal_dir = federal_dir
+        self.catalog_path = catalog_path
+        self.weights = weights or {stage: spec['weight'] for stage, spec in STAGES.items()}
+        self.config = {'seed': seed, 'buffer_size': buffer_size, 'shard_records': shard_records,
+                       'total': total, 'upsample': upsample, 'dedup': dedup,
+                       'weights': {str(stage): weight for stage, weight in sorted(self.weights.items())}}
+        self.progress_path = f"{out_dir}/progress.json"
+        os.makedirs(out_dir, exist_ok=True)
+
+    def load_progress(self):
+        if not os.path.exists(self.progress_path):
+            return None
+        with open(self.progress_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_progress(self, progress):
+        tmp_path = f"{self.progress_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(progress, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.progress_path)
+
+    def _shard_path(self, number):
+        return f"{self.out_dir}/train-{number:05d}.jsonl"
+
+    def build(self, resume=False):
+        """Write all shards (continuing a previous run with resume=True); returns the progress dict"""
+        progress = self.load_progress() if resume else None
+        if progress is not None and progress['config'] != self.config:
+            raise ValueError(f"{self.progress_path} was written with a different configuration; "
+                             f"rerun without --resume to start over")
+        if progress is None:
+            for path in glob.glob(f"{self.out_dir}/train-*.jsonl"):
+                os.remove(path)
+            progress = {'config': self.config, 'status': 'running', 'shards': 0, 'records': 0,
+                        'stage_docs': {}, 'stage_chars': {}}
+        elif progress['status'] == 'complete':
+            print(f"✅ Curriculum already complete: {progress['records']} documents in {progress['shards']} shards")
+            return progress
+
+        skip_ids = load_duplicate_ids(f"{DEDUP_DIR}/clusters.jsonl") if self.config['dedup'] else frozenset()
+        stream = weighted_mix(self.weights, self.config['seed'], self.config['buffer_size'], self.config['total'],
+                              self.config['upsample'], skip_ids, self.data_dir, self.federal_dir, self.catalog_path)
+        already_written = progress['records']
+        if already_written:
+            print(f"🔄 Resuming after {progress['shards']} shards ({already_written} documents)")
+
+        start_time = time.monotonic()
+        shard_file = None
+        shard_docs = {}
+        shard_chars = {}
+        for position, doc in enumerate(stream):
+            if position < already_written:
+                continue
+            if shard_file is None:
+                shard_file = open(self._shard_path(progress['shards']) + '.tmp', 'w', encoding='utf-8')
+                shard_count = 0
+            shard_file.write(json.dumps(doc, ensure_ascii=False) + '\n')
+            shard_count += 1
+            stage = str(doc['stage'])
+            shard_docs[stage] = shard_docs.get(stage, 0) + 1
+            shard_chars[stage] = shard_chars.get(stage, 0) + len(doc['content'])
+            if shard_count == self.config['shard_records']:
+                self._finish_shard(shard_file, progress, shard_count, shard_docs, shard_chars)
+                shard_file, shard_docs, shard_chars = None, {}, {}
+        if shard_file is not None:
+            self._finish_shard(shard_file, progress, shard_count, shard_docs, shard_chars)
+
+        progress['status'] = 'complete'
+        self._save_progress(progress)
+        written = progress['records'] - already_written
+        print(f"📚 Wrote {written} documents in {time.monotonic() - start_time:.1f}s; "
+              f"{progress['records']} documents in {progress['shards']} shards at {self.out_dir}")
+        print_mix_report(progress, self.weights)
+        return progress
+
+    def _finish_shard(self, shard_file, progress, count, docs, chars):
+        shard_file.close()
+        os.replace(shard_file.name, self._shard_path(progress['shards']))
+        progress['shards'] += 1
+        progress['records'] += count
+        for stage, value in docs.items():
+            progress['stage_docs'][stage] = progress['stage_docs'].get(stage, 0) + value
+        for stage, value in chars.items():
+            progress['stage_chars'][stage] = progress['stage_chars'].get(stage, 0) + value
+        self._save_progress(progress)
+
+
+def print_mix_report(progress, weights):
+    """Realized stage mix (by documents and by characters) against the target weights"""
+    total_docs = max(sum(progress['stage_docs'].values()), 1)
+    total_chars = max(sum(progress['stage_chars'].values()), 1)
+    total_weight = sum(weights.values())
+    print(f"   {'stage':<26} {'target':>7} {'docs':>8} {'by docs':>8} {'by chars':>9}")
+    for stage, spec in STAGES.items():
+        docs = progress['stage_docs'].get(str(stage), 0)
+        chars = progress['stage_chars'].get(str(stage), 0)
+        marker = '' if docs else '  (no documents)'
+        print(f"   {stage}_{spec['name']:<24} {weights.get(stage, 0) / total_weight:7.1%} {docs:8d} "
+              f"{docs / total_docs:8.1%} {chars / total_chars:9.1%}{marker}")
+    if any(not progress['stage_docs'].get(str(stage)) for stage in STAGES):
+        print("   Stages without documents drop out of the mix; their weight is shared by the rest")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build mixed curriculum training shards from all stages")
+    parser.add_argument('--output', default=CURRICULUM_DIR)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--buffer-size', type=int, default=10000, help="Shuffle buffer size in documents")
+    parser.add_argument('--shard-records', type=int, default=5000)
+    parser.add_argument('--total', type=int, default=None, help="Stop after this many documents")
+    parser.add_argument('--upsample', action='store_true',
+                        help="Restart exhausted stages to hold the target weights (needs --total)")
+    parser.add_argument('--no-dedup', action='store_true', help="Keep near-duplicates flagged by near_duplicates.py")
+    parser.add_argument('--resume', action='store_true', help="Continue an interrupted build")
+    parser.add_argument('--report', action='store_true', help="Only print the realized mix of the last build")
+    args = parser.parse_args()
+
+    builder = CurriculumBuilder(args.output, seed=args.seed, buffer_size=args.buffer_size,
+                                shard_records=args.shard_records, total=args.total, upsample=args.upsample,
+                                dedup=not args.no_dedup)
+    if args.report:
+        progress = builder.load_progress()
+        if progress:
+            print_mix_report(progress, builder.weights)
+        else:
+            print(f"❌ No curriculum build at {args.output}")
+    else:
+        builder.build(resume=args.resume)
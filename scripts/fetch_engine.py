@@ -0,0 +1,255 @@
+# scripts/fetch_engine.py
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: throttling and server-side failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at a fixed rate (tokens per second)"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """One token bucket per host, all sharing the same requests/sec budget"""
+
+    def __init__(self, requests_per_sec=2.0, burst=1):
+        self.requests_per_sec = requests_per_sec
+        self.burst = burst
+        self.buckets = {}
+        self.request_counts = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        """Wait for permission to send one request to the host of url"""
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.requests_per_sec, self.burst)
+                self.buckets[host] = bucket
+            self.request_counts[host] = self.request_counts.get(host, 0) + 1
+        bucket.acquire()
+
+    def total_requests(self):
+        """Number of requests granted across all hosts"""
+        with self.lock:
+            return sum(self.request_counts.values())
+
+
+class RateLimitedSession:
+    """Wrap a requests.Session so every request waits on the per-host limiter"""
+
+    def __init__(self, session, limiter, pool_size=10):
+        self.session = session
+        self.limiter = limiter
+
+        # Share one connection pool across worker threads
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        self.limiter.acquire(url)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def __getattr__(self, name):
+        # headers, cookies, mount, close... come from the wrapped session
+        return getattr(self.session, name)
+
+
+class TransientFetchError(requests.exceptions.RequestException):
+    """A request that kept failing with timeouts, 429s or 5xxs after every retry"""
+
+
+def retry_after_seconds(response):
+    """Seconds asked for by a Retry-After header (delta-seconds or HTTP date), or None"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class FetchController:
+    """Adaptive concurrency, timeouts and retries around a (rate-limited) session
+
+    At most ``limit`` requests are in flight. The limit follows AIMD: it
+    grows by about one slot per ``limit`` fast successes and is multiplied
+    by ``decrease_factor`` (at most once per ``cooldown`` seconds) on a 429,
+    a 5xx, a timeout, or when the latency average climbs past
+    ``latency_factor`` times the best average seen. Failed attempts are
+    retried with jittered exponential backoff, or after the server's
+    Retry-After, which also pauses every other request. When the retries
+    run out a TransientFetchError is raised so callers can requeue the work.
+    With a RateLimitedSession the rate token is taken before a slot and
+    outside the timed call, so waiting on the limiter neither holds a slot
+    nor reads as server latency. Connection pooling is the wrapped
+    session's.
+    """
+
+    def __init__(self, session, max_concurrency=8, min_concurrency=1, initial_concurrency=None, max_retries=4,
+                 backoff=0.5, max_backoff=30.0, timeout=(10, 60), decrease_factor=0.5, latency_factor=2.0,
+                 cooldown=1.0, metrics=None):
+        self.session = session
+        if isinstance(session, RateLimitedSession):
+            self.limiter, self.transport = session.limiter, session.session
+        else:
+            self.limiter, self.transport = None, session
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(initial_concurrency or max(min_concurrency, max_concurrency // 2))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.metrics = metrics
+
+        self.in_flight = 0
+        self.latency = None         # moving average of successful request latency
+        self.best_latency = None
+        self.last_decrease = 0.0
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'timeouts': 0, 'gave_up': 0,
+                      'decreases': 0, 'peak_limit': int(self.limit)}
+
+    def _acquire(self):
+        with self.condition:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self.condition.wait(timeout=wait if wait > 0 else None)
+
+    def _decrease(self, now):
+        if now - self.last_decrease >= self.cooldown:
+            self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+            self.last_decrease = now
+            self.stats['decreases'] += 1
+
+    def _release(self, latency=None, throttled=False):
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.stats['throttled'] += 1
+                self._decrease(now)
+            elif latency is not None:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                self.best_latency = min(self.best_latency or self.latency, self.latency)
+                if self.latency > self.best_latency * self.latency_factor:
+                    self._decrease(now)
+                elif self.limit < self.max_concurrency:
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                    self.stats['peak_limit'] = max(self.stats['peak_limit'], int(self.limit))
+            self.condition.notify_all()
+
+    def _pause(self, seconds):
+        """Hold back every request for a server-requested pause"""
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def _count(self, stat, metric=None, **labels):
+        with self.condition:
+            self.stats[stat] += 1
+        if metric and self.metrics is not None:
+            self.metrics.inc(metric, **labels)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire(url)
+            self._acquire()
+            start = time.monotonic()
+            response = None
+            try:
+                response = self.transport.request(method, url, **kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                self._release(throttled=True)
+                if isinstance(e, requests.exceptions.Timeout):
+                    self._count('timeouts')
+                reason = type(e).__name__
+            except Exception:
+                self._release()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    self._release(latency=time.monotonic() - start)
+                    self._count('requests')
+                    return response
+                self._release(throttled=True)
+                reason = str(response.status_code)
+
+            self._count('requests')
+            if attempt == self.max_retries:
+                break
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                delay = min(self.max_backoff, max(delay, retry_after))
+                self._pause(delay)
+            self._count('retries', 'retries', reason=reason)
+            time.sleep(delay)
+
+        self._count('gave_up', 'gave_up', reason=reason)
+        raise TransientFetchError(f"{method} {url} still failing after {self.max_retries} retries ({reason})")
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def summary(self):
+        stats = self.stats
+        return (f"concurrency {self.limit:.1f} (peak {stats['peak_limit']}, {stats['decreases']} decreases), "
+                f"{stats['retries']} retries, {stats['throttled']} throttled/failed attempts, "
+                f"{stats['gave_up']} given up")
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+def fetch_concurrently(items, fetch_fn, workers=4):
+    """Run fetch_fn over items on a thread pool, returning results in input order"""
+    if workers <= 1:
+        return [fetch_fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch_fn, items))
@@ -0,0 +1,141 @@
+# scripts/http_cache.py
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class CacheMissError(requests.exceptions.ConnectionError):
+    """Raised in cache-only mode when a URL has never been downloaded"""
+
+
+class CachedSession:
+    """Persistent, URL-keyed response cache wrapped around a requests session
+
+    Bodies are stored gzip-compressed next to a small JSON metadata file.
+    Cached entries are revalidated with If-None-Match / If-Modified-Since, so
+    an unchanged page costs one 304 and is served from disk. With
+    ``offline=True`` no request ever reaches the network.
+    """
+
+    def __init__(self, session, cache_dir, offline=False, max_age=None):
+        self.session = session
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.max_age = max_age
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0}
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        folder = f"{self.cache_dir}/{key[:2]}"
+        return folder, f"{folder}/{key}.json", f"{folder}/{key}.body.gz"
+
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def load_entry(self, url):
+        """Return (metadata, body) for a cached URL, or None"""
+        _, meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with gzip.open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return meta, body
+
+    def store_entry(self, url, response):
+        """Write a successful response to disk"""
+        folder, meta_path, body_path = self._paths(url)
+        os.makedirs(folder, exist_ok=True)
+        meta = {
+            'url': url,
+            'status': response.status_code,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+        }
+
+        # Write body first so a metadata file always has a complete body
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(body_path + tmp_suffix, 'wb') as f:
+            f.write(response.content)
+        os.replace(body_path + tmp_suffix, body_path)
+        with open(meta_path + tmp_suffix, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + tmp_suffix, meta_path)
+        self._count('stored')
+
+    def touch_entry(self, url, meta, response):
+        """Refresh validators and fetch time after a 304"""
+        _, meta_path, _ = self._paths(url)
+        meta['etag'] = response.headers.get('ETag', meta.get('etag'))
+        meta['last_modified'] = response.headers.get('Last-Modified', meta.get('last_modified'))
+        meta['fetched_at'] = time.time()
+        tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def build_response(self, url, meta, body):
+        """Turn a cache entry back into a requests.Response"""
+        response = requests.Response()
+        response.status_code = meta.get('status', 200)
+        response._content = body
+        response.headers = CaseInsensitiveDict(meta.get('headers', {}))
+        response.encoding = meta.get('encoding')
+        response.url = url
+        response.from_cache = True
+        return response
+
+    def request(self, method, url, **kwargs):
+        if method.upper() != 'GET':
+            return self.session.request(method, url, **kwargs)
+
+        entry = self.load_entry(url)
+        if entry is not None:
+            meta, body = entry
+            fresh = self.max_age is not None and time.time() - meta.get('fetched_at', 0) < self.max_age
+            if self.offline or fresh:
+                self._count('hits')
+                return self.build_response(url, meta, body)
+        elif self.offline:
+            self._count('misses')
+            raise CacheMissError(f"Not in cache (offline mode): {url}")
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.session.request(method, url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self._count('revalidated')
+            self.touch_entry(url, meta, response)
+            return self.build_response(url, meta, body)
+
+        self._count('misses')
+        if response.status_code == 200:
+            self.store_entry(url, response)
+        response.from_cache = False
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
@@ -0,0 +1,96 @@
+# scripts/jsonl_shards.py
+import glob
+import json
+import os
+
+
+class ShardedJsonlWriter:
+    """Write records as JSON lines, rolling to a new shard by record count or size
+
+    Shards are named ``<prefix>-NNNNN.jsonl``; a shard is written under a
+    ``.tmp`` name and renamed when closed, so readers only ever see complete
+    shards. ``manifest.json`` lists the finished shards and their counts.
+    Opening a writer deletes the prefix's shards from any earlier run, so a
+    smaller rerun never leaves stale records behind for the readers.
+    """
+
+    def __init__(self, out_dir, prefix, shard_records=10000, shard_bytes=64 * 1024 * 1024):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.shard_records = shard_records
+        self.shard_bytes = shard_bytes
+        self.shards = []
+        self.total_records = 0
+        self.total_bytes = 0
+        self._file = None
+        self._shard_number = 0
+        self._shard_count = 0
+        self._shard_size = 0
+        os.makedirs(out_dir, exist_ok=True)
+        for path in glob.glob(f"{glob.escape(out_dir)}/{glob.escape(prefix)}-[0-9][0-9][0-9][0-9][0-9].jsonl*"):
+            os.remove(path)
+
+    def _shard_path(self, number):
+        return f"{self.out_dir}/{self.prefix}-{number:05d}.jsonl"
+
+    def _open_shard(self):
+        self._file = open(self._shard_path(self._shard_number) + '.tmp', 'wb')
+        self._shard_count = 0
+        self._shard_size = 0
+
+    def _close_shard(self):
+        if self._file is None:
+            return
+        self._file.close()
+        path = self._shard_path(self._shard_number)
+        os.replace(path + '.tmp', path)
+        self.shards.append({'file': os.path.basename(path), 'records': self._shard_count,
+                            'bytes': self._shard_size})
+        self._file = None
+        self._shard_number += 1
+
+    def write(self, record):
+        """Append one record and return the number of bytes written"""
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        if self._file is not None and (self._shard_count >= self.shard_records
+                                       or self._shard_size + len(line) > self.shard_bytes):
+            self._close_shard()
+        if self._file is None:
+            self._open_shard()
+        self._file.write(line)
+        self._shard_count += 1
+        self._shard_size += len(line)
+        self.total_records += 1
+        self.total_bytes += len(line)
+        return len(line)
+
+    def close(self):
+        """Finish the last shard and write the manifest"""
+        self._close_shard()
+        manifest = {'prefix': self.prefix, 'records': self.total_records,
+                    'bytes': self.total_bytes, 'shards': self.shards}
+        with open(f"{self.out_dir}/manifest.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_jsonl_shards(path):
+    """Stream records from a shard file, a directory of shards, or a glob pattern"""
+    if os.path.isdir(path):
+        paths = sorted(glob.glob(f"{path}/*.jsonl"))
+    elif any(ch in path for ch in '*?['):
+        paths = sorted(glob.glob(path))
+    else:
+        paths = [path]
+
+    for shard_path in paths:
+        with open(shard_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
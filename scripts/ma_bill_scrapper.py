@@ -1,24 +1,115 @@
 # scripts/ma_bill_scraper.py
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+from bs4 import BeautifulSoup, SoupStrainer
 import time
 import re
-import json
 import os
+import sys
+import argparse
 from datetime import datetime
 
+from bill_index import BillIndex
+from corpus_store import CorpusStore
+from http_cache import CachedSession
+from metadata_table import MetadataTable, metadata_row
+from fetch_engine import FetchController, HostRateLimiter, RateLimitedSession, TransientFetchError, fetch_concurrently
+from scrape_pipeline import ScrapePipeline
+from checkpoint import ScrapeCheckpoint
+from text_url_resolver import TextUrlResolver
+from text_store import TextStore
+from near_duplicates import DEDUP_DIR, NearDuplicateIndex
+from pdf_extractor import PdfExtractionStage
+from citation_graph import CITATIONS_DIR, CitationGraph
+from scrape_metrics import ScrapeMetrics
+from catalog import CATALOG_PATH, Catalog, ma_row
+from corpus_reader import MA_DATA_DIR
+
+# Link labels looked up on every bill detail page, in strategy order
+TEXT_LINK_LABELS = ('View Text', 'Print Preview', 'Download PDF')
+
+# text_source values that mean full_text holds real bill text
+TEXT_SOURCES = ('view_text', 'print_preview', 'direct_page')
+
+def has_bill_text(bill):
+    """True when full_text is real bill text: a text source, or a PDF whose text was extracted"""
+    source = bill.get('text_source')
+    return source in TEXT_SOURCES or (source == 'pdf' and bool(bill.get('text_length')))
+
+# Search refinement label of the session scraped when none is selected
+DEFAULT_SESSION_LABEL = "194th (Current)"
+
+def session_ordinal(label):
+    """The session ("193rd") named by a General Court label or ordinal"""
+    match = re.search(r'(\d+)(?:st|nd|rd|th)', label or '')
+    return match.group(0) if match else None
+
+def session_code(label):
+    """Search refinement value for a session label: the label's UTF-8 bytes in hex"""
+    return label.encode('utf-8').hex()
+
+def general_court_name(label):
+    """general_court field for bills of a session, e.g. "193rd (2023-2024)"
+    
+    Past sessions carry their years in the label; the current one is labelled
+    "(Current)", so its years follow from the two-year session cycle.
+    """
+    ordinal = session_ordinal(label)
+    years = re.findall(r'\d{4}', label)
+    if len(years) >= 2:
+        first, last = int(years[0]), int(years[-1])
+    else:
+        first = 2023 + 2 * (int(ordinal[:-2]) - 193)
+        last = first + 1
+    return f"{ordinal} ({first}-{last})"
+
+# Partial-parse filters: only build the tree for elements we actually read
+SEARCH_RESULTS_ONLY = SoupStrainer('table')
+LINKS_ONLY = SoupStrainer('a', href=True)
+
+def default_parser():
+    """Prefer the lxml backend, falling back to the stdlib parser"""
+    try:
+        import lxml  # noqa: F401
+        return 'lxml'
+    except ImportError:
+        return 'html.parser'
+
 class MABillScraper:
-    def __init__(self):
+    def __init__(self, requests_per_sec=2.0, max_workers=8, use_cache=True, offline=False, cache_dir=None,
+                 parser=None, metadata_format='csv', write_text_files=False, quiet=False, metrics_path=None,
+                 max_retries=4, requeue_rounds=2, requeue_delay=10.0, session_label=DEFAULT_SESSION_LABEL,
+                 data_dir=MA_DATA_DIR, catalog_path=CATALOG_PATH, dedup_dir=DEDUP_DIR, citations_dir=CITATIONS_DIR):
         self.base_url = "https://malegislature.gov"
-        self.session = requests.Session()
+        self.parser = parser or default_parser()
+        self.max_workers = max_workers
+        
+        # General Court session whose search results are listed
+        self.use_session(session_label)
+        
+        # Counters and stage latencies; quiet mode drops the per-bill progress lines
+        self.metrics = ScrapeMetrics(quiet=quiet)
+        self.metrics_path = metrics_path
+        
+        # All requests share one connection pool and a per-host token bucket; the fetch
+        # controller adapts concurrency to the site's latency and 429/5xx rate and retries
+        self.rate_limiter = HostRateLimiter(requests_per_sec)
+        self.fetch_controller = FetchController(
+            RateLimitedSession(requests.Session(), self.rate_limiter, pool_size=max_workers),
+            max_concurrency=max_workers, max_retries=max_retries, metrics=self.metrics)
+        self.session = self.fetch_controller
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
         
+        # Bills whose fetches kept failing transiently get this many more rounds instead of an error record
+        self.requeue_rounds = requeue_rounds
+        self.requeue_delay = requeue_delay
+        
         # Set up data directories
-        self.data_dir = "data/states/massachusetts"
+        self.data_dir = data_dir
         self.raw_dir = f"{self.data_dir}/raw"
+        self.corpus_dir = f"{self.data_dir}/corpus"
+        self.texts_dir = f"{self.data_dir}/texts"
         self.processed_dir = f"{self.data_dir}/processed"
         
         # Create directories if they don't exist
@@ -26,72 +117,96 @@ class MABillScraper:
         os.makedirs(self.processed_dir, exist_ok=True)
         os.makedirs(f"{self.processed_dir}/individual_bills", exist_ok=True)
         os.makedirs(f"{self.processed_dir}/text_files", exist_ok=True)
+        
+        # Persistent response cache in front of the rate-limited session;
+        # offline mode serves everything from it without touching the network
+        self.http_cache = None
+        if use_cache or offline:
+            self.http_cache = CachedSession(self.session, cache_dir or f"{self.data_dir}/http_cache", offline=offline)
+            self.session = self.http_cache
+        
+        # Incremental metadata table (no full text), deduplicated by bill ID
+        self.metadata = MetadataTable(f"{self.processed_dir}/metadata", file_format=metadata_format)
+        
+        # Bill records live in a sharded append-only store instead of one JSON file per bill
+        self.store = CorpusStore(self.corpus_dir)
+        
+        # Full texts are stored once per distinct content, compressed; records keep the hash
+        self.text_store = TextStore(self.texts_dir)
+        self.write_text_files = write_text_files
+        
+        # MinHash signatures of saved texts flag refiled and near-identical bills as they arrive
+        self.near_duplicates = NearDuplicateIndex(dedup_dir)
+        
+        # Statute and bill references of every saved text, for reverse lookups
+        self.citations = CitationGraph(citations_dir)
+        
+        # Indexed metadata of every saved bill, committed in batches
+        self.catalog = Catalog(catalog_path)
+        
+        # Learned detail_url -> text_url templates let us skip most detail pages
+        self.text_url_resolver = TextUrlResolver(f"{self.data_dir}/text_url_templates.json")
+        if not self.text_url_resolver.templates:
+            self.text_url_resolver.learn_from_records(self.store.iter_records())
+        
+        # Load the bill-ID index once instead of rescanning raw/ per row
+        self.bill_index = BillIndex(self.data_dir, self.raw_dir, f"{self.processed_dir}/text_files", store=self.store)
     
     def get_existing_bill_ids(self):
         """Get set of all bill IDs that have already been scraped"""
-        existing_ids = set()
-        
-        if os.path.exists(self.raw_dir):
-            for filename in os.listdir(self.raw_dir):
-                if filename.endswith('.json'):
-                    # Extract bill ID from filename: "194th_H_2212.json" -> "H.2212"
-                    match = re.match(r'(\w+)_([HS][D_]?\d+)\.json', filename)
-                    if match:
-                        session, bill_num = match.groups()
-                        # Convert back to original format: "H_2212" -> "H.2212"
-                        bill_id = bill_num.replace('_', '.')
-                        existing_ids.add(bill_id)
-        
-        return existing_ids
+        return self.bill_index.bill_ids()
 
     def should_scrape_bill(self, bill_data):
         """Check if we should scrape this bill (not already exists)"""
-        existing_ids = self.get_existing_bill_ids()
-        return bill_data['number'] not in existing_ids
+        if self.bill_index.has_bill(bill_data['number'], self.bill_session(bill_data)):
+            return False
+        # The store is authoritative if the index missed a save before a crash
+        return self.record_key(bill_data) not in self.store
+
+    def iter_existing_bills(self):
+        """Stream all existing bills from the corpus store"""
+        return self.store.iter_records()
 
     def load_existing_bills(self):
-        """Load all existing bills from raw directory"""
-        existing_bills = []
-        
-        if os.path.exists(self.raw_dir):
-            for filename in os.listdir(self.raw_dir):
-                if filename.endswith('.json'):
-                    filepath = os.path.join(self.raw_dir, filename)
-                    try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            bill_data = json.load(f)
-                            existing_bills.append(bill_data)
-                    except Exception as e:
-                        print(f"⚠️ Error loading {filename}: {e}")
-        
-        return existing_bills
+        """Load all existing bills from the corpus store"""
+        return list(self.iter_existing_bills())
 
-    def get_existing_text_files(self):
-        """Get set of all bill IDs that already have text files"""
-        existing_text = set()
-        text_files_dir = f"{self.processed_dir}/text_files"
-        
-        if os.path.exists(text_files_dir):
-            for filename in os.listdir(text_files_dir):
-                if filename.endswith('.txt'):
-                    # Extract bill ID: "194th_H_2212.txt" -> "H_2212"
-                    match = re.match(r'\w+_([HS][D_]?\d+)\.txt', filename)
-                    if match:
-                        bill_id = match.group(1)  # "H_2212"
-                        existing_text.add(bill_id)
-        
-        return existing_text
+    def parse_html(self, content, parse_only=None):
+        """Parse HTML with the configured backend, optionally keeping only matching elements"""
+        with self.metrics.time('parse'):
+            return BeautifulSoup(content, self.parser, parse_only=parse_only)
+    
+    def fetch(self, url):
+        """GET a page through the session, timing it and counting statuses and bytes downloaded"""
+        try:
+            with self.metrics.time('fetch'):
+                response = self.session.get(url)
+        except Exception:
+            self.metrics.inc('fetch_errors')
+            raise
+        self.metrics.inc('responses', status=response.status_code)
+        if getattr(response, 'from_cache', False):
+            self.metrics.inc('cache_hits')
+        else:
+            self.metrics.inc('bytes_downloaded', len(response.content))
+        return response
+    
+    def export_metrics(self):
+        """Write the metrics snapshot to ``metrics_path`` if one was given"""
+        if self.metrics_path:
+            return self.metrics.export(self.metrics_path)
+        return None
 
     def debug_page_content(self, page_number):
         """Debug what's actually on the page"""
-        url = f"https://malegislature.gov/Bills/Search?SearchTerms=&Page={page_number}&Refinements%5Blawsgeneralcourt%5D=3139347468202843757272656e7429"
+        url = self.search_url(page_number)
         
         print(f"🔍 DEBUG: Checking page {page_number}")
         print(f"🔍 URL: {url}")
         
         try:
             response = self.session.get(url)
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = self.parse_html(response.content)
             
             # Save the page for inspection
             with open(f"debug_page_{page_number}.html", 'w', encoding='utf-8') as f:
@@ -126,73 +241,144 @@ class MABillScraper:
         except Exception as e:
             print(f"❌ Debug error: {e}")
 
+    def use_session(self, label):
+        """List bills of the session with this search refinement label, e.g. '193rd (2023 - 2024)'"""
+        if not session_ordinal(label):
+            raise ValueError(f"Not a General Court session label: {label!r}")
+        self.session_label = label
+        self.session_id = session_ordinal(label)
+        self.general_court = general_court_name(label)
+
+    def discover_sessions(self):
+        """{"193rd": label} of every session offered by the search page's General Court filter, newest first"""
+        response = self.fetch(f"{self.base_url}/Bills/Search?SearchTerms=")
+        soup = self.parse_html(response.content)
+        values = []
+        for link in soup.find_all('a', href=True):
+            match = re.search(r'lawsgeneralcourt(?:%5D|\])=([^&"#]+)', link['href'])
+            if match:
+                values.append(requests.utils.unquote(match.group(1)))
+        for field in soup.find_all('input', attrs={'name': re.compile('lawsgeneralcourt')}):
+            if field.get('value'):
+                values.append(field['value'])
+        
+        sessions = {}
+        for value in values:
+            try:
+                label = bytes.fromhex(value).decode('utf-8')
+            except ValueError:
+                label = value   # a plain label rather than its hex code
+            if session_ordinal(label):
+                sessions.setdefault(session_ordinal(label), label)
+        return dict(sorted(sessions.items(), key=lambda item: -int(item[0][:-2])))
+
+    def select_session(self, session):
+        """Switch to a session given as "193rd", "193" or a full label, resolving it via the search page"""
+        if '(' in session:
+            self.use_session(session)
+            return self.session_label
+        ordinal = session_ordinal(session) or session_ordinal(f"{session}th")
+        sessions = self.discover_sessions()
+        if ordinal not in sessions and ordinal is not None:
+            # "193" was given without a suffix: match on the number alone
+            ordinal = next((known for known in sessions if known[:-2] == ordinal[:-2]), ordinal)
+        if ordinal in sessions:
+            self.use_session(sessions[ordinal])
+        elif ordinal == session_ordinal(DEFAULT_SESSION_LABEL):
+            self.use_session(DEFAULT_SESSION_LABEL)
+        else:
+            raise ValueError(f"Unknown session {session!r}; the search page offers: "
+                             f"{', '.join(sessions) or 'none found'}")
+        return self.session_label
+
+    def page_count(self):
+        """Number of search result pages for the session, from the pagination links (None if there are none)"""
+        response = self.fetch(self.search_url(1))
+        soup = self.parse_html(response.content, parse_only=LINKS_ONLY)
+        pages = [int(match.group(1)) for link in soup.find_all('a', href=True)
+                 for match in [re.search(r'[?&]Page=(\d+)', link['href'])] if match]
+        return max(pages) if pages else None
+
+    def search_url(self, page_number):
+        """Build the search results URL for a page of the selected session's bills"""
+        return (f"{self.base_url}/Bills/Search?SearchTerms=&Page={page_number}"
+                f"&Refinements%5Blawsgeneralcourt%5D={session_code(self.session_label)}")
+
     def scrape_basic_bill_info(self, start_page=1, end_page=2, skip_existing=True):
-        """Get basic bill information from search results - 194th ONLY"""
+        """Get basic bill information from search results of the selected session only"""
         all_bills = []
         
         # Get existing bills to skip duplicates
         if skip_existing:
-            existing_ids = self.get_existing_bill_ids()
-            print(f"🔄 Found {len(existing_ids)} existing bills, skipping duplicates")
+            print(f"🔄 Found {len(self.bill_index)} existing bills, skipping duplicates")
         
         for page in range(start_page, end_page + 1):
-            print(f"📄 Getting basic info from page {page} (194th session only)...")
+            page_result = self.scrape_search_page(page, skip_existing=skip_existing, save=True)
+            if page_result is None:
+                continue
             
-            url = f"https://malegislature.gov/Bills/Search?SearchTerms=&Page={page}&Refinements%5Blawsgeneralcourt%5D=3139347468202843757272656e7429"
+            page_bills, skipped_bills_count = page_result
+            all_bills.extend(page_bills)
             
-            try:
-                response = self.session.get(url)
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                table = soup.find('table')
-                if not table:
-                    print("❌ No table found on page")
-                    continue
-                
-                rows = table.find_all('tr')
-                print(f"🔍 Found {len(rows)} total rows in table")
-                
-                # Process all rows and let extract_basic_info handle filtering
-                page_bills = []
-                new_bills_count = 0
-                skipped_bills_count = 0
-                error_count = 0
-                
-                for i, row in enumerate(rows):
-                    bill_data = self.extract_basic_info(row)
-                    if bill_data:
-                        # Check if we should scrape this bill
-                        if skip_existing and not self.should_scrape_bill(bill_data):
-                            skipped_bills_count += 1
-                            print(f"  ⏭️  Skipping {bill_data['number']} (already exists)")
-                            continue
-                        
-                        # Save each bill immediately
-                        self.save_bill_data(bill_data)
-                        page_bills.append(bill_data)
-                        new_bills_count += 1
-                        print(f"  ✅ {bill_data['number']}")
-                    else:
-                        error_count += 1
-                
-                all_bills.extend(page_bills)
-                # Save progress after each page
-                self.save_progress(page, len(page_bills))
-                
-                print(f"  📊 Page {page}: {new_bills_count} new bills, {skipped_bills_count} skipped, {error_count} errors")
-                
-                # Stop if no new bills found on page
-                if new_bills_count == 0 and skipped_bills_count > 0:
-                    print(f"💡 No new bills found on page {page}, you may have reached the end")
-                    break
-                
-                time.sleep(1)
-                
-            except Exception as e:
-                print(f"❌ Error on page {page}: {e}")
+            # Stop if no new bills found on page
+            if not page_bills and skipped_bills_count > 0:
+                print(f"💡 No new bills found on page {page}, you may have reached the end")
+                break
         
+        # No per-page sleep: every request already waits on the per-host token bucket
         return all_bills
 
+    def scrape_search_page(self, page, skip_existing=True, save=True):
+        """Get the new bills listed on one search results page
+        
+        Returns (new_bills, skipped_count), or None if the page could not be read.
+        """
+        print(f"📄 Getting basic info from page {page} ({self.session_id} session only)...")
+        
+        try:
+            response = self.fetch(self.search_url(page))
+            soup = self.parse_html(response.content, parse_only=SEARCH_RESULTS_ONLY)
+            
+            table = soup.find('table')
+            if not table:
+                print("❌ No table found on page")
+                return None
+            
+            rows = table.find_all('tr')
+            print(f"🔍 Found {len(rows)} total rows in table")
+            
+            # Process all rows and let extract_basic_info handle filtering
+            page_bills = []
+            skipped_bills_count = 0
+            error_count = 0
+            
+            for row in rows:
+                bill_data = self.extract_basic_info(row)
+                if bill_data:
+                    # Check if we should scrape this bill
+                    if skip_existing and not self.should_scrape_bill(bill_data):
+                        skipped_bills_count += 1
+                        self.metrics.log(f"  ⏭️  Skipping {bill_data['number']} (already exists)")
+                        continue
+                    
+                    # Save each bill immediately
+                    if save:
+                        self.save_bill_data(bill_data)
+                    page_bills.append(bill_data)
+                    self.metrics.log(f"  ✅ {bill_data['number']}")
+                else:
+                    error_count += 1
+            
+            # Save progress after each page
+            self.save_progress(page, len(page_bills))
+            
+            print(f"  📊 Page {page}: {len(page_bills)} new bills, {skipped_bills_count} skipped, {error_count} errors")
+            return page_bills, skipped_bills_count
+            
+        except Exception as e:
+            print(f"❌ Error on page {page}: {e}")
+            return None
+
     def extract_basic_info(self, row):
         """Extract basic bill info from table row"""
         try:
@@ -229,8 +415,8 @@ class MABillScraper:
             if title_link:
                 bill['title'] = title_link.get_text(strip=True)
             
-            # Since we're filtering for 194th session only
-            bill['general_court'] = "194th (2023-2024)"
+            # Search results are filtered to the selected session
+            bill['general_court'] = self.general_court
             
             return bill
             
@@ -238,34 +424,79 @@ class MABillScraper:
             print(f"⚠️ Error extracting basic info: {e}")
             return None
 
+    def bill_session(self, bill_data):
+        """Extract the session ("194th") from the general_court field"""
+        session_match = re.search(r'(\d+)(?:st|nd|rd|th)', bill_data.get('general_court', ''))
+        return session_match.group(0) if session_match else "unknown_session"
+
+    def record_key(self, bill_data):
+        """Corpus store key for a bill, e.g. MA_194th_H_2212"""
+        return f"MA_{self.bill_session(bill_data)}_{bill_data['number'].replace('.', '_')}"
+
     def save_bill_data(self, bill_data):
-        """Save bill data to organized raw data folder"""
+        """Save bill data to the corpus store, returning its record key"""
+        with self.metrics.time('save'):
+            return self._save_bill_data(bill_data)
+    
+    def _save_bill_data(self, bill_data):
         try:
-            # Extract session from general_court field
-            session_match = re.search(r'(\d+)(?:st|nd|rd|th)', bill_data.get('general_court', ''))
-            session = session_match.group(0) if session_match else "unknown_session"
-            
-            bill_id = bill_data['number'].replace('.', '_')
-            filename = f"{self.raw_dir}/{session}_{bill_id}.json"
+            session = self.bill_session(bill_data)
+            key = self.record_key(bill_data)
             
             # Add metadata
             bill_data['metadata'] = {
-                'scraped_at': datetime.now().isoformat(),
+                'scraped_at': (bill_data.get('metadata') or {}).get('scraped_at') or datetime.now().isoformat(),
                 'session': session,
-                'bill_id': f"MA_{session}_{bill_id}",
+                'bill_id': key,
                 'data_version': '1.0'
             }
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(bill_data, f, indent=2, ensure_ascii=False)
-            
-            print(f"💾 Saved {bill_data['number']} to {filename}")
-            return filename
+            # The record holds only the content hash of real bill text
+            record = dict(bill_data)
+            text = record.pop('full_text', None)
+            if text and has_bill_text(bill_data):
+                bill_data['text_hash'] = record['text_hash'] = self.text_store.put(text)
+                record['text_bytes'] = len(text.encode('utf-8'))
+                if len(text) > 1000:
+                    self.bill_index.mark_text(bill_data['number'], session)
+                self.citations.add_document(key, text, session)
+                matches = self.near_duplicates.check(key, text, 'ma', bill_data.get('text_source', ''))
+                if matches:
+                    duplicate_of, similarity = matches[0]
+                    bill_data['near_duplicate_of'] = record['near_duplicate_of'] = duplicate_of
+                    bill_data['near_duplicate_similarity'] = record['near_duplicate_similarity'] = round(similarity, 3)
+                    self.metrics.log(f"🔁 {bill_data['number']} is a near-duplicate of {duplicate_of} ({similarity:.0%})")
+            elif text:
+                record['full_text'] = text
+            
+            self.store.put(key, record)
+            self.bill_index.add_bill(bill_data['number'], session)
+            self.catalog.upsert(ma_row(key, record, len(text) if text and has_bill_text(bill_data) else 0))
+            
+            self.metrics.inc('saved')
+            self.metrics.log(f"💾 Saved {bill_data['number']} as {key}")
+            return key
             
         except Exception as e:
-            print(f"❌ Error saving bill data: {e}")
+            self.metrics.inc('save_errors')
+            self.metrics.log(f"❌ Error saving bill data: {e}")
             return None
 
+    def get_bill_text(self, bill_id):
+        """Plain full text for a record key ("MA_194th_H_2212") or bill number ("H.2212")"""
+        record = self.store.get(bill_id)
+        if record is None:
+            # A bare bill number: try each session it was scraped in
+            for session in sorted(self.bill_index.bills.get(bill_id, ())):
+                record = self.store.get(f"MA_{session}_{bill_id.replace('.', '_')}")
+                if record is not None:
+                    break
+        if record is None:
+            return None
+        if record.get('text_hash'):
+            return self.text_store.get(record['text_hash'])
+        return record.get('full_text')
+
     def save_progress(self, page, bills_count):
         """Track scraping progress"""
         progress_file = f"{self.data_dir}/progress_log.csv"
@@ -278,18 +509,53 @@ class MABillScraper:
         # Log progress
         with open(progress_file, 'a') as f:
             f.write(f"{datetime.now()},{page},{bills_count}\n")
+        
+        # Persist newly seen bill IDs alongside the progress log
+        self.bill_index.save()
     
     def get_bill_text_final(self, bill_info):
-        """Get bill text using the exact links we found in debug"""
-        print(f"  📖 Getting text for {bill_info['number']}...")
+        """Get bill text using the exact links we found in debug, counting the outcome per text_source"""
+        with self.metrics.time('bill_text'):
+            bill_info = self.find_bill_text(bill_info)
+        text_source = bill_info.get('text_source') or 'unknown'
+        self.metrics.inc('bills', text_source=text_source)
+        self.metrics.inc('text_chars', bill_info.get('text_length') or 0, text_source=text_source)
+        return bill_info
+    
+    def try_bill_text(self, bill_info):
+        """get_bill_text_final, or None when the site kept failing transiently and the bill should be requeued"""
+        try:
+            return self.get_bill_text_final(bill_info)
+        except TransientFetchError as e:
+            self.metrics.inc('requeued')
+            self.metrics.log(f"    ⏳ Requeued {bill_info['number']}: {e}")
+            return None
+    
+    def find_bill_text(self, bill_info):
+        """Try the predicted text URL, then each text link strategy in order"""
+        self.metrics.log(f"  📖 Getting text for {bill_info['number']}...")
         
         try:
+            # Shortcut: go straight to the predicted text page, skipping the detail page
+            predicted_url = self.text_url_resolver.predict(bill_info['detail_url'])
+            if predicted_url:
+                text = self.get_text_from_url(predicted_url)
+                hit = len(text) > 500
+                self.text_url_resolver.record_result(hit)
+                if hit:
+                    bill_info['full_text'] = text
+                    bill_info['text_source'] = 'view_text'
+                    bill_info['text_url'] = predicted_url
+                    bill_info['text_length'] = len(text)
+                    self.metrics.log(f"    ✅ Got {len(text)} chars from predicted View Text URL")
+                    return bill_info
+            
             # First, get the detail page to find the text links
-            response = self.session.get(bill_info['detail_url'])
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = self.fetch(bill_info['detail_url'])
+            links = self.build_link_index(self.parse_html(response.content, parse_only=LINKS_ONLY))
             
             # Strategy 1: Try "View Text" link first (usually the cleanest)
-            view_text_url = self.find_text_link(soup, 'View Text')
+            view_text_url = links.get('View Text')
             if view_text_url:
                 text = self.get_text_from_url(view_text_url)
                 if len(text) > 500:
@@ -297,11 +563,12 @@ class MABillScraper:
                     bill_info['text_source'] = 'view_text'
                     bill_info['text_url'] = view_text_url
                     bill_info['text_length'] = len(text)
-                    print(f"    ✅ Got {len(text)} chars from View Text")
+                    self.text_url_resolver.learn(bill_info['detail_url'], view_text_url)
+                    self.metrics.log(f"    ✅ Got {len(text)} chars from View Text")
                     return bill_info
             
             # Strategy 2: Try "Print Preview" link
-            print_url = self.find_text_link(soup, 'Print Preview')
+            print_url = links.get('Print Preview')
             if print_url:
                 text = self.get_text_from_url(print_url)
                 if len(text) > 500:
@@ -309,64 +576,82 @@ class MABillScraper:
                     bill_info['text_source'] = 'print_preview'
                     bill_info['text_url'] = print_url
                     bill_info['text_length'] = len(text)
-                    print(f"    ✅ Got {len(text)} chars from Print Preview")
+                    self.metrics.log(f"    ✅ Got {len(text)} chars from Print Preview")
                     return bill_info
             
             # Strategy 3: Try PDF link (we'll just record it exists)
-            pdf_url = self.find_text_link(soup, 'Download PDF')
+            pdf_url = links.get('Download PDF')
             if pdf_url:
                 bill_info['full_text'] = f"PDF available at: {pdf_url}"
                 bill_info['text_source'] = 'pdf'
                 bill_info['text_url'] = pdf_url
                 bill_info['text_length'] = 0
-                print(f"    📎 PDF available: {pdf_url}")
+                self.metrics.log(f"    📎 PDF available: {pdf_url}")
                 return bill_info
             
-            # Strategy 4: Fallback to direct page text
-            direct_text = self.extract_direct_text(soup)
+            # Strategy 4: Fallback to direct page text (needs the full tree)
+            soup = self.parse_html(response.content)
+            with self.metrics.time('clean'):
+                direct_text = self.extract_direct_text(soup)
             if len(direct_text) > 500:
                 bill_info['full_text'] = direct_text
                 bill_info['text_source'] = 'direct_page'
                 bill_info['text_url'] = bill_info['detail_url']
                 bill_info['text_length'] = len(direct_text)
-                print(f"    ✅ Got {len(direct_text)} chars from direct page")
+                self.metrics.log(f"    ✅ Got {len(direct_text)} chars from direct page")
                 return bill_info
             
             # If all strategies fail
             bill_info['full_text'] = "Could not extract bill text"
             bill_info['text_source'] = 'failed'
             bill_info['text_length'] = 0
-            print(f"    ❌ Could not extract text")
+            self.metrics.log(f"    ❌ Could not extract text")
             return bill_info
             
+        except TransientFetchError:
+            raise   # the site is struggling, not the bill: let the caller requeue it
         except Exception as e:
-            print(f"    ❌ Error: {e}")
+            self.metrics.log(f"    ❌ Error: {e}")
             bill_info['full_text'] = f"Error: {str(e)}"
             bill_info['text_source'] = 'error'
             bill_info['text_length'] = 0
             return bill_info
     
+    def build_link_index(self, soup, labels=TEXT_LINK_LABELS):
+        """Map each label to the first link whose text contains it, in a single pass over <a> tags"""
+        found = {}
+        wanted = [(label, label.lower()) for label in labels]
+        for link in soup.find_all('a', href=True):
+            link_text = link.get_text().lower()
+            for label, needle in wanted:
+                if label not in found and needle in link_text:
+                    href = link['href']
+                    found[label] = self.base_url + href if href.startswith('/') else href
+            if len(found) == len(wanted):
+                break
+        return found
+    
     def find_text_link(self, soup, link_text):
         """Find specific text links like 'View Text', 'Print Preview', 'Download PDF'"""
-        for link in soup.find_all('a', href=True):
-            if link_text.lower() in link.get_text().lower():
-                href = link['href']
-                full_url = self.base_url + href if href.startswith('/') else href
-                return full_url
-        return None
+        return self.build_link_index(soup, (link_text,)).get(link_text)
     
     def get_text_from_url(self, url):
         """Get text from a specific URL (View Text, Print Preview, etc.)"""
         try:
-            response = self.session.get(url)
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = self.fetch(url)
+            if response.status_code != 200:
+                return ""
+            soup = self.parse_html(response.content)
             
             # Clean the text
-            text = self.extract_clean_text(soup)
+            with self.metrics.time('clean'):
+                text = self.extract_clean_text(soup)
             return text
             
+        except TransientFetchError:
+            raise
         except Exception as e:
-            print(f"      ⚠️ Error getting text from {url}: {e}")
+            self.metrics.log(f"      ⚠️ Error getting text from {url}: {e}")
             return ""
     
     def extract_clean_text(self, soup):
@@ -426,41 +711,65 @@ class MABillScraper:
         
         return text.strip()
     
-    def scrape_with_text(self, bills, sample_size=None, skip_existing=True):
+    def scrape_with_text(self, bills, sample_size=None, skip_existing=True, workers=1):
         """Get text for bills, skipping those that already have text"""
         if sample_size is None:
             sample_size = len(bills)
         
         # Check for existing text files
         if skip_existing:
-            existing_text_files = self.get_existing_text_files()
             bills_to_process = []
             for bill in bills[:sample_size]:
-                bill_id = f"{bill['number'].replace('.', '_')}"
-                if bill_id not in existing_text_files:
+                if not self.bill_index.has_text(bill['number'], self.bill_session(bill)):
                     bills_to_process.append(bill)
                 else:
-                    print(f"  ⏭️  Skipping {bill['number']} (text already exists)")
+                    self.metrics.log(f"  ⏭️  Skipping {bill['number']} (text already exists)")
             
             print(f"🔍 Getting text for {len(bills_to_process)} bills (skipped {sample_size - len(bills_to_process)} with existing text)...")
         else:
             bills_to_process = bills[:sample_size]
             print(f"🔍 Getting text for {len(bills_to_process)} bills...")
         
-        results = []
-        successful = 0
+        start_time = time.monotonic()
+        start_requests = self.rate_limiter.total_requests()
         
-        for i, bill in enumerate(bills_to_process):
-            print(f"  {i+1}/{len(bills_to_process)}: ", end="")
-            bill_with_text = self.get_bill_text_final(bill)
-            results.append(bill_with_text)
-            
-            if bill_with_text.get('text_source') in ['view_text', 'print_preview', 'direct_page']:
-                successful += 1
-            
-            time.sleep(1)  # Be respectful
+        if workers > 1:
+            # Overlap request latency; the rate limiter keeps us polite per host
+            workers = min(workers, self.max_workers)
+            print(f"⚡ Fetching with {workers} workers at {self.rate_limiter.requests_per_sec} req/s per host")
+        
+        results = []
+        pending = bills_to_process
+        for round_number in range(self.requeue_rounds + 1):
+            if round_number:
+                print(f"🔁 Requeue round {round_number}: retrying {len(pending)} bills in {self.requeue_delay:.0f}s")
+                time.sleep(self.requeue_delay)
+            if workers > 1:
+                fetched = fetch_concurrently(pending, self.try_bill_text, workers)
+            else:
+                fetched = []
+                for i, bill in enumerate(pending):
+                    self.metrics.log(f"  {i+1}/{len(pending)}: ", end="")
+                    fetched.append(self.try_bill_text(bill))
+            results.extend(bill for bill in fetched if bill is not None)
+            pending = [bill for bill, result in zip(pending, fetched) if result is None]
+            if not pending:
+                break
+        if pending:
+            print(f"⏳ {len(pending)} bills still failing after {self.requeue_rounds} requeue rounds; "
+                  f"not saved, so the next run fetches them again")
+        
+        self.text_url_resolver.save()
+        successful = sum(1 for b in results if b.get('text_source') in TEXT_SOURCES)
+        elapsed = time.monotonic() - start_time
+        requests_made = self.rate_limiter.total_requests() - start_requests
         
         print(f"\n📊 Text extraction results: {successful}/{len(bills_to_process)} successful")
+        print(f"🚦 Fetch controller: {self.fetch_controller.summary()}")
+        if elapsed > 0 and results:
+            print(f"⏱️  {len(results)} bills in {elapsed:.1f}s "
+                  f"({len(results) / elapsed:.2f} bills/s, {requests_made / elapsed:.2f} requests/s, "
+                  f"{requests_made / len(results):.1f} requests/bill)")
         return results
     
     def save_results(self, bills, filename=None):
@@ -469,101 +778,211 @@ class MABillScraper:
             print("No bills to save")
             return
         
-        # Use default filename in processed directory
-        if filename is None:
-            filename = f"{self.processed_dir}/bills_metadata.csv"
-        
-        # Create CSV
-        df = pd.DataFrame(bills)
-        
-        # Reorder columns for better readability
-        preferred_order = ['number', 'title', 'sponsor', 'general_court', 'text_source', 'text_length']
-        existing_columns = [col for col in preferred_order if col in df.columns]
-        other_columns = [col for col in df.columns if col not in preferred_order]
+        # Re-save records so their texts land in the text store
+        text_count = 0
+        keys = []
+        for bill in bills:
+            keys.append(self.save_bill_data(bill))
+            if bill.get('text_hash'):
+                text_count += 1
+        self.catalog.flush()
+        print(f"📚 Stored {text_count} full texts in '{self.texts_dir}'")
         
-        df = df[existing_columns + other_columns]
-        df.to_csv(filename, index=False, encoding='utf-8')
-        print(f"💾 Saved {len(bills)} bills to {filename}")
+        self.write_metadata(bills, filename)
         
-        # Save successful extractions to organized text files
-        successful_bills = [b for b in bills if b.get('full_text') and len(b.get('full_text', '')) > 1000]
-        if successful_bills:
-            text_files_dir = f"{self.processed_dir}/text_files"
-            os.makedirs(text_files_dir, exist_ok=True)
-            
-            for bill in successful_bills:
-                # Extract session for better organization
-                session_match = re.search(r'(\d+)(?:st|nd|rd|th)', bill.get('general_court', ''))
-                session = session_match.group(0) if session_match else "unknown"
-                
-                filename = f"{text_files_dir}/{session}_{bill['number'].replace('.', '_')}.txt"
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(f"Bill: {bill['number']}\n")
-                    f.write(f"Title: {bill.get('title', '')}\n")
-                    f.write(f"Sponsor: {bill.get('sponsor', '')}\n")
-                    f.write(f"General Court: {bill.get('general_court', '')}\n")
-                    f.write(f"Source: {bill.get('text_source', '')}\n")
-                    f.write(f"URL: {bill.get('text_url', bill.get('detail_url', ''))}\n")
-                    f.write("="*60 + "\n\n")
-                    f.write(bill['full_text'])
-            print(f"📁 Saved {len(successful_bills)} full text files to '{text_files_dir}'")
+        # Optionally also save successful extractions as plain text files
+        text_files_dir = f"{self.processed_dir}/text_files"
+        saved_count = sum(1 for bill in bills if self.save_text_file(bill))
+        self.bill_index.save()
+        if saved_count:
+            print(f"📁 Saved {saved_count} full text files to '{text_files_dir}'")
         
         # Print summary
-        self.print_summary(bills)
+        self.print_summary(key for key in keys if key)
     
-    def print_summary(self, bills):
-        """Print a summary of results"""
-        print(f"\n📊 FINAL SUMMARY:")
-        print(f"   Total bills processed: {len(bills)}")
+    def write_metadata(self, bills, filename=None):
+        """Upsert bills into the metadata table and export it as one CSV"""
+        # Use default filename in processed directory
+        if filename is None:
+            filename = f"{self.processed_dir}/bills_metadata.csv"
         
-        sources = {}
         for bill in bills:
-            source = bill.get('text_source', 'unknown')
-            sources[source] = sources.get(source, 0) + 1
+            self.metadata.upsert(metadata_row(bill))
+        total = self.metadata.export_csv(filename)
+        print(f"💾 Saved {len(bills)} bills to {filename} ({total} bills in metadata table)")
+        return filename
+    
+    def save_text_file(self, bill):
+        """Save a bill's full text to processed/text_files if enabled and substantial"""
+        if not self.write_text_files:
+            return None
+        if not bill.get('full_text') or len(bill.get('full_text', '')) <= 1000:
+            return None
+        
+        text_files_dir = f"{self.processed_dir}/text_files"
+        os.makedirs(text_files_dir, exist_ok=True)
+        
+        # Extract session for better organization
+        session_match = re.search(r'(\d+)(?:st|nd|rd|th)', bill.get('general_court', ''))
+        session = session_match.group(0) if session_match else "unknown"
+        
+        filename = f"{text_files_dir}/{session}_{bill['number'].replace('.', '_')}.txt"
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(f"Bill: {bill['number']}\n")
+            f.write(f"Title: {bill.get('title', '')}\n")
+            f.write(f"Sponsor: {bill.get('sponsor', '')}\n")
+            f.write(f"General Court: {bill.get('general_court', '')}\n")
+            f.write(f"Source: {bill.get('text_source', '')}\n")
+            f.write(f"URL: {bill.get('text_url', bill.get('detail_url', ''))}\n")
+            f.write("="*60 + "\n\n")
+            f.write(bill['full_text'])
+        self.bill_index.mark_text(bill['number'], session)
+        return filename
+    
+    def print_summary(self, bill_ids=None):
+        """Print a summary of results from the catalog (all MA bills, or just ``bill_ids``)"""
+        filters = {'source': 'ma', 'doc_ids': None if bill_ids is None else list(bill_ids)}
+        sources = self.catalog.group_counts('text_source', **filters)
+        substantial_count = self.catalog.count(min_length=1001, **filters)
+        first_successful = list(self.catalog.query(('bill_number', 'text_source', 'title'), order_by='scraped_at',
+                                                   limit=5, min_length=1001, **filters))
+        
+        print(f"\n📊 FINAL SUMMARY:")
+        print(f"   Total bills processed: {sum(sources.values())}")
         
         print(f"   Text sources:")
         for source, count in sources.items():
-            print(f"     {source}: {count}")
+            print(f"     {source or 'unknown'}: {count}")
         
-        bills_with_text = [b for b in bills if b.get('full_text') and len(b.get('full_text', '')) > 1000]
-        print(f"   Bills with substantial text: {len(bills_with_text)}")
+        print(f"   Bills with substantial text: {substantial_count}")
         
-        if bills_with_text:
+        resolver_summary = self.text_url_resolver.summary()
+        if resolver_summary:
+            print(f"   Text URL resolver: {resolver_summary}")
+        
+        if first_successful:
             print(f"\n🎯 First 5 successful bills:")
-            for i, bill in enumerate(bills_with_text[:5]):
-                print(f"   {i+1}. {bill['number']} ({bill.get('text_source', 'unknown')}): {bill['title'][:70]}...")
+            for i, bill in enumerate(first_successful):
+                print(f"   {i+1}. {bill['bill_number']} ({bill['text_source'] or 'unknown'}): {(bill['title'] or '')[:70]}...")
 
 # Run the scraper
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Massachusetts bills from malegislature.gov")
+    parser.add_argument('--session', default=None,
+                        help="General Court session to scrape, e.g. 193rd (default: the current one)")
+    parser.add_argument('--list-sessions', action='store_true', help="List the sessions the search page offers")
+    parser.add_argument('--start-page', type=int, default=1)
+    parser.add_argument('--end-page', type=int, default=None,
+                        help="Last search page (default: the session's last page)")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent text fetch workers")
+    parser.add_argument('--rate', type=float, default=2.0, help="Requests per second per host")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the on-disk HTTP cache")
+    parser.add_argument('--offline', action='store_true',
+                        help="Cache-only mode: serve every page from the HTTP cache, never hit the network")
+    parser.add_argument('--parser', default=None, help="BeautifulSoup backend (default: lxml if installed)")
+    parser.add_argument('--metadata-format', default='csv', choices=['csv', 'parquet'])
+    parser.add_argument('--text-files', action='store_true',
+                        help="Also write plain processed/text_files/*.txt copies of each bill text")
+    parser.add_argument('--rescrape', action='store_true',
+                        help="Process bills even if they were already scraped (e.g. to rerun parsers offline)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue the last interrupted pipeline run from its checkpoint")
+    parser.add_argument('--two-phase', action='store_true',
+                        help="Scrape every listing page before fetching any text (old behaviour)")
+    parser.add_argument('--pdfs', action='store_true',
+                        help="Afterwards, extract text from the PDFs of bills that have no other text")
+    parser.add_argument('--pdf-processes', type=int, default=None, help="PDF extraction processes")
+    parser.add_argument('--retries', type=int, default=4, help="Retries per request on timeouts, 429s and 5xxs")
+    parser.add_argument('--quiet', action='store_true', help="No per-bill progress lines, only summaries")
+    parser.add_argument('--metrics', default=None, metavar='PATH',
+                        help="Write a metrics snapshot here (.prom/.txt for Prometheus text, JSON otherwise)")
+    args = parser.parse_args()
+    
     print("🚀 MA Legislature Bill Scraper - Smart Data Collection")
     print("=" * 70)
     
-    scraper = MABillScraper()
+    scraper = MABillScraper(requests_per_sec=args.rate, max_workers=args.workers,
+                            use_cache=not args.no_cache, offline=args.offline, parser=args.parser, metadata_format=args.metadata_format,
+                            write_text_files=args.text_files, quiet=args.quiet, metrics_path=args.metrics,
+                            max_retries=args.retries)
     
-    # Check what we already have
-    existing_bills = scraper.load_existing_bills()
-    print(f"📊 Currently have {len(existing_bills)} bills in database")
+    if args.list_sessions:
+        for ordinal, label in scraper.discover_sessions().items():
+            print(f"   {ordinal:<6} {label}")
+        sys.exit(0)
+    if args.session:
+        scraper.select_session(args.session)
+    if args.end_page is None and not args.resume:
+        args.end_page = scraper.page_count()
+        if args.end_page is None:
+            print("❌ Could not find the number of search pages; pass --end-page")
+            sys.exit(1)
+    print(f"🏛️  Session: {scraper.general_court}")
     
-    # Get basic bill info (with duplicate detection)
-    print("\nPhase 1: Getting basic bill information...")
-    bills = scraper.scrape_basic_bill_info(start_page=3, end_page=80, skip_existing=True)
+    # Check what we already have
+    print(f"📊 Currently have {len(scraper.store)} bills in database")
     
-    if bills:
-        print(f"\n✅ Found {len(bills)} new bills")
-        
-        # Get text for bills (with duplicate detection)
-        print("\nPhase 2: Getting full bill text...")
-        bills_with_text = scraper.scrape_with_text(bills, skip_existing=True)
-        
-        # Save results
-        scraper.save_results(bills_with_text)
+    if args.two_phase:
+        # Get basic bill info (with duplicate detection)
+        print("\nPhase 1: Getting basic bill information...")
+        bills = scraper.scrape_basic_bill_info(start_page=args.start_page, end_page=args.end_page, skip_existing=not args.rescrape)
         
-        print(f"\n🎉 Data organized in: {scraper.data_dir}")
-        print(f"   Raw bills: {scraper.raw_dir}/")
-        print(f"   Processed data: {scraper.processed_dir}/")
-        
-        # Final summary
-        all_bills_now = scraper.load_existing_bills()
-        print(f"📈 Total bills in database: {len(all_bills_now)}")
+        found = len(bills)
+        if found:
+            print(f"\n✅ Found {len(bills)} new bills")
+            
+            # Get text for bills (with duplicate detection)
+            print("\nPhase 2: Getting full bill text...")
+            bills_with_text = scraper.scrape_with_text(bills, skip_existing=not args.rescrape, workers=args.workers)
+            
+            # Save results
+            scraper.save_results(bills_with_text)
+        else:
+            print("❌ No new bills found")
     else:
-        print("❌ No new bills found")
\ No newline at end of file
+        # Listing, text fetching and saving run as overlapping stages
+        checkpoint_path = f"{scraper.data_dir}/checkpoint.json"
+        if args.resume:
+            checkpoint = ScrapeCheckpoint.load(checkpoint_path)
+            if checkpoint is None or checkpoint.is_complete:
+                print("💡 No interrupted run to resume")
+                sys.exit(0)
+            print(f"⏯️  Resuming: {checkpoint.summary()}")
+            if checkpoint.state.get('session'):
+                scraper.use_session(checkpoint.state['session'])
+            resume_bills = checkpoint.bills_to_resume()
+            pages = checkpoint.pages_to_resume()
+        else:
+            previous = ScrapeCheckpoint.load(checkpoint_path)
+            if previous is not None and not previous.is_complete:
+                print(f"⚠️  Starting over an interrupted run ({previous.summary()}); use --resume to continue it")
+            checkpoint = ScrapeCheckpoint(checkpoint_path, args.start_page, args.end_page,
+                                          session=scraper.session_label)
+            checkpoint.save()
+            resume_bills = []
+            pages = range(args.start_page, args.end_page + 1)
+        
+        pipeline = ScrapePipeline(scraper, text_workers=args.workers, checkpoint=checkpoint)
+        found = pipeline.run(skip_existing=not args.rescrape, pages=pages, resume_bills=resume_bills)
+        
+        if not found:
+            print("❌ No new bills found")
+    
+    # Also backfills placeholder PDFs of bills scraped by earlier runs
+    if args.pdfs:
+        PdfExtractionStage(scraper, processes=args.pdf_processes).run()
+    if not found and not args.pdfs:
+        sys.exit(0)
+    
+    print(f"\n🎉 Data organized in: {scraper.data_dir}")
+    print(f"   Bill records: {scraper.corpus_dir}/")
+    print(f"   Bill texts: {scraper.texts_dir}/")
+    print(f"   Processed data: {scraper.processed_dir}/")
+    if scraper.http_cache:
+        print(f"   HTTP cache: {scraper.http_cache.stats}")
+    
+    # Final summary
+    print(f"📈 Total bills in database: {len(scraper.store)}")
+    scraper.metrics.print_report()
+    if scraper.export_metrics():
+        print(f"📈 Metrics snapshot: {scraper.metrics_path}")
@@ -0,0 +1,153 @@
+# scripts/metadata_table.py
+import argparse
+import csv
+import os
+
+import pandas as pd
+
+# Preferred column order for readability; any other columns follow
+PREFERRED_COLUMNS = ['bill_id', 'number', 'title', 'sponsor', 'general_court', 'session',
+                     'text_source', 'text_length', 'text_url', 'detail_url', 'scraped_at']
+
+# Never stored in the metadata table
+EXCLUDED_COLUMNS = {'full_text'}
+
+
+def metadata_row(bill):
+    """Flatten a bill record into a metadata row without its full text"""
+    row = {key: value for key, value in bill.items()
+           if key not in EXCLUDED_COLUMNS and not isinstance(value, (dict, list))}
+    for key, value in bill.get('metadata', {}).items():
+        row.setdefault(key, value)
+    row.setdefault('bill_id', bill.get('number'))
+    return row
+
+
+class MetadataTable:
+    """Incremental metadata table stored as append-only chunk files
+
+    Rows are buffered and flushed every ``chunk_rows`` rows as a new
+    ``part-NNNNN.csv`` (or ``.parquet``) file, so memory stays flat no matter
+    how many bills are written. Rows are upserted by ``key``: when a key
+    appears in several parts, the row from the newest part wins.
+    """
+
+    def __init__(self, root, key='bill_id', file_format='csv', chunk_rows=500):
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unsupported metadata format: {file_format}")
+        if file_format == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("Parquet metadata needs pyarrow: pip install pyarrow")
+
+        self.root = root
+        self.key = key
+        self.file_format = file_format
+        self.chunk_rows = chunk_rows
+        self.buffer = {}
+        os.makedirs(root, exist_ok=True)
+
+    def part_paths(self):
+        """Chunk files in write order (oldest first)"""
+        parts = [name for name in os.listdir(self.root)
+                 if name.startswith('part-') and name.endswith(('.csv', '.parquet'))]
+        return [f"{self.root}/{name}" for name in sorted(parts)]
+
+    def _next_part_path(self):
+        parts = self.part_paths()
+        number = int(os.path.basename(parts[-1]).split('-')[1].split('.')[0]) + 1 if parts else 0
+        return f"{self.root}/part-{number:06d}.{self.file_format}"
+
+    def upsert(self, row):
+        """Add or replace a row by key; flushes a chunk when the buffer is full"""
+        self.buffer[row[self.key]] = row
+        if len(self.buffer) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as a new chunk file"""
+        if not self.buffer:
+            return None
+        df = pd.DataFrame(list(self.buffer.values()))
+        existing_columns = [col for col in PREFERRED_COLUMNS if col in df.columns]
+        other_columns = [col for col in df.columns if col not in PREFERRED_COLUMNS]
+        df = df[existing_columns + other_columns]
+
+        path = self._next_part_path()
+        tmp_path = f"{path}.tmp"
+        if self.file_format == 'parquet':
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_csv(tmp_path, index=False, encoding='utf-8')
+        os.replace(tmp_path, path)
+        self.buffer = {}
+        return path
+
+    def _read_part(self, path):
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, encoding='utf-8', dtype={self.key: str})
+        df = df.astype(object).where(df.notna(), None)
+        return df.to_dict('records')
+
+    def iter_rows(self):
+        """Stream the latest version of every row, newest chunk first"""
+        seen = set()
+        for row in reversed(list(self.buffer.values())):
+            seen.add(row[self.key])
+            yield row
+        for path in reversed(self.part_paths()):
+            for row in self._read_part(path):
+                if row[self.key] not in seen:
+                    seen.add(row[self.key])
+                    yield row
+
+    def compact(self):
+        """Merge all chunks into one deduplicated chunk"""
+        self.flush()
+        old_parts = self.part_paths()
+        if len(old_parts) <= 1:
+            return
+        self.buffer = {row[self.key]: row for row in self.iter_rows()}
+        self.flush()
+        for path in old_parts:
+            os.remove(path)
+
+    def export_csv(self, path):
+        """Write the deduplicated table to a single CSV, one row at a time"""
+        self.flush()
+        columns = list(PREFERRED_COLUMNS)
+        for part in self.part_paths():
+            part_columns = (pd.read_parquet(part).columns if part.endswith('.parquet')
+                            else pd.read_csv(part, nrows=0).columns)
+            columns += [col for col in part_columns if col not in columns]
+
+        count = 0
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+            for row in self.iter_rows():
+                writer.writerow(row)
+                count += 1
+        os.replace(tmp_path, path)
+        return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact or export the bill metadata table")
+    parser.add_argument('command', choices=['compact', 'export'])
+    parser.add_argument('--root', default="data/states/massachusetts/processed/metadata")
+    parser.add_argument('--format', default='csv', choices=['csv', 'parquet'])
+    parser.add_argument('--output', default="data/states/massachusetts/processed/bills_metadata.csv")
+    args = parser.parse_args()
+
+    table = MetadataTable(args.root, file_format=args.format)
+    if args.command == 'compact':
+        table.compact()
+        print(f"🧹 Compacted metadata into {len(table.part_paths())} chunk(s)")
+    else:
+        count = table.export_csv(args.output)
+        print(f"💾 Exported {count} rows to {args.output}")
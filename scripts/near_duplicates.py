@@ -0,0 +1,283 @@
+# scripts/near_duplicates.py
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from corpus_reader import FEDERAL_DIR, MA_DATA_DIR, iter_corpus_texts
+
+DEDUP_DIR = "data/dedup"
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Preferred text_source when picking a cluster representative (higher wins)
+SOURCE_RANK = {'view_text': 3, 'print_preview': 2, 'direct_page': 1}
+
+# Shingles hashed per numpy chunk, bounding the (num_perm x chunk) work array
+HASH_CHUNK = 4096
+
+
+def shingle_hashes(text, size=5):
+    """Distinct 64-bit hashes of the word ``size``-grams of a text"""
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    size = min(size, len(words))
+    # Hash each distinct word once, then combine neighbours with FNV-style mixing
+    unique, inverse = np.unique(np.array(words), return_inverse=True)
+    word_hashes = np.array([zlib.crc32(word.encode('utf-8')) for word in unique], dtype=np.uint64)[inverse]
+    count = len(word_hashes) - size + 1
+    hashes = word_hashes[:count].copy()
+    for offset in range(1, size):
+        hashes = (hashes * np.uint64(0x100000001B3)) ^ word_hashes[offset:offset + count]
+    return np.unique(hashes)
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash/LSH index of bill texts
+
+    Each text becomes a ``num_perm`` MinHash signature over word shingles;
+    signatures are split into ``bands`` bands, and texts that share any band
+    are candidates whose estimated Jaccard similarity is then checked against
+    ``threshold``. Signatures are appended to ``signatures.bin`` with their
+    ids in ``docs.tsv`` (the commit point), so new bills can be checked and
+    added one at a time at scrape time. Re-adding an id replaces it.
+    """
+
+    def __init__(self, root=DEDUP_DIR, num_perm=128, bands=16, shingle_size=5, threshold=0.8, seed=1):
+        self.root = root
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+        params_path = f"{root}/params.json"
+        if os.path.exists(params_path):
+            # Signatures are only comparable under the parameters they were built with
+            with open(params_path, 'r', encoding='utf-8') as f:
+                params = json.load(f)
+        else:
+            params = {'num_perm': num_perm, 'bands': bands, 'shingle_size': shingle_size, 'seed': seed}
+            with open(params_path, 'w', encoding='utf-8') as f:
+                json.dump(params, f, indent=2)
+        self.num_perm = params['num_perm']
+        self.bands = params['bands']
+        self.rows_per_band = self.num_perm // self.bands
+        self.shingle_size = params['shingle_size']
+        self.threshold = threshold
+
+        rng = np.random.default_rng(params['seed'])
+        self._a = rng.integers(1, 2 ** 63, self.num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, self.num_perm, dtype=np.uint64)
+
+        self.docs = []              # row -> {'doc_id', 'source', 'length', 'text_source'}
+        self.rows = {}              # doc_id -> live row
+        self.buckets = [{} for _ in range(self.bands)]
+        self._signatures = np.zeros((1024, self.num_perm), dtype=np.uint32)
+        self._load()
+        self._sig_file = open(f"{root}/signatures.bin", 'ab')
+        self._docs_file = open(f"{root}/docs.tsv", 'a', encoding='utf-8')
+
+    def _load(self):
+        docs_path = f"{self.root}/docs.tsv"
+        sig_path = f"{self.root}/signatures.bin"
+        if not os.path.exists(docs_path):
+            return
+        with open(docs_path, 'r', encoding='utf-8') as f:
+            entries = [line.rstrip('\n').split('\t') for line in f if line.strip()]
+        signatures = np.fromfile(sig_path, dtype=np.uint32) if os.path.exists(sig_path) else np.zeros(0, np.uint32)
+        row_count = min(len(entries), len(signatures) // self.num_perm)
+        # A crash between the two appends leaves a signature without its docs.tsv line
+        if len(signatures) > row_count * self.num_perm:
+            with open(sig_path, 'r+b') as f:
+                f.truncate(row_count * self.num_perm * 4)
+        signatures = signatures[:row_count * self.num_perm].reshape(row_count, self.num_perm)
+        for (doc_id, source, length, text_source), signature in zip(entries, signatures):
+            self._insert(doc_id, source, int(length), text_source, signature)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.rows
+
+    def signature(self, text):
+        """MinHash signature (uint32 x num_perm) of a text"""
+        shingles = shingle_hashes(text, self.shingle_size)
+        signature = np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        for start in range(0, len(shingles), HASH_CHUNK):
+            chunk = shingles[start:start + HASH_CHUNK]
+            # Multiply-shift hashing: one independent permutation per (a, b) pair
+            hashed = ((self._a[:, None] * chunk[None, :] + self._b[:, None]) >> np.uint64(32)).astype(np.uint32)
+            np.minimum(signature, hashed.min(axis=1), out=signature)
+        return signature
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+                for band in range(self.bands)]
+
+    def _insert(self, doc_id, source, length, text_source, signature):
+        row = len(self.docs)
+        if row == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.zeros_like(self._signatures)])
+        self._signatures[row] = signature
+        self.docs.append({'doc_id': doc_id, 'source': source, 'length': length, 'text_source': text_source})
+        self.rows[doc_id] = row     # an older row for the same id stays in its buckets but is no longer live
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(row)
+        return row
+
+    def _live(self, rows):
+        return [row for row in rows if self.rows.get(self.docs[row]['doc_id']) == row]
+
+    def similarity(self, signature, rows):
+        """Estimated Jaccard similarity of a signature to each of the given rows"""
+        return (self._signatures[rows] == signature).mean(axis=1)
+
+    def query(self, signature, exclude=None, threshold=None):
+        """[(doc_id, similarity)] of indexed texts at or above the threshold, most similar first"""
+        threshold = self.threshold if threshold is None else threshold
+        with self.lock:
+            candidates = set()
+            for bucket, key in zip(self.buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(key, ()))
+            rows = [row for row in self._live(candidates) if self.docs[row]['doc_id'] != exclude]
+            if not rows:
+                return []
+            scores = self.similarity(signature, rows)
+        matches = [(self.docs[row]['doc_id'], float(score)) for row, score in zip(rows, scores) if score >= threshold]
+        return sorted(matches, key=lambda match: -match[1])
+
+    def add(self, doc_id, text, source='', text_source='', signature=None):
+        """Index one text, returning its signature"""
+        if signature is None:
+            signature = self.signature(text)
+        with self.lock:
+            self._insert(doc_id, source, len(text), text_source, signature)
+            self._sig_file.write(signature.tobytes())
+            self._sig_file.flush()
+            self._docs_file.write(f"{doc_id}\t{source}\t{len(text)}\t{text_source}\n")
+            self._docs_file.flush()
+        return signature
+
+    def check(self, doc_id, text, source='', text_source=''):
+        """Near-duplicates of a new text among those already indexed, then index it"""
+        signature = self.signature(text)
+        matches = self.query(signature, exclude=doc_id)
+        row = self.rows.get(doc_id)
+        if row is None or self.docs[row]['length'] != len(text):
+            self.add(doc_id, text, source, text_source, signature)
+        return matches
+
+    def representative(self, rows):
+        """Cluster member to keep: best text source, then longest text, then newest id"""
+        return max(rows, key=lambda row: (SOURCE_RANK.get(self.docs[row]['text_source'], 0),
+                                          self.docs[row]['length'], self.docs[row]['doc_id']))
+
+    def clusters(self):
+        """Groups of live rows whose texts are near-duplicates (union-find over LSH buckets)"""
+        parent = {}
+
+        def find(row):
+            root = row
+            while parent.get(root, root) != root:
+                root = parent[root]
+            parent[row] = root
+            return root
+
+        with self.lock:
+            for bucket in self.buckets:
+                for rows in bucket.values():
+                    rows = self._live(rows)
+                    if len(rows) < 2:
+                        continue
+                    # Verify against the first member; true pairs that miss here share another band
+                    anchor = rows[0]
+                    scores = self.similarity(self._signatures[anchor], rows[1:])
+                    for row, score in zip(rows[1:], scores):
+                        if score >= self.threshold:
+                            parent[find(row)] = find(anchor)
+
+        groups = {}
+        for row in list(parent):
+            groups.setdefault(find(row), []).append(row)
+        return [sorted(rows) for rows in groups.values() if len(rows) > 1]
+
+    def write_report(self, path=None):
+        """Write one JSON line per cluster with its representative; returns the cluster count"""
+        path = path or f"{self.root}/clusters.jsonl"
+        clusters = self.clusters()
+        duplicates = 0
+        duplicate_bytes = 0
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for rows in sorted(clusters, key=len, reverse=True):
+                keep = self.representative(rows)
+                others = [row for row in rows if row != keep]
+                duplicates += len(others)
+                duplicate_bytes += sum(self.docs[row]['length'] for row in others)
+                similarity = self.similarity(self._signatures[keep], others)
+                f.write(json.dumps({
+                    'representative': self.docs[keep]['doc_id'],
+                    'duplicates': [self.docs[row]['doc_id'] for row in others],
+                    'min_similarity': round(float(similarity.min()), 3),
+                    'size': len(rows),
+                }) + '\n')
+        os.replace(tmp_path, path)
+
+        print(f"🔁 {len(clusters)} near-duplicate clusters over {len(self)} texts: "
+              f"{duplicates} duplicates ({duplicates / max(len(self), 1):.1%}, "
+              f"{duplicate_bytes / 1e6:.1f} M chars) can be dropped -> {path}")
+        return len(clusters)
+
+    def close(self):
+        self._sig_file.close()
+        self._docs_file.close()
+
+
+def load_duplicate_ids(report_path=f"{DEDUP_DIR}/clusters.jsonl"):
+    """Ids to drop so that each near-duplicate cluster keeps only its representative"""
+    duplicates = set()
+    if not os.path.exists(report_path):
+        return duplicates
+    with open(report_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            duplicates.update(json.loads(line)['duplicates'])
+    return duplicates
+
+
+def build_index(root=DEDUP_DIR, data_dir=MA_DATA_DIR, federal_dir=FEDERAL_DIR, sources=('ma', 'federal'),
+                threshold=0.8):
+    """Add corpus texts that are not indexed yet (or whose length changed)"""
+    index = NearDuplicateIndex(root, threshold=threshold)
+    start_time = time.monotonic()
+    added = 0
+    for doc_id, source, text, record in iter_corpus_texts(data_dir, federal_dir, sources):
+        row = index.rows.get(doc_id)
+        if row is not None and index.docs[row]['length'] == len(text):
+            continue
+        index.add(doc_id, text, source, record.get('text_source', ''))
+        added += 1
+    elapsed = max(time.monotonic() - start_time, 1e-9)
+    print(f"🔁 Signed {added} new texts in {elapsed:.1f}s ({added / elapsed:.0f} texts/s); "
+          f"{len(index)} texts indexed at {root}")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate detection for bill texts")
+    parser.add_argument('command', choices=['build', 'report'])
+    parser.add_argument('--index', default=DEDUP_DIR)
+    parser.add_argument('--sources', default='ma,federal')
+    parser.add_argument('--threshold', type=float, default=0.8, help="Estimated Jaccard similarity for duplicates")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        index = build_index(args.index, sources=tuple(args.sources.split(',')), threshold=args.threshold)
+    else:
+        index = NearDuplicateIndex(args.index, threshold=args.threshold)
+    index.write_report()
+    index.close()
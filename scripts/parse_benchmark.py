@@ -0,0 +1,99 @@
+# scripts/parse_benchmark.py
+import argparse
+import glob
+import gzip
+import os
+import time
+
+from bs4 import BeautifulSoup
+
+from ma_bill_scrapper import LINKS_ONLY, SEARCH_RESULTS_ONLY, TEXT_LINK_LABELS, MABillScraper
+
+
+def load_pages(paths):
+    """Read HTML pages, accepting plain debug_page_*.html files or cached .body.gz bodies"""
+    pages = []
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            pages.append(f.read())
+    return pages
+
+
+def search_rows_full(scraper, content, backend):
+    """Original path: full parse, then find the results table"""
+    soup = BeautifulSoup(content, backend)
+    table = soup.find('table')
+    return table.find_all('tr') if table else []
+
+
+def search_rows_partial(scraper, content, backend):
+    """Fast path: only the results table is turned into a tree"""
+    soup = BeautifulSoup(content, backend, parse_only=SEARCH_RESULTS_ONLY)
+    table = soup.find('table')
+    return table.find_all('tr') if table else []
+
+
+def links_full(scraper, content, backend):
+    """Original path: full parse, then one scan of every <a> per label"""
+    soup = BeautifulSoup(content, backend)
+    return {label: scraper.find_text_link(soup, label) for label in TEXT_LINK_LABELS}
+
+
+def links_partial(scraper, content, backend):
+    """Fast path: anchors only, one pass for all labels"""
+    soup = BeautifulSoup(content, backend, parse_only=LINKS_ONLY)
+    return scraper.build_link_index(soup)
+
+
+def time_per_page(fn, scraper, pages, backend, repeat):
+    """Best-of-repeat average milliseconds per page"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in pages:
+            fn(scraper, content, backend)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000 / len(pages)
+
+
+def run_benchmark(pages, repeat=3):
+    """Compare the original html.parser path with lxml full and partial parsing"""
+    scraper = MABillScraper.__new__(MABillScraper)
+    scraper.base_url = "https://malegislature.gov"
+
+    configs = [
+        ('html.parser full', 'html.parser', search_rows_full, links_full),
+        ('lxml full', 'lxml', search_rows_full, links_full),
+        ('lxml partial', 'lxml', search_rows_partial, links_partial),
+    ]
+    results = {}
+    for name, backend, search_fn, links_fn in configs:
+        results[name] = {
+            'search_ms': time_per_page(search_fn, scraper, pages, backend, repeat),
+            'links_ms': time_per_page(links_fn, scraper, pages, backend, repeat),
+        }
+
+    baseline = results['html.parser full']
+    print(f"📊 Parse time per page over {len(pages)} pages (best of {repeat}):")
+    for name, timing in results.items():
+        print(f"   {name:<18} search rows {timing['search_ms']:7.2f} ms "
+              f"({baseline['search_ms'] / timing['search_ms']:.1f}x)   "
+              f"text links {timing['links_ms']:7.2f} ms "
+              f"({baseline['links_ms'] / timing['links_ms']:.1f}x)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure HTML parse time per page for each parser path")
+    parser.add_argument('paths', nargs='*', help="HTML files (default: debug_page_*.html)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob("debug_page_*.html"))
+    paths = [p for p in paths if os.path.isfile(p)]
+    if not paths:
+        print("❌ No HTML pages found (run debug_page_content first or pass files)")
+    else:
+        run_benchmark(load_pages(paths), repeat=args.repeat)
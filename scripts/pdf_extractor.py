@@ -0,0 +1,161 @@
+# scripts/pdf_extractor.py
+import argparse
+import io
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+from catalog import ensure_ma_catalogued
+from fetch_engine import TransientFetchError
+from metadata_table import metadata_row
+
+# Extracted text shorter than this is treated as a scanned PDF without a text layer
+MIN_PDF_TEXT = 200
+
+# text_source for PDFs that were downloaded but held no extractable text
+EMPTY_PDF_SOURCE = 'pdf_no_text'
+
+
+def require_pypdf():
+    if pypdf is None:
+        raise ImportError("PDF extraction needs pypdf: pip install pypdf")
+
+
+def extract_pdf_text(data):
+    """Worker: (text, page count, error, seconds) for one PDF's bytes"""
+    start = time.perf_counter()
+    try:
+        reader = pypdf.PdfReader(io.BytesIO(data))
+        pages = [page.extract_text() or '' for page in reader.pages]
+        return '\n'.join(pages), len(pages), None, time.perf_counter() - start
+    except Exception as e:
+        return '', 0, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+
+class PdfExtractionStage:
+    """Fill in bills whose only text is a PDF (text_source 'pdf', text_length 0)
+
+    PDFs are downloaded on a thread pool through the scraper's session, so
+    the HTTP cache, rate limiter and fetch controller all apply, and their
+    text is extracted on a process pool because parsing PDFs is CPU-bound.
+    At most ``2 * batch_size`` PDFs are held in memory at once. Extracted
+    text goes through the scraper's clean_text and is saved like any other
+    bill text, with ``text_source='pdf'`` and its real length.
+    """
+
+    def __init__(self, scraper, processes=None, download_workers=None, batch_size=32):
+        require_pypdf()
+        self.scraper = scraper
+        self.processes = processes
+        self.download_workers = download_workers or scraper.max_workers
+        self.batch_size = batch_size
+        self.stats = {'bills': 0, 'extracted': 0, 'empty': 0, 'failed': 0, 'deferred': 0, 'pages': 0,
+                      'bytes': 0, 'extract_seconds': 0.0}
+
+    def pending_keys(self, bill_ids=None):
+        """Record keys of bills still waiting for their PDF text, from the catalog"""
+        ensure_ma_catalogued(self.scraper.catalog, self.scraper.data_dir)
+        rows = self.scraper.catalog.query(('doc_id',), source='ma', text_source='pdf', max_length=0,
+                                          doc_ids=bill_ids)
+        return [row['doc_id'] for row in rows]
+
+    def _download(self, key):
+        """(record, PDF bytes or None, status) for one pending bill"""
+        record = self.scraper.store.get(key)
+        if not record or not record.get('text_url'):
+            return record, None, 'failed'
+        try:
+            response = self.scraper.fetch(record['text_url'])
+        except TransientFetchError:
+            return record, None, 'deferred'     # still pending in the catalog, so the next run retries it
+        if response.status_code != 200 or not response.content.startswith(b'%PDF'):
+            return record, None, 'failed'
+        return record, response.content, 'ok'
+
+    def _save(self, record, text, pages, error):
+        text = self.scraper.clean_text(text) if text else ''
+        bill = dict(record)
+        bill['pdf_pages'] = pages
+        if len(text) >= MIN_PDF_TEXT:
+            bill['full_text'] = text
+            bill['text_source'] = 'pdf'
+            bill['text_length'] = len(text)
+            self.stats['extracted'] += 1
+            self.scraper.metrics.log(f"    📄 Extracted {len(text)} chars from {pages} PDF pages of {bill['number']}")
+        else:
+            bill['text_source'] = EMPTY_PDF_SOURCE
+            bill['text_length'] = 0
+            if error:
+                bill['pdf_error'] = error
+            self.stats['empty'] += 1
+        self.scraper.metrics.inc('pdf_bills', text_source=bill['text_source'])
+        self.scraper.save_bill_data(bill)
+        self.scraper.metadata.upsert(metadata_row(bill))
+
+    def run(self, bill_ids=None):
+        """Extract every pending PDF (or those among ``bill_ids``) and report pages/s"""
+        keys = self.pending_keys(bill_ids)
+        if not keys:
+            return self.stats
+        print(f"📄 Extracting PDF text for {len(keys)} bills with {self.processes or 'all'} processes")
+        start_time = time.monotonic()
+        extracting = {}
+        context = multiprocessing.get_context('spawn')   # the scraper process is full of threads
+        with ThreadPoolExecutor(self.download_workers) as downloads, \
+                ProcessPoolExecutor(self.processes, mp_context=context) as pool:
+            for start in range(0, len(keys), self.batch_size):
+                for record, data, status in downloads.map(self._download, keys[start:start + self.batch_size]):
+                    self.stats['bills'] += 1
+                    if status != 'ok':
+                        self.stats[status] += 1
+                        continue
+                    self.stats['bytes'] += len(data)
+                    extracting[pool.submit(extract_pdf_text, data)] = record
+                # Save finished extractions while the next batch downloads, bounding PDFs held in memory
+                while len(extracting) > self.batch_size:
+                    self._drain(extracting)
+            while extracting:
+                self._drain(extracting)
+        self.scraper.bill_index.save()
+        self.scraper.catalog.flush()
+        self.scraper.metadata.flush()
+
+        elapsed = max(time.monotonic() - start_time, 1e-9)
+        stats = self.stats
+        print(f"📄 PDFs: {stats['extracted']} extracted, {stats['empty']} without text, {stats['failed']} unavailable, "
+              f"{stats['deferred']} deferred; {stats['pages']} pages ({stats['bytes'] / 1e6:.1f} MB) in {elapsed:.1f}s "
+              f"({stats['pages'] / elapsed:.1f} pages/s overall, "
+              f"{stats['pages'] / max(stats['extract_seconds'], 1e-9):.1f} pages/s per extraction process)")
+        return stats
+
+    def _drain(self, extracting):
+        """Save whichever extractions have finished, waiting for at least one"""
+        done, _ = wait(list(extracting), return_when=FIRST_COMPLETED)
+        for future in done:
+            record = extracting.pop(future)
+            text, pages, error, seconds = future.result()
+            self.stats['pages'] += pages
+            self.stats['extract_seconds'] += seconds
+            self.scraper.metrics.observe('pdf_extract', seconds)
+            self._save(record, text, pages, error)
+
+
+if __name__ == "__main__":
+    from ma_bill_scrapper import MABillScraper
+
+    parser = argparse.ArgumentParser(description="Extract text from the PDFs of bills that only have a PDF")
+    parser.add_argument('--processes', type=int, default=None, help="Extraction processes (default: CPU count)")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent PDF downloads")
+    parser.add_argument('--rate', type=float, default=2.0, help="Requests per second per host")
+    parser.add_argument('--offline', action='store_true', help="Only use PDFs already in the HTTP cache")
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    scraper = MABillScraper(requests_per_sec=args.rate, max_workers=args.workers, offline=args.offline,
+                            quiet=args.quiet)
+    PdfExtractionStage(scraper, processes=args.processes, download_workers=args.workers).run()
@@ -0,0 +1,408 @@
+# scripts/scrape_benchmark.py
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bs4 import BeautifulSoup
+
+from ma_bill_scrapper import MABillScraper
+
+BENCHMARK_DIR = "data/benchmark"
+FIXTURES_DIR = f"{BENCHMARK_DIR}/fixtures"
+RESULTS_DIR = f"{BENCHMARK_DIR}/results"
+
+# Statuses that tell a client to slow down and come back later
+RETRY_STATUSES = (429, 503)
+
+# Metrics shown by ``compare``; for the first group lower is better
+LOWER_IS_BETTER = ('seconds', 'parse_ms_per_page', 'requests_per_bill', 'peak_rss_mb')
+HIGHER_IS_BETTER = ('pages_per_sec', 'bills_per_sec')
+
+
+def fixture_page_path(root, url_path):
+    """Fixture file for a detail or text page path, e.g. /Bills/194/H1 -> pages/Bills/194/H1.html"""
+    return f"{root}/pages/{url_path.strip('/')}.html"
+
+
+def search_fixture_path(root, page):
+    """Search results page ``page``, named like the files debug_page_content writes"""
+    return f"{root}/search/debug_page_{page}.html"
+
+
+def write_fixture(path, html):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def synthesize_fixtures(root=FIXTURES_DIR, pages=5, bills_per_page=20, sections=12, seed=0):
+    """Write synthetic search, detail and text pages shaped like the real site"""
+    rng = random.Random(seed)
+    shutil.rmtree(root, ignore_errors=True)
+    words = ("department shall report notice hearing within days commonwealth section chapter general laws "
+             "amended inserting following fund secretary board regulations person municipality").split()
+    for page in range(1, pages + 1):
+        rows = []
+        for i in range(bills_per_page):
+            number = page * 1000 + i
+            chamber = 'H' if i % 3 else 'S'
+            path = f"/Bills/194/{chamber}{number}"
+            rows.append(f'<tr><td>{i}</td><td><a href="{path}">{chamber}.{number}</a></td>'
+                        f'<td><a href="/Legislators/Profile/X{i}">Representative {i}</a></td>'
+                        f'<td><a href="{path}">An Act relative to {rng.choice(words)} {number}</a></td></tr>')
+            write_fixture(fixture_page_path(root, path), BeautifulSoup(
+                f'<html><head><title>{chamber}.{number}</title></head><body><nav>menu</nav>'
+                f'<div class="content"><h1>Bill {chamber}.{number}</h1>'
+                f'<a href="{path}.Html">View Text</a> <a href="{path}/Print">Print Preview</a> '
+                f'<a href="{path}.pdf">Download PDF</a></div></body></html>', 'html.parser').prettify())
+            body = ''.join(f"<p>SECTION {s}. " + ' '.join(rng.choice(words) for _ in range(rng.randint(40, 120)))
+                           + ".</p>" for s in range(1, sections + 1))
+            write_fixture(fixture_page_path(root, f"{path}.Html"), BeautifulSoup(
+                f'<html><body><nav>menu</nav><div class="billDocument">{body}</div></body></html>',
+                'html.parser').prettify())
+        table = '<table><tr><th></th><th>Bill</th><th>Sponsor</th><th>Title</th></tr>' + ''.join(rows) + '</table>'
+        write_fixture(search_fixture_path(root, page),
+                      BeautifulSoup(f'<html><body>{table}</body></html>', 'html.parser').prettify())
+    print(f"🧪 Wrote {pages} search pages and {pages * bills_per_page} bills of fixtures to {root}")
+
+
+def record_fixtures(scraper, root=FIXTURES_DIR, start_page=1, end_page=2):
+    """Save live search pages plus each bill's detail and text pages as fixtures"""
+    def save(url, path):
+        response = scraper.session.get(url)
+        if response.status_code != 200:
+            return None
+        soup = scraper.parse_html(response.content)
+        # Site-absolute links would bypass the replay server
+        write_fixture(path, soup.prettify().replace(scraper.base_url, ''))
+        return soup
+
+    count = 0
+    for page in range(start_page, end_page + 1):
+        soup = save(scraper.search_url(page), search_fixture_path(root, page))
+        table = soup.find('table') if soup else None
+        for row in table.find_all('tr') if table else ():
+            bill = scraper.extract_basic_info(row)
+            if not bill:
+                continue
+            detail_path = urlsplit(bill['detail_url']).path
+            detail = save(bill['detail_url'], fixture_page_path(root, detail_path))
+            links = scraper.build_link_index(detail) if detail else {}
+            for label in ('View Text', 'Print Preview'):
+                if label in links:
+                    save(links[label], fixture_page_path(root, urlsplit(links[label]).path))
+            count += 1
+    print(f"📼 Recorded {end_page - start_page + 1} search pages and {count} bills to {root}")
+
+
+class ReplayServer:
+    """Local stand-in for malegislature.gov serving recorded fixtures
+
+    Search requests are answered from ``search/debug_page_{n}.html`` by
+    their ``Page`` parameter (a missing page is an empty result table, like
+    the end of the real listing); every other path from ``pages/<path>.html``.
+    Each response is delayed by ``latency`` plus up to ``jitter`` seconds,
+    and a seeded ``error_rate`` share fails with ``error_status`` (429 and
+    503 carry a ``Retry-After`` of ``retry_after`` seconds).
+    """
+
+    def __init__(self, root=FIXTURES_DIR, port=0, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+                 retry_after=1, seed=0):
+        self.root = root
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'search': 0, 'pages': 0, 'not_found': 0, 'errors': 0, 'bytes': 0}
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def _count(self, **increments):
+        with self.lock:
+            for key, value in increments.items():
+                self.counts[key] += value
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server.lock:
+                    delay = server.latency + server.rng.uniform(0, server.jitter)
+                    fail = server.rng.random() < server.error_rate
+                server._count(requests=1)
+                if delay:
+                    time.sleep(delay)
+                if fail:
+                    server._count(errors=1)
+                    self.send_response(server.error_status)
+                    if server.error_status in RETRY_STATUSES:
+                        self.send_header('Retry-After', str(server.retry_after))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                url = urlsplit(self.path)
+                if url.path.startswith('/Bills/Search'):
+                    page = int(parse_qs(url.query).get('Page', ['1'])[0])
+                    path = search_fixture_path(server.root, page)
+                    server._count(search=1)
+                    body = b'<html><body><table><tr><th>Bill</th></tr></table></body></html>'
+                else:
+                    path = fixture_page_path(server.root, url.path)
+                    server._count(pages=1)
+                    body = None
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        body = f.read()
+                elif body is None:
+                    server._count(not_found=1)
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                server._count(bytes=len(body))
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="replay-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class ParseTimer:
+    """Wrap a scraper's parse_html to count parsed pages and the time spent parsing"""
+
+    def __init__(self, scraper):
+        self.calls = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+        parse_html = scraper.parse_html
+
+        def timed(content, parse_only=None):
+            start = time.perf_counter()
+            try:
+                return parse_html(content, parse_only)
+            finally:
+                with self.lock:
+                    self.calls += 1
+                    self.seconds += time.perf_counter() - start
+
+        scraper.parse_html = timed
+
+    def snapshot(self):
+        with self.lock:
+            return self.calls, self.seconds
+
+
+@contextlib.contextmanager
+def measure(name, results, server, timer, bills_fn):
+    """Record one phase's throughput, request and parse figures into ``results[name]``"""
+    requests_before = server.snapshot()['requests']
+    calls_before, parse_before = timer.snapshot()
+    start = time.perf_counter()
+    yield
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    calls, parse_seconds = timer.snapshot()
+    pages = calls - calls_before
+    bills = bills_fn()
+    requests_made = server.snapshot()['requests'] - requests_before
+    results[name] = {
+        'seconds': round(elapsed, 3),
+        'pages': pages,
+        'bills': bills,
+        'requests': requests_made,
+        'pages_per_sec': round(pages / elapsed, 2),
+        'bills_per_sec': round(bills / elapsed, 2),
+        'requests_per_bill': round(requests_made / bills, 2) if bills else None,
+        'parse_ms_per_page': round((parse_seconds - parse_before) * 1000 / pages, 3) if pages else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(fixtures=FIXTURES_DIR, pages=5, workers=8, rate=1000.0, parser=None, latency=0.0, jitter=0.0,
+                  error_rate=0.0, error_status=503, retry_after=1, seed=0, output=None, verbose=False):
+    """Scrape the replayed site end to end in a scratch directory and write the results as JSON"""
+    fixtures = os.path.abspath(fixtures)
+    if not os.path.isdir(f"{fixtures}/search"):
+        raise FileNotFoundError(f"No fixtures in {fixtures} (run the synthesize or record command first)")
+    output = os.path.abspath(output or f"{RESULTS_DIR}/scrape-{datetime.now():%Y%m%d-%H%M%S}.json")
+    config = {'fixtures': fixtures, 'pages': pages, 'workers': workers, 'rate': rate, 'latency': latency,
+              'jitter': jitter, 'error_rate': error_rate, 'error_status': error_status, 'retry_after': retry_after,
+              'seed': seed}
+
+    workdir = tempfile.mkdtemp(prefix="scrape-benchmark-")
+    cwd = os.getcwd()
+    phases = {}
+    log = sys.stdout if verbose else open(os.devnull, 'w')
+    try:
+        os.chdir(workdir)   # the scraper writes under relative data/ paths
+        with ReplayServer(fixtures, latency=latency, jitter=jitter, error_rate=error_rate,
+                          error_status=error_status, retry_after=retry_after, seed=seed) as server, contextlib.redirect_stdout(log):
+            scraper = MABillScraper(requests_per_sec=rate, max_workers=workers, use_cache=False, parser=parser,
+                                    quiet=not verbose)
+            scraper.base_url = server.base_url
+            config['parser'] = scraper.parser
+            timer = ParseTimer(scraper)
+
+            bills = []
+            with measure('scrape_basic_bill_info', phases, server, timer, lambda: len(bills)):
+                bills = scraper.scrape_basic_bill_info(1, pages, skip_existing=False)
+            with_text = []
+            with measure('scrape_with_text', phases, server, timer, lambda: len(with_text)):
+                with_text = scraper.scrape_with_text(bills, skip_existing=False, workers=workers)
+            with measure('save_results', phases, server, timer, lambda: len(with_text)):
+                scraper.save_results(with_text)
+            server_counts = server.snapshot()
+            metrics = scraper.metrics.snapshot()
+    finally:
+        os.chdir(cwd)
+        if log is not sys.stdout:
+            log.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {'created_at': datetime.now().isoformat(), 'revision': git_revision(), 'python': sys.version.split()[0],
+               'config': config, 'phases': phases, 'server': server_counts, 'metrics': metrics}
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(f"{output}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    os.replace(f"{output}.tmp", output)
+
+    print(f"⏱️  Scrape benchmark: {pages} pages, {workers} workers, {latency * 1000:.0f} ms latency, "
+          f"{error_rate:.0%} errors ({config['parser']})")
+    print_phases(phases)
+    print(f"💾 Results written to {output}")
+    return results
+
+
+def print_phases(phases):
+    print(f"   {'phase':<24} {'seconds':>8} {'pages/s':>8} {'bills/s':>8} {'req/bill':>8} "
+          f"{'parse ms':>9} {'peak MB':>8}")
+    for name, phase in phases.items():
+        print(f"   {name:<24} {phase['seconds']:8.2f} {phase['pages_per_sec']:8.1f} {phase['bills_per_sec']:8.1f} "
+              f"{phase['requests_per_bill'] or 0:8.2f} {phase['parse_ms_per_page'] or 0:9.2f} "
+              f"{phase['peak_rss_mb']:8.1f}")
+
+
+def compare(baseline_path, candidate_path):
+    """Print per-phase metric changes between two result files"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(candidate_path, 'r', encoding='utf-8') as f:
+        candidate = json.load(f)
+    print(f"📊 {baseline.get('revision')} -> {candidate.get('revision')}")
+    for name, phase in candidate['phases'].items():
+        before = baseline['phases'].get(name)
+        if not before:
+            continue
+        print(f"   {name}")
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            old, new = before.get(metric), phase.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            better = change < 0 if metric in LOWER_IS_BETTER else change > 0
+            marker = '✅' if better else ('⚠️ ' if abs(change) > 0.05 else '  ')
+            print(f"     {marker} {metric:<18} {old:>10} -> {new:<10} ({change:+.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local replay of the site")
+    parser.add_argument('command', choices=['run', 'synthesize', 'record', 'serve', 'compare'])
+    parser.add_argument('results', nargs='*', help="compare: baseline and candidate result files")
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--pages', type=int, default=5, help="Search pages to scrape, synthesize or record")
+    parser.add_argument('--bills-per-page', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=1000.0, help="Scraper requests per second per host")
+    parser.add_argument('--parser', default=None)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many extra seconds per response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429/503")
+    parser.add_argument('--port', type=int, default=8765, help="serve: port to listen on")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--verbose', action='store_true', help="Show the scraper's own output")
+    args = parser.parse_intermixed_args()
+
+    if args.command == 'synthesize':
+        synthesize_fixtures(args.fixtures, pages=args.pages, bills_per_page=args.bills_per_page, seed=args.seed)
+    elif args.command == 'record':
+        record_fixtures(MABillScraper(use_cache=True), args.fixtures, 1, args.pages)
+    elif args.command == 'serve':
+        server = ReplayServer(args.fixtures, port=args.port, latency=args.latency, jitter=args.jitter,
+                              error_rate=args.error_rate, error_status=args.error_status,
+                              retry_after=args.retry_after, seed=args.seed)
+        print(f"🌐 Replaying {args.fixtures} at {server.base_url} (Ctrl+C to stop)")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            print(f"\n📊 {server.snapshot()}")
+    elif args.command == 'compare':
+        if len(args.results) != 2:
+            parser.error("compare needs a baseline and a candidate result file")
+        compare(*args.results)
+    else:
+        run_benchmark(args.fixtures, pages=args.pages, workers=args.workers, rate=args.rate, parser=args.parser,
+                      latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      error_status=args.error_status, retry_after=args.retry_after, seed=args.seed,
+                      output=args.output, verbose=args.verbose)
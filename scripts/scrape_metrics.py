@@ -0,0 +1,158 @@
+# scripts/scrape_metrics.py
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the latency histogram buckets (a final +Inf bucket is implicit)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "ma_scraper"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram: one bisect and two additions per observation"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound below which a ``q`` share of observations fall"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': round(self.sum, 6),
+                'mean': round(self.sum / self.count, 6) if self.count else None,
+                'p50': self.quantile(0.5), 'p99': self.quantile(0.99),
+                'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.counts)}}
+
+
+class ScrapeMetrics:
+    """Counters and latency histograms for a scrape, plus quiet-aware progress output
+
+    Counters are keyed by name and an optional set of labels (e.g. the
+    ``text_source`` of a bill); histograms time the fetch, parse, clean and
+    save stages. Everything sits behind one lock and costs a dict update per
+    event, so it stays on in every run. ``log`` is the per-bill progress
+    print, and does nothing in quiet mode.
+    """
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def log(self, *args, **kwargs):
+        """Per-bill progress line, silenced in quiet mode"""
+        if not self.quiet:
+            print(*args, **kwargs)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, name):
+        """Observe the duration of the block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def counter(self, name, **labels):
+        """Current value of one counter (0 if never incremented)"""
+        with self.lock:
+            return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self):
+        """JSON-friendly view of every counter and histogram"""
+        with self.lock:
+            counters = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                if labels:
+                    counters.setdefault(name, {})[','.join(f"{k}={v}" for k, v in labels)] = value
+                else:
+                    counters[name] = value
+            histograms = {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())}
+        return {'started_at': self.started, 'elapsed_seconds': round(time.time() - self.started, 3),
+                'counters': counters, 'latency_seconds': histograms}
+
+    def to_prometheus(self):
+        """Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            previous = None
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = f"{METRIC_PREFIX}_{name}_total"
+                if name != previous:
+                    lines.append(f"# TYPE {metric} counter")
+                    previous = name
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{metric}{{{label_text}}} {value}" if labels else f"{metric} {value}")
+            for name, histogram in sorted(self.histograms.items()):
+                metric = f"{METRIC_PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f"{metric}_sum {histogram.sum:.6f}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """Write a snapshot: Prometheus text for .prom/.txt paths, JSON otherwise"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if path.endswith(('.prom', '.txt')):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+    def print_report(self):
+        """One line per timed stage and the text_source outcome counts"""
+        snapshot = self.snapshot()
+        print(f"📈 Stage latency ({snapshot['elapsed_seconds']:.1f}s run):")
+        for name, histogram in snapshot['latency_seconds'].items():
+            print(f"   {name:<10} {histogram['count']:7d} calls  mean {histogram['mean'] * 1000:8.2f} ms  "
+                  f"p50 <= {histogram['p50'] * 1000:g} ms  p99 <= {histogram['p99'] * 1000:g} ms")
+        counters = snapshot['counters']
+        if counters.get('bills'):
+            outcomes = ', '.join(f"{label.split('=', 1)[1]} {count}" for label, count in counters['bills'].items())
+            print(f"   outcomes: {outcomes}")
+        if counters.get('bytes_downloaded'):
+            print(f"   downloaded {counters['bytes_downloaded'] / 1e6:.2f} MB")
+
@@ -0,0 +1,226 @@
+# scripts/scrape_pipeline.py
+import queue
+import threading
+import time
+
+from catalog import ma_row
+from fetch_engine import fetch_concurrently
+from metadata_table import metadata_row
+
+# Marks the end of a stage's output on a queue
+_DONE = object()
+
+
+class _AlreadySaved:
+    """A resumed bill that turned out to be in the corpus store already"""
+
+    def __init__(self, key, bill):
+        self.key = key
+        self.bill = bill
+
+
+class _Requeue:
+    """A stub whose text fetch failed transiently and should be tried again later"""
+
+    def __init__(self, bill):
+        self.bill = bill
+
+
+class ScrapePipeline:
+    """Streaming listing -> text -> save pipeline connected by bounded queues
+
+    A listing thread walks the search pages and emits bill stubs, a pool of
+    text workers fetches full text for each stub, and the writer (the calling
+    thread) saves every finished bill as soon as it arrives. Queue sizes bound
+    how many full texts are held in memory at once.
+    """
+
+    def __init__(self, scraper, text_workers=4, queue_size=50, checkpoint=None):
+        self.scraper = scraper
+        self.checkpoint = checkpoint
+        self.text_workers = max(1, text_workers)
+        self.stub_queue = queue.Queue(maxsize=queue_size)
+        self.done_queue = queue.Queue(maxsize=queue_size)
+        self.pages_scraped = 0
+        self.bills_written = 0
+        self.requeued = []
+        self._unconfirmed = []
+
+    def _list_bills(self, pages, skip_existing, resume_bills):
+        """Listing stage: push resumed stubs, then bill stubs from each search page"""
+        try:
+            for bill in resume_bills:
+                # Saved just before a crash, after the last checkpoint write:
+                # let the writer re-record it without fetching anything
+                key = self.scraper.record_key(bill)
+                if key in self.scraper.store:
+                    self.done_queue.put(_AlreadySaved(key, bill))
+                    continue
+                self.stub_queue.put(bill)
+
+            for page in pages:
+                page_result = self.scraper.scrape_search_page(page, skip_existing=skip_existing, save=False)
+                if page_result is None:
+                    if self.checkpoint:
+                        self.checkpoint.page_failed(page)
+                    continue
+
+                page_bills, skipped_bills_count = page_result
+                self.pages_scraped += 1
+                # Record the page before queueing so a crash can't lose its bills
+                if self.checkpoint:
+                    self.checkpoint.page_done(page, page_bills)
+                for bill in page_bills:
+                    self.stub_queue.put(bill)
+
+                # Stop if no new bills found on page
+                if not page_bills and skipped_bills_count > 0:
+                    print(f"💡 No new bills found on page {page}, you may have reached the end")
+                    break
+
+            if self.checkpoint:
+                self.checkpoint.listing_finished()
+        finally:
+            for _ in range(self.text_workers):
+                self.stub_queue.put(_DONE)
+
+    def _fetch_texts(self):
+        """Text stage: fetch full text for stubs until the listing is done"""
+        try:
+            while True:
+                bill = self.stub_queue.get()
+                if bill is _DONE:
+                    break
+                if self.checkpoint:
+                    self.checkpoint.bill_started(bill)
+                result = self.scraper.try_bill_text(bill)
+                self.done_queue.put(_Requeue(bill) if result is None else result)
+        finally:
+            self.done_queue.put(_DONE)
+
+    def _collect(self, bill, saved_keys):
+        """Writer stage for one finished (or requeued) bill"""
+        if isinstance(bill, _Requeue):
+            self.requeued.append(bill.bill)
+            return
+        try:
+            saved_keys.add(self._write_bill(bill))
+        except Exception as e:
+            print(f"❌ Error saving bill: {e}")
+            return
+        self.bills_written += 1
+        if self.bills_written % 25 == 0:
+            self.scraper.bill_index.save()
+            self.scraper.export_metrics()
+
+    def _retry_requeued(self, saved_keys):
+        """Give transiently failed bills more rounds once the site has had time to recover
+        
+        Bills still failing afterwards are never stored as errors: the checkpoint
+        keeps them as failed so --resume fetches them again.
+        """
+        for round_number in range(1, self.scraper.requeue_rounds + 1):
+            if not self.requeued:
+                return
+            bills, self.requeued = self.requeued, []
+            print(f"🔁 Requeue round {round_number}: retrying {len(bills)} bills in {self.scraper.requeue_delay:.0f}s")
+            time.sleep(self.scraper.requeue_delay)
+            results = fetch_concurrently(bills, self.scraper.try_bill_text, self.text_workers)
+            for bill, result in zip(bills, results):
+                self._collect(_Requeue(bill) if result is None else result, saved_keys)
+        if self.requeued:
+            print(f"⏳ {len(self.requeued)} bills still failing after {self.scraper.requeue_rounds} requeue rounds")
+            if self.checkpoint:
+                for bill in self.requeued:
+                    self.checkpoint.bill_failed(bill, "transient fetch failures")
+
+    def _write_bill(self, bill):
+        """Writer stage: persist one finished bill and return its record key"""
+        if isinstance(bill, _AlreadySaved):
+            record = self.scraper.store.get(bill.key)
+            self.scraper.metadata.upsert(metadata_row(record))
+            self.scraper.catalog.upsert(ma_row(bill.key, record))
+            self._confirm(bill.bill['number'])
+            return bill.key
+        if self.checkpoint and bill.get('text_source') == 'error':
+            # Keep errored bills out of the store so --resume fetches them again
+            self.checkpoint.bill_failed(bill, bill.get('full_text', ''))
+            return None
+        key = self.scraper.save_bill_data(bill)
+        self.scraper.save_text_file(bill)
+        self.scraper.metadata.upsert(metadata_row(bill))
+        self._confirm(bill['number'])
+        return key
+
+    def _confirm(self, number):
+        """Mark bills saved in the checkpoint once their metadata rows are on disk
+        
+        Until the metadata buffer is flushed, a crash would lose those rows, so
+        the bills stay in flight and --resume re-records them from the store.
+        """
+        self._unconfirmed.append(number)
+        if not self.scraper.metadata.buffer:
+            self._confirm_all()
+
+    def _confirm_all(self):
+        if self.checkpoint:
+            for unconfirmed in self._unconfirmed:
+                self.checkpoint.bill_saved({'number': unconfirmed})
+        self._unconfirmed = []
+
+    def run(self, start_page=1, end_page=2, skip_existing=True, pages=None, resume_bills=()):
+        """Run all stages and return the number of bills saved
+        
+        ``pages`` overrides the start/end range (used when resuming), and
+        ``resume_bills`` are stubs queued for text before any page is listed.
+        """
+        if pages is None:
+            pages = range(start_page, end_page + 1)
+        if skip_existing:
+            print(f"🔄 Found {len(self.scraper.bill_index)} existing bills, skipping duplicates")
+        print(f"🚰 Pipeline: {len(pages)} pages, {len(resume_bills)} resumed bills, {self.text_workers} text workers")
+
+        start_time = time.monotonic()
+        threads = [threading.Thread(target=self._list_bills, args=(pages, skip_existing, resume_bills),
+                                    name="listing", daemon=True)]
+        threads += [threading.Thread(target=self._fetch_texts, name=f"text-{i}", daemon=True)
+                    for i in range(self.text_workers)]
+        for thread in threads:
+            thread.start()
+
+        saved_keys = set()
+        finished_workers = 0
+        while finished_workers < self.text_workers:
+            bill = self.done_queue.get()
+            if bill is _DONE:
+                finished_workers += 1
+                continue
+            self._collect(bill, saved_keys)
+
+        for thread in threads:
+            thread.join()
+        self._retry_requeued(saved_keys)
+        self.scraper.bill_index.save()
+        self.scraper.text_url_resolver.save()
+        self.scraper.metadata.flush()
+        self.scraper.catalog.flush()
+        self.scraper.export_metrics()
+        self._confirm_all()
+        if self.checkpoint:
+            if self.checkpoint.has_unfinished_work():
+                self.checkpoint.save()
+                print(f"📌 Checkpoint: {self.checkpoint.summary()} (rerun with --resume)")
+            else:
+                self.checkpoint.mark_complete()
+
+        elapsed = time.monotonic() - start_time
+        saved_keys.discard(None)
+        if saved_keys:
+            metadata_file = f"{self.scraper.processed_dir}/bills_metadata.csv"
+            total = self.scraper.metadata.export_csv(metadata_file)
+            print(f"💾 Saved {len(saved_keys)} bills to {metadata_file} ({total} bills in metadata table)")
+            print(f"⏱️  {self.pages_scraped} pages, {len(saved_keys)} bills in {elapsed:.1f}s "
+                  f"({len(saved_keys) / elapsed:.2f} bills/s)")
+            self.scraper.print_summary(saved_keys)
+            print(f"🚦 Fetch controller: {self.scraper.fetch_controller.summary()}")
+        return len(saved_keys)
@@ -0,0 +1,489 @@
+# scripts/search_index.py
+import argparse
+import heapq
+import json
+import mmap
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from corpus_reader import FEDERAL_DIR, MA_DATA_DIR, iter_corpus_texts
+
+INDEX_DIR = "data/index"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were which with
+""".split())
+
+# docs.tsv columns; state, type and year can be used as query filters
+DOC_COLUMNS = ['doc_id', 'source', 'state', 'type', 'year', 'fingerprint', 'title']
+FILTER_FIELDS = ('state', 'type', 'year')
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def encode_varints(values):
+    """LEB128-encode non-negative integers (7 bits per byte, high bit = more bytes follow)"""
+    values = np.asarray(values, dtype=np.uint64)
+    if not len(values):
+        return b''
+    nbytes = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        nbytes += values >= (1 << shift)
+    starts = np.cumsum(nbytes) - nbytes
+    position = np.arange(int(nbytes.sum())) - np.repeat(starts, nbytes)
+    out = (np.repeat(values, nbytes) >> (7 * position).astype(np.uint64)) & 0x7F
+    out[position < np.repeat(nbytes - 1, nbytes)] |= 0x80
+    return out.astype(np.uint8).tobytes()
+
+
+def decode_varints(buffer):
+    """Decode a run of LEB128 integers into a uint32 array"""
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if not len(data):
+        return np.zeros(0, dtype=np.uint32)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    position = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    values = (data & 0x7F).astype(np.uint32) << (7 * position).astype(np.uint32)
+    return np.add.reduceat(values, starts)
+
+
+def document_fields(doc_id, source, record):
+    """Filterable fields for a corpus record: state, type and year"""
+    metadata = record.get('metadata') or {}
+    if source == 'ma':
+        year = re.search(r'\((\d{4})', record.get('general_court', ''))
+        return {'state': 'MA', 'type': 'state_bill', 'year': int(year.group(1)) if year else 0,
+                'title': record.get('title', '')}
+
+    year = record.get('year') or metadata.get('year') or 0
+    if not year:
+        # BillSum ids start with the Congress number, e.g. "110_hr37" (110th Congress began in 2007)
+        congress = re.match(r'(\d{2,3})_', str(record.get('bill_id', '')))
+        if congress:
+            year = 1787 + 2 * int(congress.group(1))
+    jurisdiction = metadata.get('state') or metadata.get('jurisdiction') or 'federal'
+    return {'state': 'US' if jurisdiction == 'federal' else jurisdiction,
+            'type': metadata.get('type', 'legal_document'),
+            'year': int(year) if str(year).isdigit() else 0,
+            'title': record.get('title', '')}
+
+
+def document_fingerprint(source, record, text):
+    """Cheap change marker: re-adding a document with a new fingerprint replaces it"""
+    return record.get('text_hash') or f"{len(text)}:{zlib.crc32(text.encode('utf-8')):08x}"
+
+
+class Segment:
+    """One immutable, memory-mapped index segment
+
+    ``postings.bin`` holds every term's posting list as two LEB128 runs
+    (doc-id gaps, then term frequencies); ``lexicon.tsv`` maps each term to
+    its document frequency and byte ranges. ``doclens.bin`` is a uint32
+    array of document lengths and ``docs.tsv`` their ids and fields.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.lexicon = {}
+        with open(f"{path}/lexicon.tsv", 'r', encoding='utf-8') as f:
+            for line in f:
+                term, df, offset, doc_bytes, tf_bytes = line.rstrip('\n').split('\t')
+                self.lexicon[term] = (int(df), int(offset), int(doc_bytes), int(tf_bytes))
+
+        self.docs = []
+        with open(f"{path}/docs.tsv", 'r', encoding='utf-8') as f:
+            for line in f:
+                self.docs.append(dict(zip(DOC_COLUMNS, line.rstrip('\n').split('\t'))))
+
+        self._postings = self._map(f"{path}/postings.bin")
+        self._lengths = self._map(f"{path}/doclens.bin")
+        self.doc_lengths = np.frombuffer(self._lengths or b'', dtype=np.uint32)
+        self.years = np.array([int(doc['year']) for doc in self.docs], dtype=np.int32)
+        self.live = np.ones(len(self.docs), dtype=bool)
+        self._masks = {}
+
+    @staticmethod
+    def _map(path):
+        if not os.path.getsize(path):
+            return None
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def postings(self, term):
+        """(doc numbers, term frequencies) for a term in this segment"""
+        entry = self.lexicon.get(term)
+        if entry is None:
+            return None
+        _, offset, doc_bytes, tf_bytes = entry
+        docs = np.cumsum(decode_varints(self._postings[offset:offset + doc_bytes]), dtype=np.int64)
+        tfs = decode_varints(self._postings[offset + doc_bytes:offset + doc_bytes + tf_bytes])
+        return docs, tfs
+
+    def field_mask(self, field, value):
+        """Boolean mask of documents matching one filter; year accepts (min, max)"""
+        if field == 'year':
+            if isinstance(value, (tuple, list)):
+                low, high = value
+                return (self.years >= (low or 0)) & (self.years <= (high or np.iinfo(np.int32).max))
+            return self.years == int(value)
+        key = (field, value)
+        if key not in self._masks:
+            self._masks[key] = np.array([doc[field] == value for doc in self.docs], dtype=bool)
+        return self._masks[key]
+
+    def close(self):
+        self.doc_lengths = None     # release the buffer export before unmapping
+        for mapped in (self._postings, self._lengths):
+            if mapped is not None:
+                mapped.close()
+
+
+def write_segment(path, documents, postings):
+    """Write one segment from in-memory postings {term: ([doc numbers], [tfs])}"""
+    tmp_path = f"{path}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    with open(f"{tmp_path}/postings.bin", 'wb') as data, \
+            open(f"{tmp_path}/lexicon.tsv", 'w', encoding='utf-8') as lexicon:
+        offset = 0
+        for term in sorted(postings):
+            docs, tfs = postings[term]
+            doc_blob = encode_varints(np.diff(np.asarray(docs, dtype=np.int64), prepend=0))
+            tf_blob = encode_varints(tfs)
+            data.write(doc_blob)
+            data.write(tf_blob)
+            lexicon.write(f"{term}\t{len(docs)}\t{offset}\t{len(doc_blob)}\t{len(tf_blob)}\n")
+            offset += len(doc_blob) + len(tf_blob)
+
+    np.asarray([doc['length'] for doc in documents], dtype=np.uint32).tofile(f"{tmp_path}/doclens.bin")
+    with open(f"{tmp_path}/docs.tsv", 'w', encoding='utf-8') as f:
+        for doc in documents:
+            f.write('\t'.join(re.sub(r'[\t\n\r]', ' ', str(doc.get(column, ''))) for column in DOC_COLUMNS) + '\n')
+    if os.path.exists(path):
+        shutil.rmtree(path)     # left over from a crash before the manifest was updated
+    os.replace(tmp_path, path)
+
+
+class SearchIndex:
+    """Segmented on-disk inverted index with BM25 ranking
+
+    New documents are buffered and written as a new segment by ``commit()``;
+    existing segments are never modified, so adding documents is cheap and a
+    crash mid-build loses only the uncommitted buffer. ``segments.json`` is
+    the commit point. A document re-added with a new fingerprint shadows its
+    older copy; ``merge()`` folds all segments into one and drops shadowed
+    copies.
+    """
+
+    MANIFEST = "segments.json"
+
+    def __init__(self, root=INDEX_DIR, k1=1.2, b=0.75, segment_docs=20000):
+        self.root = root
+        self.k1 = k1
+        self.b = b
+        self.segment_docs = segment_docs
+        self.segments = []
+        self.pending_docs = []
+        self.pending_postings = {}
+        os.makedirs(root, exist_ok=True)
+
+        manifest_path = f"{root}/{self.MANIFEST}"
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                names = json.load(f)['segments']
+            self.segments = [Segment(f"{root}/{name}") for name in names]
+        self._refresh()
+
+    def _refresh(self):
+        """Recompute which copy of each document is live and the collection statistics"""
+        self.locations = {}         # doc_id -> (segment number, doc number) of the live copy
+        for s, segment in enumerate(self.segments):
+            segment.live[:] = True
+            for n, doc in enumerate(segment.docs):
+                previous = self.locations.get(doc['doc_id'])
+                if previous is not None:
+                    self.segments[previous[0]].live[previous[1]] = False
+                self.locations[doc['doc_id']] = (s, n)
+        self.doc_count = len(self.locations)
+        total_length = sum(int(segment.doc_lengths[segment.live].sum()) for segment in self.segments)
+        self.avg_length = total_length / self.doc_count if self.doc_count else 0.0
+        self._norms = {}
+
+    def __len__(self):
+        return self.doc_count
+
+    def __contains__(self, doc_id):
+        return doc_id in self.locations
+
+    def fingerprint(self, doc_id):
+        location = self.locations.get(doc_id)
+        if location is None:
+            return None
+        return self.segments[location[0]].docs[location[1]]['fingerprint']
+
+    def add(self, doc_id, text, source='', fields=None, fingerprint=''):
+        """Buffer one document; it becomes searchable after commit()"""
+        counts = Counter(tokenize(text))
+        number = len(self.pending_docs)
+        doc = {'doc_id': doc_id, 'source': source, 'fingerprint': fingerprint,
+               'length': sum(counts.values()), **(fields or {})}
+        doc.setdefault('year', 0)
+        self.pending_docs.append(doc)
+        for term, tf in counts.items():
+            entry = self.pending_postings.get(term)
+            if entry is None:
+                entry = self.pending_postings[term] = ([], [])
+            entry[0].append(number)
+            entry[1].append(tf)
+        if len(self.pending_docs) >= self.segment_docs:
+            self.commit()
+
+    def _next_segment_name(self):
+        numbers = [int(segment.name.split('-')[1]) for segment in self.segments]
+        return f"seg-{max(numbers, default=-1) + 1:05d}"
+
+    def _write_manifest(self):
+        tmp_path = f"{self.root}/{self.MANIFEST}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'segments': [segment.name for segment in self.segments]}, f)
+        os.replace(tmp_path, f"{self.root}/{self.MANIFEST}")
+
+    def commit(self):
+        """Write buffered documents as a new segment"""
+        if not self.pending_docs:
+            return 0
+        path = f"{self.root}/{self._next_segment_name()}"
+        write_segment(path, self.pending_docs, self.pending_postings)
+        added = len(self.pending_docs)
+        self.pending_docs = []
+        self.pending_postings = {}
+        self.segments.append(Segment(path))
+        self._write_manifest()
+        self._refresh()
+        return added
+
+    def merge(self):
+        """Fold all segments into one, dropping shadowed document copies"""
+        if len(self.segments) < 2 and all(segment.live.all() for segment in self.segments):
+            return
+        documents = []
+        renumber = []               # per segment: old doc number -> new doc number (-1 if dropped)
+        for segment in self.segments:
+            mapping = np.full(len(segment.docs), -1, dtype=np.int64)
+            for n in np.flatnonzero(segment.live):
+                mapping[n] = len(documents)
+                documents.append({**segment.docs[n], 'length': int(segment.doc_lengths[n])})
+            renumber.append(mapping)
+
+        postings = {}
+        for term in sorted(set().union(*(segment.lexicon for segment in self.segments))):
+            doc_parts, tf_parts = [], []
+            for segment, mapping in zip(self.segments, renumber):
+                found = segment.postings(term)
+                if found is None:
+                    continue
+                docs = mapping[found[0]]
+                keep = docs >= 0
+                doc_parts.append(docs[keep])
+                tf_parts.append(found[1][keep])
+            docs = np.concatenate(doc_parts)
+            if len(docs):
+                postings[term] = (docs, np.concatenate(tf_parts))
+
+        old_segments = self.segments
+        path = f"{self.root}/{self._next_segment_name()}"
+        write_segment(path, documents, postings)
+        self.segments = [Segment(path)]
+        self._write_manifest()
+        for segment in old_segments:
+            segment.close()
+            shutil.rmtree(segment.path)
+        self._refresh()
+
+    def _norm(self, s):
+        """k1 * (1 - b + b * len / avgdl) for every document of a segment"""
+        norm = self._norms.get(s)
+        if norm is None:
+            lengths = self.segments[s].doc_lengths.astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * lengths / max(self.avg_length, 1.0))
+            self._norms[s] = norm
+        return norm
+
+    def search(self, query, k=10, filters=None):
+        """Top-k documents by BM25 as (score, doc) pairs, best first
+
+        ``filters`` restricts results by document field, e.g.
+        ``{'state': 'MA', 'type': 'state_bill', 'year': (2019, 2024)}``.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.doc_count:
+            return []
+        for field in filters or {}:
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unknown filter field: {field} (use {', '.join(FILTER_FIELDS)})")
+
+        dfs = {term: sum(segment.lexicon[term][0] for segment in self.segments if term in segment.lexicon)
+               for term in terms}
+        idfs = {term: np.log(1 + (self.doc_count - df + 0.5) / (df + 0.5)) for term, df in dfs.items() if df}
+
+        candidates = []
+        for s, segment in enumerate(self.segments):
+            scores = None
+            norm = self._norm(s)
+            for term, idf in idfs.items():
+                found = segment.postings(term)
+                if found is None:
+                    continue
+                docs, tfs = found
+                if scores is None:
+                    scores = np.zeros(len(segment.docs), dtype=np.float32)
+                tfs = tfs.astype(np.float32)
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+            if scores is None:
+                continue
+
+            mask = segment.live
+            for field, value in (filters or {}).items():
+                mask = mask & segment.field_mask(field, value)
+            matched = np.flatnonzero((scores > 0) & mask)
+            if len(matched) > k:
+                matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+            candidates.extend((float(scores[n]), s, int(n)) for n in matched)
+
+        best = heapq.nlargest(k, candidates)
+        return [(score, self.segments[s].docs[n]) for score, s, n in best]
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+
+def build_index(index_dir=INDEX_DIR, data_dir=MA_DATA_DIR, federal_dir=FEDERAL_DIR,
+                sources=('ma', 'federal'), merge=False):
+    """Add new or changed corpus documents to the index; unchanged ones are skipped"""
+    index = SearchIndex(index_dir)
+    start_time = time.monotonic()
+    added = 0
+    skipped = 0
+    for doc_id, source, text, record in iter_corpus_texts(data_dir, federal_dir, sources):
+        fingerprint = document_fingerprint(source, record, text)
+        if index.fingerprint(doc_id) == fingerprint:
+            skipped += 1
+            continue
+        # Summaries and titles are searchable alongside the text
+        searchable = '\n'.join(part for part in (record.get('title'), record.get('summary'), text) if part)
+        index.add(doc_id, searchable, source, document_fields(doc_id, source, record), fingerprint)
+        added += 1
+    index.commit()
+    if merge:
+        index.merge()
+
+    elapsed = time.monotonic() - start_time
+    print(f"🔎 Indexed {added} new/changed documents ({skipped} unchanged) in {elapsed:.1f}s; "
+          f"{len(index)} documents in {len(index.segments)} segment(s) at {index_dir}")
+    return index
+
+
+def synthetic_documents(count, seed=0):
+    """Bill-like documents with a Zipfian vocabulary for benchmarking"""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(50000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    states = ['MA', 'US', 'CA', 'NY', 'TX']
+    for n in range(count):
+        words = rng.choices(vocabulary, weights, k=rng.randint(200, 1500))
+        yield (f"synthetic:{n}", ' '.join(words),
+               {'state': rng.choice(states), 'type': rng.choice(['state_bill', 'congressional_bill']),
+                'year': rng.randint(2000, 2024), 'title': ''})
+
+
+def benchmark(index, queries=1000, k=10, filters=None, seed=0):
+    """Query latency percentiles (ms) for random 1-4 term queries drawn from the index vocabulary"""
+    rng = random.Random(seed)
+    vocabulary = sorted(set().union(*(segment.lexicon for segment in index.segments)))
+    latencies = []
+    for _ in range(queries):
+        query = ' '.join(rng.sample(vocabulary, rng.randint(1, 4)))
+        start = time.perf_counter()
+        index.search(query, k=k, filters=filters)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+    print(f"📊 {queries} queries over {len(index)} documents ({len(index.segments)} segment(s)), "
+          f"filters={filters or {}}:")
+    print(f"   p50 {percentile(50):.2f} ms | p95 {percentile(95):.2f} ms | p99 {percentile(99):.2f} ms | "
+          f"max {latencies[-1]:.2f} ms")
+    return {'p50': percentile(50), 'p95': percentile(95), 'p99': percentile(99)}
+
+
+def parse_filters(items):
+    """['state=MA', 'year=2019-2024'] -> {'state': 'MA', 'year': (2019, 2024)}"""
+    filters = {}
+    for item in items:
+        field, _, value = item.partition('=')
+        if field == 'year':
+            low, _, high = value.partition('-')
+            value = (int(low), int(high)) if high else int(low)
+        filters[field] = value
+    return filters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the BM25 search index")
+    parser.add_argument('command', choices=['build', 'search', 'merge', 'benchmark'])
+    parser.add_argument('query', nargs='?', default='')
+    parser.add_argument('--index', default=INDEX_DIR)
+    parser.add_argument('--sources', default='ma,federal')
+    parser.add_argument('--merge', action='store_true', help="Merge segments after building")
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--filter', action='append', default=[], metavar='FIELD=VALUE',
+                        help="state=MA, type=state_bill, year=2023 or year=2019-2024")
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help="Benchmark a throwaway index of this many synthetic documents")
+    args = parser.parse_args()
+    filters = parse_filters(args.filter)
+
+    if args.command == 'build':
+        build_index(args.index, sources=tuple(args.sources.split(',')), merge=args.merge).close()
+    elif args.command == 'merge':
+        index = SearchIndex(args.index)
+        index.merge()
+        print(f"🔎 {len(index)} documents in {len(index.segments)} segment(s)")
+    elif args.command == 'search':
+        index = SearchIndex(args.index)
+        for score, doc in index.search(args.query, k=args.k, filters=filters):
+            print(f"{score:7.2f}  {doc['doc_id']:<28} {doc['state']:<3} {doc['year']:<5} {doc['title'][:70]}")
+    elif args.synthetic:
+        tmp_dir = tempfile.mkdtemp(prefix='search_index_')
+        try:
+            index = SearchIndex(tmp_dir)
+            start_time = time.monotonic()
+            for doc_id, text, fields in synthetic_documents(args.synthetic):
+                index.add(doc_id, text, 'synthetic', fields)
+            index.commit()
+            print(f"🔎 Built {len(index)} synthetic documents in {time.monotonic() - start_time:.1f}s")
+            benchmark(index, args.queries, args.k, filters)
+            index.close()
+        finally:
+            shutil.rmtree(tmp_dir)
+    else:
+        benchmark(SearchIndex(args.index), args.queries, args.k, filters)
@@ -1,29 +1,46 @@
 # scripts/setup_federal_foundations.py
 from datasets import load_dataset
+import argparse
 import json
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def setup_federal_foundations():
+from catalog import CATALOG_PATH, Catalog, federal_row
+from corpus_reader import INGEST_REPORT_FILENAME
+from jsonl_shards import ShardedJsonlWriter
+
+def setup_federal_foundations(streaming=False, sample_size=100, max_records=None, max_bytes=None,
+                              shard_records=10000, shard_bytes=64 * 1024 * 1024, sources=None,
+                              workers=None, local_paths=None, cache_dir=None, offline=False):
     base_dir = "data/federal_foundations"
     os.makedirs(base_dir, exist_ok=True)
     
     print("📥 Setting up federal foundations using Hugging Face datasets...")
     
     try:
-        # 1. Load BillSum dataset (perfect for your use case)
-        print("📥 Loading BillSum dataset...")
-        billsum_dataset = load_dataset("billsum", split='train[:100]')  # First 100 bills to start
-        save_billsum_data(billsum_dataset, f"{base_dir}/billsum_congressional.json")
-        
-        # 2. Try to load Cornell Legal Corpus
-        print("📥 Loading legal corpus...")
-        try:
-            legal_corpus = load_dataset("cornell-legal/legal_corpus", split='train[:500]')
-            save_legal_corpus(legal_corpus, f"{base_dir}/cornell_legal_corpus.json")
-        except Exception as e:
-            print(f"⚠️  Cornell dataset unavailable: {e}")
-            # Fallback to other legal datasets
-            load_alternative_legal_data(base_dir)
+        if streaming:
+            # Every registered source is ingested in its own worker process into sharded JSONL
+            options = {'max_records': max_records, 'max_bytes': max_bytes,
+                       'shard_records': shard_records, 'shard_bytes': shard_bytes,
+                       'local_paths': local_paths or {}, 'cache_dir': cache_dir, 'offline': offline}
+            ingest_sources(sources or list(SOURCES), base_dir, options, workers=workers)
+        else:
+            # 1. Load BillSum dataset (perfect for your use case)
+            print("📥 Loading BillSum dataset...")
+            billsum_dataset = load_dataset("billsum", split=f'train[:{sample_size}]')
+            save_billsum_data(billsum_dataset, f"{base_dir}/billsum_congressional.json")
+            
+            # 2. Try to load Cornell Legal Corpus
+            print("📥 Loading legal corpus...")
+            try:
+                legal_corpus = load_dataset("cornell-legal/legal_corpus", split=f'train[:{sample_size * 5}]')
+                save_legal_corpus(legal_corpus, f"{base_dir}/cornell_legal_corpus.json")
+            except Exception as e:
+                print(f"⚠️  Cornell dataset unavailable: {e}")
+                # Fallback to other legal datasets
+                load_alternative_legal_data(base_dir, sample_size=sample_size)
         
         # 3. Create constitutional framework
         create_constitutional_framework(base_dir)
@@ -38,68 +55,236 @@ def setup_federal_foundations():
         print(f"❌ Error: {e}")
         print("💡 Make sure you installed: pip install datasets")
 
+def normalize_billsum(item):
+    """Normalize one BillSum row into our record format"""
+    return {
+        "text": item.get('text', ''),
+        "summary": item.get('summary', ''),
+        "title": item.get('title', ''),
+        "bill_id": item.get('bill_id', ''),
+        "metadata": {
+            "type": "congressional_bill",
+            "source": "BillSum",
+            "length": len(item.get('text', '')),
+            "is_test": item.get('is_test', False)
+        }
+    }
+
+def normalize_legal_doc(item):
+    """Normalize one legal corpus row into our record format"""
+    return {
+        "text": item.get('text', ''),
+        "metadata": {
+            "source": item.get('source', 'unknown'),
+            "type": item.get('type', 'legal_document'),
+            "length": len(item.get('text', '')),
+            "jurisdiction": item.get('jurisdiction', 'federal')
+        }
+    }
+
+def catalog_records(records, filepath, catalog_path=CATALOG_PATH):
+    """Catalog a sample-mode JSON array under the ids corpus_reader gives its records"""
+    source = os.path.splitext(os.path.basename(filepath))[0]
+    catalog = Catalog(catalog_path)
+    for n, record in enumerate(records):
+        catalog.upsert(federal_row(f"{source}:{record.get('bill_id') or n}", record, filepath))
+    catalog.close()
+
 def save_billsum_data(dataset, filepath):
     """Save BillSum dataset to structured JSON"""
-    bills = []
-    for item in dataset:
-        bills.append({
-            "text": item.get('text', ''),
-            "summary": item.get('summary', ''),
-            "title": item.get('title', ''),
-            "bill_id": item.get('bill_id', ''),
-            "metadata": {
-                "type": "congressional_bill",
-                "source": "BillSum",
-                "length": len(item.get('text', '')),
-                "is_test": item.get('is_test', False)
-            }
-        })
+    bills = [normalize_billsum(item) for item in dataset]
     
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(bills, f, indent=2, ensure_ascii=False)
+    catalog_records(bills, filepath)
     print(f"✅ Saved {len(bills)} bills from BillSum")
 
 def save_legal_corpus(dataset, filepath):
     """Save legal corpus data"""
-    legal_docs = []
-    for item in dataset:
-        legal_docs.append({
-            "text": item.get('text', ''),
-            "metadata": {
-                "source": item.get('source', 'unknown'),
-                "type": item.get('type', 'legal_document'),
-                "length": len(item.get('text', '')),
-                "jurisdiction": item.get('jurisdiction', 'federal')
-            }
-        })
+    legal_docs = [normalize_legal_doc(item) for item in dataset]
     
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(legal_docs, f, indent=2, ensure_ascii=False)
+    catalog_records(legal_docs, filepath)
     print(f"✅ Saved {len(legal_docs)} legal documents")
 
-def load_alternative_legal_data(base_dir):
+def normalize_batch(items, normalize):
+    """Normalize a batch of rows, collecting per-row errors instead of hiding them"""
+    records = []
+    errors = []
+    for item in items:
+        try:
+            records.append(normalize(item))
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+    return records, errors
+
+def write_records_to_shards(records, normalize, out_dir, prefix, max_records=None, max_bytes=None,
+                            shard_records=10000, shard_bytes=64 * 1024 * 1024, batch_size=1000,
+                            catalog_path=CATALOG_PATH):
+    """Normalize records in batches into sharded JSONL, stopping at the record/byte limits
+
+    Each batch is also catalogued in one transaction, under the ids
+    corpus_reader gives the records (``<output dir name>:<bill_id or n>``).
+    """
+    start_time = time.monotonic()
+    errors = []
+    error_count = 0
+    source = os.path.basename(os.path.normpath(out_dir))
+    catalog = Catalog(catalog_path, batch_size=batch_size)
+    
+    def flush(batch):
+        nonlocal error_count
+        normalized, batch_errors = normalize_batch(batch, normalize)
+        error_count += len(batch_errors)
+        errors.extend(batch_errors[:max(0, 20 - len(errors))])  # keep a sample of messages
+        for record in normalized:
+            if max_records is not None and writer.total_records >= max_records:
+                return False
+            if max_bytes is not None and writer.total_bytes >= max_bytes:
+                return False
+            doc_id = f"{source}:{record.get('bill_id') or writer.total_records}"
+            writer.write(record)
+            catalog.upsert(federal_row(doc_id, record, out_dir))
+        return True
+    
+    with ShardedJsonlWriter(out_dir, prefix, shard_records, shard_bytes) as writer:
+        batch = []
+        for item in records:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                if not flush(batch):
+                    batch = []
+                    break
+                batch = []
+                if writer.total_records % (batch_size * 10) == 0:
+                    print(f"   ... {prefix}: {writer.total_records} records, {writer.total_bytes / 1e6:.1f} MB")
+        if batch:
+            flush(batch)
+    catalog.close()
+    
+    elapsed = max(time.monotonic() - start_time, 1e-9)
+    print(f"✅ Streamed {writer.total_records} records ({writer.total_bytes / 1e6:.1f} MB) "
+          f"into {len(writer.shards)} shards in {out_dir} ({writer.total_records / elapsed:.0f} records/s)")
+    return {
+        'records': writer.total_records,
+        'bytes': writer.total_bytes,
+        'shards': len(writer.shards),
+        'seconds': round(elapsed, 3),
+        'records_per_sec': round(writer.total_records / elapsed, 1),
+        'error_count': error_count,
+        'errors': errors,
+    }
+
+# Registry of federal foundation sources; each one is ingested by its own worker
+SOURCES = {
+    'billsum': {'dataset': "billsum", 'config': None, 'split': 'train',
+                'normalize': normalize_billsum, 'output': "billsum"},
+    'cornell': {'dataset': "cornell-legal/legal_corpus", 'config': None, 'split': 'train',
+                'normalize': normalize_legal_doc, 'output': "cornell_legal_corpus"},
+    'pile_of_law': {'dataset': "pile-of-law/pile-of-law", 'config': "all", 'split': 'train',
+                    'normalize': normalize_legal_doc, 'output': "pile_of_law", 'trust_remote_code': True},
+    'harvard': {'dataset': "harvard-lil/legal-corpus", 'config': None, 'split': 'train',
+                'normalize': normalize_legal_doc, 'output': "harvard_legal_corpus"},
+}
+
+# File extension -> Hugging Face packaged loader for local dataset files
+LOCAL_LOADERS = {'.json': 'json', '.jsonl': 'json', '.parquet': 'parquet', '.csv': 'csv', '.arrow': 'arrow'}
+
+def open_source_dataset(spec, local_path=None, cache_dir=None, offline=False):
+    """Open a source as an iterable of rows: local files, the local HF cache, or the Hub"""
+    if local_path:
+        if os.path.isdir(local_path):
+            files = sorted(os.path.join(local_path, name) for name in os.listdir(local_path)
+                           if os.path.splitext(name)[1] in LOCAL_LOADERS)
+        else:
+            files = [local_path]
+        if not files:
+            raise FileNotFoundError(f"No dataset files in {local_path}")
+        loader = LOCAL_LOADERS.get(os.path.splitext(files[0])[1], 'json')
+        return load_dataset(loader, data_files=files, split='train', streaming=True)
+    
+    kwargs = {'split': spec['split'], 'cache_dir': cache_dir}
+    if spec.get('trust_remote_code'):
+        kwargs['trust_remote_code'] = True
+    if offline:
+        # Streaming needs the Hub; cached Arrow files are memory-mapped instead
+        return load_dataset(spec['dataset'], spec.get('config'), **kwargs)
+    return load_dataset(spec['dataset'], spec.get('config'), streaming=True, **kwargs)
+
+def ingest_source(name, base_dir, options):
+    """Worker entry point: ingest one registered source and return its report"""
+    spec = SOURCES[name]
+    report = {'source': name, 'dataset': spec['dataset'], 'status': 'ok'}
+    start_time = time.monotonic()
+    try:
+        dataset = open_source_dataset(spec, options.get('local_paths', {}).get(name),
+                                      options.get('cache_dir'), options.get('offline', False))
+        report.update(write_records_to_shards(
+            dataset, spec['normalize'], f"{base_dir}/{spec['output']}", name,
+            max_records=options.get('max_records'), max_bytes=options.get('max_bytes'),
+            shard_records=options.get('shard_records', 10000),
+            shard_bytes=options.get('shard_bytes', 64 * 1024 * 1024),
+            batch_size=options.get('batch_size', 1000),
+            catalog_path=options.get('catalog_path', CATALOG_PATH)))
+    except Exception as e:
+        report.update({'status': 'failed', 'error': f"{type(e).__name__}: {e}",
+                       'seconds': round(time.monotonic() - start_time, 3)})
+    return report
+
+def ingest_sources(names, base_dir, options, workers=None):
+    """Ingest several sources in parallel worker processes and print a per-source report"""
+    unknown = [name for name in names if name not in SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown sources: {', '.join(unknown)} (known: {', '.join(SOURCES)})")
+    
+    if options.get('offline'):
+        # Read by the datasets library when each spawned worker imports it
+        os.environ['HF_DATASETS_OFFLINE'] = '1'
+        os.environ['HF_HUB_OFFLINE'] = '1'
+    
+    print(f"📥 Ingesting {len(names)} sources in parallel: {', '.join(names)}")
+    reports = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers or len(names), mp_context=context) as executor:
+        futures = {executor.submit(ingest_source, name, base_dir, options): name for name in names}
+        for future in as_completed(futures):
+            reports.append(future.result())
+    
+    reports.sort(key=lambda report: names.index(report['source']))
+    print("\n📊 Ingestion report:")
+    for report in reports:
+        if report['status'] == 'ok':
+            print(f"   ✅ {report['source']:<12} {report['records']:>9} records "
+                  f"{report['bytes'] / 1e6:>8.1f} MB {report['records_per_sec']:>9.0f} rec/s "
+                  f"{report['error_count']:>5} errors")
+        else:
+            print(f"   ❌ {report['source']:<12} {report['error']}")
+    
+    with open(f"{base_dir}/{INGEST_REPORT_FILENAME}", 'w', encoding='utf-8') as f:
+        json.dump(reports, f, indent=2)
+    return reports
+
+def load_alternative_legal_data(base_dir, sample_size=100):
     """Load alternative legal datasets if Cornell is unavailable"""
+    print("📥 Trying alternative legal datasets...")
+    
+    # Try Pile of Law dataset
     try:
-        print("📥 Trying alternative legal datasets...")
+        pile_of_law = load_dataset("pile-of-law/pile-of-law", "all", split=f'train[:{sample_size}]',
+                                   trust_remote_code=True)
+        save_legal_corpus(pile_of_law, f"{base_dir}/pile_of_law_sample.json")
+        print("✅ Loaded Pile of Law sample")
+    except Exception as e:
+        print(f"⚠️  Pile of Law unavailable: {e}")
         
-        # Try Pile of Law dataset
-        try:
-            pile_of_law = load_dataset("pile-of-law/pile-of-law", "all", split='train[:100]', trust_remote_code=True)
-            save_legal_corpus(pile_of_law, f"{base_dir}/pile_of_law_sample.json")
-            print("✅ Loaded Pile of Law sample")
-        except:
-            pass
-            
-        # Try Harvard Legal Corpus
-        try:
-            harvard_law = load_dataset("harvard-lil/legal-corpus", split='train[:100]')
-            save_legal_corpus(harvard_law, f"{base_dir}/harvard_legal_corpus.json")
-            print("✅ Loaded Harvard Legal Corpus sample")
-        except:
-            pass
-            
+    # Try Harvard Legal Corpus
+    try:
+        harvard_law = load_dataset("harvard-lil/legal-corpus", split=f'train[:{sample_size}]')
+        save_legal_corpus(harvard_law, f"{base_dir}/harvard_legal_corpus.json")
+        print("✅ Loaded Harvard Legal Corpus sample")
     except Exception as e:
-        print(f"⚠️  Could not load alternative datasets: {e}")
+        print(f"⚠️  Harvard Legal Corpus unavailable: {e}")
 
 def create_constitutional_framework(base_dir):
     """Create basic constitutional structure"""
@@ -153,4 +338,35 @@ def create_legal_principles(base_dir):
     print("✅ Legal principles created!")
 
 if __name__ == "__main__":
-    setup_federal_foundations()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download federal foundation datasets")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Stream full splits into sharded JSONL instead of saving a small sample")
+    parser.add_argument('--sample-size', type=int, default=100, help="Rows per dataset in sample mode")
+    parser.add_argument('--max-records', type=int, default=None, help="Stop each dataset after this many records")
+    parser.add_argument('--max-mb', type=float, default=None, help="Stop each dataset after this many MB")
+    parser.add_argument('--shard-records', type=int, default=10000)
+    parser.add_argument('--shard-mb', type=float, default=64)
+    parser.add_argument('--sources', default=None,
+                        help=f"Comma-separated sources to stream (default: all of {', '.join(SOURCES)})")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per source)")
+    parser.add_argument('--local', action='append', default=[], metavar='SOURCE=PATH',
+                        help="Read a source from local JSON/JSONL/Parquet/CSV files instead of the Hub")
+    parser.add_argument('--cache-dir', default=None, help="Hugging Face datasets cache directory")
+    parser.add_argument('--offline', action='store_true', help="Never contact the Hub; use local files or cache")
+    args = parser.parse_args()
+    
+    local_paths = dict(item.split('=', 1) for item in args.local)
+    
+    setup_federal_foundations(
+        streaming=args.streaming,
+        sample_size=args.sample_size,
+        max_records=args.max_records,
+        max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb else None,
+        shard_records=args.shard_records,
+        shard_bytes=int(args.shard_mb * 1024 * 1024),
+        sources=args.sources.split(',') if args.sources else None,
+        workers=args.workers,
+        local_paths=local_paths,
+        cache_dir=args.cache_dir,
+        offline=args.offline,
+    )
\ No newline at end of file
@@ -0,0 +1,421 @@
+# scripts/shard_runner.py
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from checkpoint import ScrapeCheckpoint
+from corpus_reader import MA_DATA_DIR
+from corpus_store import CorpusStore
+from ma_bill_scrapper import MABillScraper, has_bill_text
+from metadata_table import metadata_row
+from near_duplicates import SOURCE_RANK
+from scrape_pipeline import ScrapePipeline
+from text_store import TextStore
+
+SHARDS_DIR = "data/shards"
+
+
+def unit_id(session, start_page, end_page):
+    """Work unit name, e.g. 193rd_p0001-0010"""
+    return f"{session}_p{start_page:04d}-{end_page:04d}"
+
+
+def record_rank(record):
+    """How good a copy of a bill is: real text first, then the better text source, then the longer text"""
+    return (has_bill_text(record), SOURCE_RANK.get(record.get('text_source'), 0), record.get('text_length') or 0)
+
+
+class ShardWorkDir:
+    """Shared work directory splitting a scrape into (session, page range) units
+
+    ``plan.json`` lists the units. A worker claims a unit by creating
+    ``claims/<unit>.json`` with O_EXCL, which is atomic on a local disk and
+    on a shared network filesystem alike, so any number of processes on any
+    number of machines can pull units from the same directory. Claims are
+    touched while a unit runs; a claim left untouched for ``stale_after``
+    seconds belongs to a dead worker and is taken over by the one worker
+    that moves that same claim aside. Every unit scrapes
+    into its own data directory under ``units/``, and ``merge`` folds the
+    finished ones into the main corpus.
+    """
+
+    def __init__(self, root=SHARDS_DIR, stale_after=600):
+        self.root = root
+        self.stale_after = stale_after
+        self.plan_path = f"{root}/plan.json"
+        for folder in ('claims', 'done', 'units'):
+            os.makedirs(f"{root}/{folder}", exist_ok=True)
+
+    def units(self):
+        if not os.path.exists(self.plan_path):
+            return []
+        with open(self.plan_path, 'r', encoding='utf-8') as f:
+            return json.load(f)['units']
+
+    def add_units(self, units):
+        """Add units to the plan, keeping those already planned; returns the number added"""
+        planned = {unit['id']: unit for unit in self.units()}
+        added = [unit for unit in units if unit['id'] not in planned]
+        planned.update({unit['id']: unit for unit in added})
+        tmp_path = f"{self.plan_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': time.time(), 'units': list(planned.values())}, f, indent=2)
+        os.replace(tmp_path, self.plan_path)
+        return len(added)
+
+    def unit_dir(self, unit):
+        return f"{self.root}/units/{unit['id']}"
+
+    def claim_path(self, unit):
+        return f"{self.root}/claims/{unit['id']}.json"
+
+    def done_path(self, unit):
+        return f"{self.root}/done/{unit['id']}.json"
+
+    def result(self, unit):
+        """The finished unit's result, or None"""
+        try:
+            with open(self.done_path(unit), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _create_claim(self, unit, worker_id):
+        try:
+            fd = os.open(self.claim_path(unit), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'worker': worker_id, 'claimed_at': time.time()}, f)
+        return True
+
+    def _read_claim(self, path):
+        """(claim, seconds since its last heartbeat) of a claim file, or None if it is gone"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                claim = json.load(f)
+            return claim, time.time() - os.path.getmtime(path)
+        except (FileNotFoundError, ValueError):
+            return None     # removed, or still being written by its creator
+
+    def _take_stale_claim(self, unit, worker_id):
+        """Move a dead worker's claim aside; True only if this worker moved that very claim"""
+        path = self.claim_path(unit)
+        seen = self._read_claim(path)
+        if seen is None or seen[1] <= self.stale_after:
+            return False
+        moved_path = f"{path}.{worker_id}.stale"
+        try:
+            os.rename(path, moved_path)
+        except FileNotFoundError:
+            return False    # another worker moved it first
+        moved = self._read_claim(moved_path)
+        if moved is not None and moved[0] == seen[0] and moved[1] > self.stale_after:
+            return True
+        # Between our look and the rename another worker took the unit over and
+        # wrote a fresh claim: put it back (unless yet another claim exists by now)
+        try:
+            os.link(moved_path, path)
+        except FileExistsError:
+            pass
+        os.remove(moved_path)
+        return False
+
+    def claim(self, worker_id, skip=()):
+        """Claim the next unfinished unit for this worker, or return None when none is left"""
+        for unit in self.units():
+            if unit['id'] in skip or os.path.exists(self.done_path(unit)):
+                continue
+            if self._create_claim(unit, worker_id):
+                return unit
+            if self._take_stale_claim(unit, worker_id) and self._create_claim(unit, worker_id):
+                print(f"♻️  {worker_id} took over stale unit {unit['id']}")
+                return unit
+        return None
+
+    def heartbeat(self, unit):
+        try:
+            os.utime(self.claim_path(unit))
+        except FileNotFoundError:
+            pass
+
+    def release(self, unit):
+        try:
+            os.remove(self.claim_path(unit))
+        except FileNotFoundError:
+            pass
+
+    def finish(self, unit, result):
+        """Record a unit's result; finished units are never claimed again"""
+        tmp_path = f"{self.done_path(unit)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        os.replace(tmp_path, self.done_path(unit))
+        self.release(unit)
+
+    def reset(self, unit):
+        """Make a finished unit claimable again; its checkpoint resumes what it left unfinished"""
+        for path in (self.done_path(unit), self.claim_path(unit)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def status(self):
+        """(done, running, pending) lists of units"""
+        done, running, pending = [], [], []
+        for unit in self.units():
+            if os.path.exists(self.done_path(unit)):
+                done.append(unit)
+            elif os.path.exists(self.claim_path(unit)):
+                running.append(unit)
+            else:
+                pending.append(unit)
+        return done, running, pending
+
+
+def plan_sessions(work, sessions, pages_per_unit=10, max_pages=None, base_url=None):
+    """Split every page of each session into units of ``pages_per_unit`` pages"""
+    scraper = MABillScraper(use_cache=False, quiet=True, data_dir=f"{work.root}/planner",
+                            catalog_path=f"{work.root}/planner/catalog.sqlite",
+                            dedup_dir=f"{work.root}/planner/dedup", citations_dir=f"{work.root}/planner/citations")
+    if base_url:
+        scraper.base_url = base_url
+    if sessions == ['all']:
+        sessions = list(scraper.discover_sessions().values())
+    units = []
+    for session in sessions:
+        label = scraper.select_session(session)
+        pages = max_pages or scraper.page_count()
+        if not pages:
+            print(f"⚠️  No search pages found for {label}; pass --max-pages to plan it anyway")
+            continue
+        starts = range(1, pages + 1, pages_per_unit)
+        for start in starts:
+            end = min(start + pages_per_unit - 1, pages)
+            units.append({'id': unit_id(scraper.session_id, start, end), 'session': scraper.session_id,
+                          'label': label, 'start_page': start, 'end_page': end})
+        print(f"🗺️  {label}: {pages} pages in {len(starts)} units")
+    added = work.add_units(units)
+    print(f"🗺️  Planned {added} new units ({len(work.units())} in {work.plan_path})")
+    return units
+
+
+def run_unit(work, unit, options):
+    """Scrape one unit into its own data directory, resuming its checkpoint if it was interrupted"""
+    unit_dir = work.unit_dir(unit)
+    scraper = MABillScraper(requests_per_sec=options['rate'], max_workers=options['workers'],
+                            cache_dir=f"{work.root}/http_cache", offline=options['offline'],
+                            quiet=options['quiet'], max_retries=options['retries'], session_label=unit['label'],
+                            data_dir=f"{unit_dir}/ma", catalog_path=f"{unit_dir}/catalog.sqlite",
+                            dedup_dir=f"{unit_dir}/dedup", citations_dir=f"{unit_dir}/citations")
+    if options.get('base_url'):
+        scraper.base_url = options['base_url']
+
+    checkpoint_path = f"{scraper.data_dir}/checkpoint.json"
+    checkpoint = ScrapeCheckpoint.load(checkpoint_path)
+    if checkpoint is not None and not checkpoint.is_complete:
+        print(f"⏯️  Resuming unit {unit['id']}: {checkpoint.summary()}")
+        resume_bills = checkpoint.bills_to_resume()
+        pages = checkpoint.pages_to_resume()
+    else:
+        checkpoint = ScrapeCheckpoint(checkpoint_path, unit['start_page'], unit['end_page'], session=unit['label'])
+        checkpoint.save()
+        resume_bills = []
+        pages = range(unit['start_page'], unit['end_page'] + 1)
+
+    start_time = time.monotonic()
+    pipeline = ScrapePipeline(scraper, text_workers=options['workers'], checkpoint=checkpoint)
+    saved = pipeline.run(skip_existing=True, pages=pages, resume_bills=resume_bills)
+    return {'unit': unit['id'], 'saved': saved, 'records': len(scraper.store),
+            'complete': checkpoint.is_complete, 'checkpoint': checkpoint.summary(),
+            'seconds': round(time.monotonic() - start_time, 1), 'finished_at': time.time()}
+
+
+def _keep_claim(work, unit, stop, interval=30):
+    """Heartbeat thread: touch the unit's claim until the unit is done"""
+    while not stop.wait(interval):
+        work.heartbeat(unit)
+
+
+def run_worker(root, worker_id, options):
+    """Claim and run units until none is left; returns the number of units finished"""
+    work = ShardWorkDir(root, stale_after=options['stale_after'])
+    failed = set()
+    finished = 0
+    while True:
+        unit = work.claim(worker_id, skip=failed)
+        if unit is None:
+            break
+        print(f"🧩 {worker_id}: unit {unit['id']} ({unit['label']}, pages {unit['start_page']}-{unit['end_page']})")
+        stop = threading.Event()
+        beat = threading.Thread(target=_keep_claim, args=(work, unit, stop), daemon=True)
+        beat.start()
+        try:
+            result = run_unit(work, unit, options)
+        except Exception as e:
+            # Leave it for another worker (or a later run), but don't spin on it here
+            print(f"❌ {worker_id}: unit {unit['id']} failed: {e}")
+            failed.add(unit['id'])
+            work.release(unit)
+            continue
+        finally:
+            stop.set()
+            beat.join()
+        result['worker'] = worker_id
+        work.finish(unit, result)
+        finished += 1
+        print(f"✅ {worker_id}: unit {unit['id']} saved {result['saved']} bills in {result['seconds']:.0f}s"
+              + ("" if result['complete'] else f" (unfinished: {result['checkpoint']})"))
+    return finished
+
+
+def run_local(root, processes, options):
+    """Run ``processes`` workers on this machine; they share the rate budget"""
+    options = dict(options, rate=options['rate'] / processes)
+    host = socket.gethostname()
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=run_worker, args=(root, f"{host}-{i}", options), name=f"shard-worker-{i}")
+               for i in range(processes)]
+    print(f"🧩 {processes} local workers at {options['rate']:.2f} requests/s each")
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def merge(root=SHARDS_DIR, data_dir=MA_DATA_DIR):
+    """Fold every finished unit into the main corpus, keeping one (the best) copy of each bill
+
+    Bills are matched by record key, so units that overlap (listings shift
+    while a session is scraped) and units merged twice add nothing. A unit's
+    copy only replaces an existing bill when it ranks higher by record_rank.
+    Returns the record keys written.
+    """
+    work = ShardWorkDir(root)
+    if data_dir == MA_DATA_DIR:
+        target = MABillScraper(use_cache=False, quiet=True)
+    else:
+        # Keep a separate corpus's catalog, dedup and citation indexes next to it, as run_unit does
+        target = MABillScraper(use_cache=False, quiet=True, data_dir=data_dir,
+                               catalog_path=f"{data_dir}/catalog.sqlite", dedup_dir=f"{data_dir}/dedup",
+                               citations_dir=f"{data_dir}/citations")
+    merged_keys = set()
+    stats = {'units': 0, 'records': 0, 'merged': 0, 'replaced': 0, 'duplicates': 0}
+    start_time = time.monotonic()
+    done, running, pending = work.status()
+    for unit in done:
+        corpus_dir = f"{work.unit_dir(unit)}/ma/corpus"
+        if not os.path.exists(f"{corpus_dir}/{CorpusStore.INDEX_FILENAME}"):
+            continue
+        stats['units'] += 1
+        store = CorpusStore(corpus_dir)
+        texts = TextStore(f"{work.unit_dir(unit)}/ma/texts")
+        try:
+            for key, record in store.iter_records(with_keys=True):
+                stats['records'] += 1
+                existing = target.store.get(key)
+                if existing is not None and record_rank(record) <= record_rank(existing):
+                    stats['duplicates'] += 1
+                    continue
+                bill = dict(record)
+                digest = bill.pop('text_hash', None)
+                bill.pop('text_bytes', None)
+                if digest:
+                    bill['full_text'] = texts.get(digest)
+                merged_keys.add(target.save_bill_data(bill))
+                target.metadata.upsert(metadata_row(bill))
+                stats['replaced' if existing is not None else 'merged'] += 1
+        finally:
+            store.close()
+    target.bill_index.save()
+    target.metadata.flush()
+    target.catalog.flush()
+    merged_keys.discard(None)
+
+    elapsed = max(time.monotonic() - start_time, 1e-9)
+    print(f"🔀 Merged {stats['units']} units: {stats['merged']} new and {stats['replaced']} improved bills, "
+          f"{stats['duplicates']} duplicates skipped, of {stats['records']} records in {elapsed:.1f}s")
+    if running or pending:
+        print(f"⚠️  {len(running)} units still running and {len(pending)} not started; merge again once they finish")
+    if merged_keys:
+        metadata_file = f"{target.processed_dir}/bills_metadata.csv"
+        total = target.metadata.export_csv(metadata_file)
+        print(f"💾 {total} bills in {metadata_file}")
+        target.print_summary(merged_keys)
+    return merged_keys
+
+
+def print_status(work):
+    done, running, pending = work.status()
+    print(f"🧩 {len(done)} done, {len(running)} running, {len(pending)} pending units in {work.root}")
+    for unit in done:
+        result = work.result(unit) or {}
+        if not result.get('complete', True):
+            print(f"   ⚠️  {unit['id']}: unfinished ({result.get('checkpoint')}); reset it to retry")
+    for unit in running:
+        try:
+            with open(work.claim_path(unit), 'r', encoding='utf-8') as f:
+                claim = json.load(f)
+            age = time.time() - os.path.getmtime(work.claim_path(unit))
+        except (FileNotFoundError, ValueError):
+            continue    # finished (or being taken over) since status() looked
+        print(f"   ⏳ {unit['id']}: {claim['worker']} (last heartbeat {age:.0f}s ago)")
+    saved = sum((work.result(unit) or {}).get('saved', 0) for unit in done)
+    print(f"   {saved} bills saved by finished units")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a multi-session scrape into work units run by many workers")
+    parser.add_argument('command', choices=['plan', 'run', 'worker', 'status', 'merge', 'reset'])
+    parser.add_argument('units', nargs='*', help="Unit IDs to reset")
+    parser.add_argument('--work-dir', default=SHARDS_DIR, help="Work directory, shared by every machine")
+    parser.add_argument('--sessions', default=None,
+                        help="Comma-separated sessions to plan, e.g. 194th,193rd, or 'all'")
+    parser.add_argument('--pages-per-unit', type=int, default=10)
+    parser.add_argument('--max-pages', type=int, default=None, help="Pages per session (default: discovered)")
+    parser.add_argument('--processes', type=int, default=4, help="Local worker processes for the run command")
+    parser.add_argument('--workers', type=int, default=4, help="Text fetch threads per worker process")
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help="Requests per second per host for this machine, split across its processes")
+    parser.add_argument('--retries', type=int, default=4)
+    parser.add_argument('--offline', action='store_true', help="Serve every page from the shared HTTP cache")
+    parser.add_argument('--stale-after', type=float, default=600,
+                        help="Seconds without a heartbeat before a claimed unit is taken over")
+    parser.add_argument('--no-merge', action='store_true', help="Let the run command skip the final merge")
+    parser.add_argument('--data-dir', default=MA_DATA_DIR, help="Corpus the merge command writes into")
+    parser.add_argument('--base-url', default=None, help="Site to scrape instead of malegislature.gov")
+    parser.add_argument('--verbose', action='store_true', help="Per-bill progress lines from the workers")
+    args = parser.parse_intermixed_args()
+
+    work = ShardWorkDir(args.work_dir, stale_after=args.stale_after)
+    options = {'rate': args.rate, 'workers': args.workers, 'retries': args.retries, 'offline': args.offline,
+               'quiet': not args.verbose, 'stale_after': args.stale_after, 'base_url': args.base_url}
+
+    if args.command == 'plan' or (args.command == 'run' and args.sessions):
+        if not args.sessions:
+            parser.error("plan needs --sessions")
+        plan_sessions(work, args.sessions.split(','), args.pages_per_unit, args.max_pages, args.base_url)
+    if args.command == 'run':
+        if not work.units():
+            parser.error("nothing planned yet: pass --sessions")
+        run_local(args.work_dir, args.processes, options)
+        print_status(work)
+        if not args.no_merge:
+            merge(args.work_dir, args.data_dir)
+    elif args.command == 'worker':
+        worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        print(f"🧩 {worker_id}: {run_worker(args.work_dir, worker_id, options)} units finished")
+    elif args.command == 'status':
+        print_status(work)
+    elif args.command == 'merge':
+        merge(args.work_dir, args.data_dir)
+    elif args.command == 'reset':
+        planned = {unit['id']: unit for unit in work.units()}
+        for name in args.units:
+            if name not in planned:
+                parser.error(f"unknown unit {name}")
+            work.reset(planned[name])
+            print(f"🔄 Reset {name}")
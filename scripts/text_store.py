@@ -0,0 +1,250 @@
+# scripts/text_store.py
+import argparse
+import hashlib
+import os
+import threading
+import zlib
+from collections import Counter
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b'LTX1'
+CODEC_ZLIB = b'z'
+CODEC_ZSTD = b's'
+
+# zlib can only look back 32 KB, so a larger preset dictionary is wasted
+ZLIB_DICT_SIZE = 32 * 1024
+ZSTD_DICT_SIZE = 112 * 1024
+
+
+def text_hash(text):
+    """Content address of a text: sha256 of its UTF-8 bytes"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def build_zlib_dictionary(samples, size=ZLIB_DICT_SIZE):
+    """Build a zlib preset dictionary from the lines that recur most across samples"""
+    counts = Counter()
+    for sample in samples:
+        counts.update(set(line.strip() for line in sample.splitlines() if len(line.strip()) > 10))
+
+    # zlib prefers matches near the end of the dictionary, so most common goes last
+    chosen = []
+    used = 0
+    for line, count in counts.most_common():
+        if count < 2:
+            break
+        encoded = (line + '\n').encode('utf-8')
+        if used + len(encoded) > size:
+            break
+        chosen.append(encoded)
+        used += len(encoded)
+    return b''.join(reversed(chosen))
+
+
+class TextStore:
+    """Content-addressed store of compressed bill texts
+
+    Each distinct text is stored once at ``objects/<aa>/<sha256>`` no matter
+    how many bills share it (refiled and identical bills). Bodies are
+    compressed with zstd when available, otherwise zlib, both using a shared
+    dictionary trained on the corpus once enough samples have been seen.
+    """
+
+    def __init__(self, root, train_after=200, use_zstd=True):
+        self.root = root
+        self.objects_dir = f"{root}/objects"
+        self.dictionary_path = f"{root}/dictionary.bin"
+        self.train_after = train_after
+        self.codec = CODEC_ZSTD if (use_zstd and zstandard is not None) else CODEC_ZLIB
+        self.lock = threading.Lock()
+        self.samples = []
+        self.stats = {'puts': 0, 'deduplicated': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.dictionary = b''
+        if os.path.exists(self.dictionary_path):
+            with open(self.dictionary_path, 'rb') as f:
+                self.dictionary = f.read()
+        self.dictionary_id = self._dictionary_id(self.dictionary)
+        self._dictionaries = {self.dictionary_id: self.dictionary}
+
+    @staticmethod
+    def _dictionary_id(dictionary):
+        return hashlib.sha1(dictionary).digest()[:4] if dictionary else b'\0\0\0\0'
+
+    def object_path(self, digest):
+        return f"{self.objects_dir}/{digest[:2]}/{digest}"
+
+    def __contains__(self, digest):
+        return os.path.exists(self.object_path(digest))
+
+    def _compress(self, data):
+        if self.codec == CODEC_ZSTD:
+            dict_data = zstandard.ZstdCompressionDict(self.dictionary) if self.dictionary else None
+            return zstandard.ZstdCompressor(level=10, dict_data=dict_data).compress(data)
+        if self.dictionary:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, self.dictionary)
+        else:
+            compressor = zlib.compressobj(9)
+        return compressor.compress(data) + compressor.flush()
+
+    def _decompress(self, codec, dictionary, payload):
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("This text was stored with zstd: pip install zstandard")
+            dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(payload)
+        decompressor = zlib.decompressobj(15, dictionary) if dictionary else zlib.decompressobj()
+        return decompressor.decompress(payload) + decompressor.flush()
+
+    def _load_dictionary(self, dictionary_id):
+        """Find an older dictionary by id (kept as dictionary-<id>.bin when retrained)"""
+        if dictionary_id not in self._dictionaries:
+            path = f"{self.root}/dictionary-{dictionary_id.hex()}.bin"
+            with open(path, 'rb') as f:
+                self._dictionaries[dictionary_id] = f.read()
+        return self._dictionaries[dictionary_id]
+
+    def train(self, samples):
+        """Train and install a shared dictionary from sample texts"""
+        if self.codec == CODEC_ZSTD:
+            encoded = [sample.encode('utf-8') for sample in samples]
+            dictionary = zstandard.train_dictionary(ZSTD_DICT_SIZE, encoded).as_bytes()
+        else:
+            dictionary = build_zlib_dictionary(samples)
+        if not dictionary:
+            return False
+
+        # Keep the previous dictionary readable for objects already written with it
+        if self.dictionary:
+            with open(f"{self.root}/dictionary-{self.dictionary_id.hex()}.bin", 'wb') as f:
+                f.write(self.dictionary)
+        tmp_path = f"{self.dictionary_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(dictionary)
+        os.replace(tmp_path, self.dictionary_path)
+
+        self.dictionary = dictionary
+        self.dictionary_id = self._dictionary_id(dictionary)
+        self._dictionaries[self.dictionary_id] = dictionary
+        return True
+
+    def put(self, text):
+        """Store a text (once per distinct content) and return its hash"""
+        digest = text_hash(text)
+        data = text.encode('utf-8')
+        path = self.object_path(digest)
+        with self.lock:
+            self.stats['puts'] += 1
+            self.stats['raw_bytes'] += len(data)
+            if os.path.exists(path):
+                self.stats['deduplicated'] += 1
+                return digest
+
+            if not self.dictionary and self.train_after:
+                self.samples.append(text[:8192])
+                if len(self.samples) >= self.train_after:
+                    self.train(self.samples)
+                    self.samples = []
+
+            blob = MAGIC + self.codec + self.dictionary_id + self._compress(data)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+            self.stats['stored_bytes'] += len(blob)
+        return digest
+
+    def get(self, digest):
+        """Return the plain text for a hash"""
+        with open(self.object_path(digest), 'rb') as f:
+            blob = f.read()
+        if blob[:4] != MAGIC:
+            raise ValueError(f"Not a text object: {digest}")
+        codec, dictionary_id, payload = blob[4:5], blob[5:9], blob[9:]
+        dictionary = self._load_dictionary(dictionary_id) if dictionary_id != b'\0\0\0\0' else b''
+        return self._decompress(codec, dictionary, payload).decode('utf-8')
+
+    def disk_usage(self):
+        """(object count, total bytes) of stored text objects"""
+        count = 0
+        total = 0
+        for folder in os.listdir(self.objects_dir):
+            for filename in os.listdir(f"{self.objects_dir}/{folder}"):
+                if not filename.endswith('.tmp'):
+                    count += 1
+                    total += os.path.getsize(f"{self.objects_dir}/{folder}/{filename}")
+        return count, total
+
+
+def disk_report(corpus_store, text_store, text_files_dir=None):
+    """Print plain-text vs content-addressed disk use per bill"""
+    bills = 0
+    referenced = set()
+    plain_bytes = 0
+    for record in corpus_store.iter_records():
+        digest = record.get('text_hash')
+        if not digest:
+            continue
+        bills += 1
+        referenced.add(digest)
+        plain_bytes += record.get('text_bytes', record.get('text_length', 0))
+
+    text_file_bytes = 0
+    if text_files_dir and os.path.exists(text_files_dir):
+        text_file_bytes = sum(os.path.getsize(f"{text_files_dir}/{name}") for name in os.listdir(text_files_dir))
+
+    objects, stored_bytes = text_store.disk_usage()
+    if not bills:
+        print("No bill texts in the text store yet")
+        return
+    # Before: the text lived in raw JSON and (for long bills) again in text_files/*.txt
+    before = plain_bytes + text_file_bytes
+    print(f"📦 {bills} bills -> {len(referenced)} distinct texts, {objects} objects on disk")
+    print(f"   Before: {before / bills:,.0f} bytes/bill (plain text in records + text_files)")
+    print(f"   After:  {stored_bytes / bills:,.0f} bytes/bill (compressed, deduplicated)")
+    print(f"   Ratio:  {before / max(stored_bytes, 1):.1f}x smaller")
+
+
+def migrate_corpus_texts(corpus_store, text_store):
+    """Move full_text out of existing corpus records into the text store"""
+    moved = 0
+    for key, record in list(corpus_store.iter_records(with_keys=True)):
+        text = record.get('full_text')
+        if not text or record.get('text_source') not in ('view_text', 'print_preview', 'direct_page'):
+            continue
+        record['text_hash'] = text_store.put(text)
+        record['text_bytes'] = len(text.encode('utf-8'))
+        del record['full_text']
+        corpus_store.put(key, record)
+        moved += 1
+    print(f"📦 Moved {moved} full texts into {text_store.root}")
+    return moved
+
+
+if __name__ == "__main__":
+    from corpus_store import CorpusStore
+
+    parser = argparse.ArgumentParser(description="Manage the content-addressed bill text store")
+    parser.add_argument('command', choices=['report', 'migrate', 'train'])
+    parser.add_argument('--store', default="data/states/massachusetts/texts")
+    parser.add_argument('--corpus', default="data/states/massachusetts/corpus")
+    parser.add_argument('--text-files', default="data/states/massachusetts/processed/text_files")
+    args = parser.parse_args()
+
+    corpus = CorpusStore(args.corpus)
+    texts = TextStore(args.store)
+    if args.command == 'migrate':
+        migrate_corpus_texts(corpus, texts)
+        corpus.compact()
+    elif args.command == 'train':
+        samples = [texts.get(r['text_hash'])[:8192] for r in corpus.iter_records() if r.get('text_hash')]
+        if texts.train(samples[:2000]):
+            print(f"📚 Trained a {len(texts.dictionary)}-byte dictionary from {min(len(samples), 2000)} texts")
+    disk_report(corpus, texts, args.text_files)
+    corpus.close()
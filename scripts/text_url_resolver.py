@@ -0,0 +1,132 @@
+# scripts/text_url_resolver.py
+import json
+import os
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+
+class TextUrlResolver:
+    """Predict a bill's text URL from its detail URL using learned templates
+
+    Templates are learned from (detail_url, text_url) pairs that were found
+    through the detail page. A template rewrites the detail URL path, e.g.
+    ``{path}.Html`` or ``/Bills/{1}/Text/{2}``, where ``{i}`` is the i-th path
+    segment of the detail URL. Only a template that explains most observed
+    pairs is used for predictions.
+    """
+
+    def __init__(self, path=None, min_support=3, min_share=0.8):
+        self.path = path
+        self.min_support = min_support
+        self.min_share = min_share
+        self.templates = {}     # template -> number of pairs it explains
+        self.observed = 0
+        self.stats = {'predictions': 0, 'hits': 0, 'misses': 0}
+        self.lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self.templates = saved.get('templates', {})
+            self.observed = saved.get('observed', 0)
+
+    @staticmethod
+    def derive_template(detail_url, text_url):
+        """Express text_url in terms of detail_url, or None if they are unrelated"""
+        detail = urlsplit(detail_url)
+        text = urlsplit(text_url)
+        if detail.netloc != text.netloc:
+            return None
+
+        target = text.path + (f"?{text.query}" if text.query else "")
+        if text.path.startswith(detail.path):
+            return "{path}" + target[len(detail.path):]
+
+        # Replace detail path segments (longest first) with their positions
+        segments = [segment for segment in detail.path.split('/') if segment]
+        order = sorted(range(len(segments)), key=lambda i: len(segments[i]), reverse=True)
+        template = target.replace('{', '{{').replace('}', '}}')
+        for i in order:
+            # Private-use markers can't collide with later segment values
+            template = template.replace(segments[i], chr(0xE000 + i))
+        if not any(chr(0xE000 + i) in template for i in order):
+            return None
+        for i in order:
+            template = template.replace(chr(0xE000 + i), f"{{{i}}}")
+        return template
+
+    def learn(self, detail_url, text_url):
+        """Record one observed (detail_url, text_url) pair"""
+        template = self.derive_template(detail_url, text_url)
+        if template is None:
+            return
+        with self.lock:
+            self.templates[template] = self.templates.get(template, 0) + 1
+            self.observed += 1
+
+    def learn_from_records(self, records, limit=500):
+        """Bootstrap from saved bill records that found text via View Text"""
+        learned = 0
+        for record in records:
+            if record.get('text_source') == 'view_text' and record.get('text_url') and record.get('detail_url'):
+                self.learn(record['detail_url'], record['text_url'])
+                learned += 1
+                if learned >= limit:
+                    break
+        return learned
+
+    def best_template(self):
+        with self.lock:
+            if not self.templates:
+                return None
+            template, support = max(self.templates.items(), key=lambda item: item[1])
+            if support < self.min_support or support < self.min_share * self.observed:
+                return None
+            return template
+
+    def predict(self, detail_url):
+        """Predicted text URL for a detail URL, or None if no template is trusted"""
+        template = self.best_template()
+        if template is None:
+            return None
+
+        detail = urlsplit(detail_url)
+        segments = [segment for segment in detail.path.split('/') if segment]
+        try:
+            if template.startswith("{path}"):
+                target = detail.path + template[len("{path}"):]
+            else:
+                target = template.format(*segments)
+        except (IndexError, KeyError, ValueError):
+            return None
+
+        path, _, query = target.partition('?')
+        with self.lock:
+            self.stats['predictions'] += 1
+        return urlunsplit((detail.scheme, detail.netloc, path, query, ''))
+
+    def record_result(self, hit):
+        with self.lock:
+            self.stats['hits' if hit else 'misses'] += 1
+
+    def requests_saved(self):
+        """Detail-page requests skipped, minus wasted requests on wrong predictions"""
+        return self.stats['hits'] - self.stats['misses']
+
+    def summary(self):
+        predictions = self.stats['predictions']
+        if not predictions:
+            return None
+        hit_rate = self.stats['hits'] / predictions
+        return (f"{self.stats['hits']}/{predictions} text URL predictions hit ({hit_rate:.0%}), "
+                f"{self.requests_saved()} requests saved")
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = {'templates': self.templates, 'observed': self.observed}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
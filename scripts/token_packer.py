@@ -0,0 +1,359 @@
+# scripts/token_packer.py
+import argparse
+import importlib
+import json
+import os
+import shutil
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from bill_segmenter import iter_batches
+from curriculum_builder import CURRICULUM_DIR
+from jsonl_shards import iter_jsonl_shards
+
+TOKENS_DIR = "data/tokens"
+
+# State groups are stored by postal code so "MA" and "Massachusetts" select the same slice
+STATE_CODES = {'massachusetts': 'MA', 'california': 'CA', 'texas': 'TX', 'new york': 'NY', 'florida': 'FL',
+               'united states': 'US', 'federal': 'US'}
+
+DOCUMENT_DTYPE = np.dtype([('group', np.uint8), ('start', np.int64), ('length', np.int32),
+                           ('stage', np.uint8), ('year', np.uint16)])
+SEQUENCE_DTYPE = np.dtype([('group', np.uint8), ('row', np.int64)])
+
+
+def state_code(state):
+    """Normalized state group for a document ('MA', 'US', ... or 'NONE')"""
+    if not state:
+        return 'NONE'
+    return STATE_CODES.get(str(state).strip().lower(), str(state).strip().upper().replace(' ', '_'))
+
+
+class ByteTokenizer:
+    """UTF-8 bytes as tokens; needs no vocabulary files"""
+
+    name = 'bytes'
+    vocab_size = 257
+    eos_id = 256
+
+    def encode(self, text):
+        return np.frombuffer(text.encode('utf-8'), dtype=np.uint8)
+
+
+class HuggingFaceTokenizer:
+    """A local ``tokenizer.json`` loaded with the tokenizers library"""
+
+    def __init__(self, path):
+        try:
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError("hf: tokenizers need the tokenizers package: pip install tokenizers")
+        self.name = f"hf:{path}"
+        self.tokenizer = Tokenizer.from_file(path)
+        self.vocab_size = self.tokenizer.get_vocab_size()
+        eos = next((self.tokenizer.token_to_id(token) for token in ('</s>', '<|endoftext|>', '[SEP]', '<eos>')
+                    if self.tokenizer.token_to_id(token) is not None), None)
+        self.eos_id = eos if eos is not None else self.vocab_size - 1
+
+    def encode(self, text):
+        return np.asarray(self.tokenizer.encode(text).ids, dtype=np.int64)
+
+
+class TiktokenTokenizer:
+    """A tiktoken encoding that is already in the local tiktoken cache"""
+
+    def __init__(self, encoding):
+        try:
+            import tiktoken
+        except ImportError:
+            raise ImportError("tiktoken: tokenizers need the tiktoken package: pip install tiktoken")
+        self.name = f"tiktoken:{encoding}"
+        self.encoding = tiktoken.get_encoding(encoding)
+        self.vocab_size = self.encoding.n_vocab
+        self.eos_id = self.encoding.eot_token
+
+    def encode(self, text):
+        return np.asarray(self.encoding.encode_ordinary(text), dtype=np.int64)
+
+
+def load_tokenizer(spec):
+    """Tokenizer from a spec: 'bytes', 'hf:<tokenizer.json>', 'tiktoken:<encoding>' or 'module:<mod>:<factory>'
+
+    Any object with ``encode(text)``, ``vocab_size`` and ``eos_id`` works;
+    ``module:`` specs call an importable factory so new tokenizers plug in
+    without touching this file.
+    """
+    kind, _, argument = spec.partition(':')
+    if kind == 'bytes':
+        return ByteTokenizer()
+    if kind == 'hf':
+        return HuggingFaceTokenizer(argument)
+    if kind == 'tiktoken':
+        return TiktokenTokenizer(argument)
+    if kind == 'module':
+        module_name, _, factory = argument.partition(':')
+        tokenizer = getattr(importlib.import_module(module_name), factory)()
+        tokenizer.name = getattr(tokenizer, 'name', spec)
+        return tokenizer
+    raise ValueError(f"Unknown tokenizer spec: {spec}")
+
+
+_worker_tokenizer = None
+
+
+def _init_worker(spec):
+    global _worker_tokenizer
+    _worker_tokenizer = load_tokenizer(spec)
+
+
+def tokenize_batch(batch):
+    """Worker: (id, state group, stage, year, token array) for each document"""
+    return [(doc['id'], state_code(doc.get('state')), int(doc.get('stage') or 0), int(doc.get('year') or 0),
+             _worker_tokenizer.encode(doc['content']))
+            for doc in batch]
+
+
+class GroupWriter:
+    """Packs one state group's token stream into fixed-length rows across shard files"""
+
+    def __init__(self, root, group, code, seq_len, dtype, rows_per_shard, pad_id):
+        self.root = root
+        self.group = group
+        self.code = code
+        self.seq_len = seq_len
+        self.dtype = dtype
+        self.rows_per_shard = rows_per_shard
+        self.pad_id = pad_id
+        self.position = 0           # tokens written to this group's stream
+        self.rows = 0
+        self.pending = []
+        self.pending_length = 0
+        self.shard_rows = []        # rows per shard file
+        self._file = None
+
+    def shard_path(self, shard):
+        return f"{self.root}/tokens-{self.code}-{shard:05d}.bin"
+
+    def _write_row(self, row):
+        if self._file is None or self.shard_rows[-1] == self.rows_per_shard:
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.shard_path(len(self.shard_rows)), 'wb')
+            self.shard_rows.append(0)
+        row.astype(self.dtype).tofile(self._file)
+        self.shard_rows[-1] += 1
+        self.rows += 1
+
+    def append(self, tokens):
+        """Add a document's tokens (plus separator) and return its start in the group stream"""
+        start = self.position
+        self.pending.append(tokens)
+        self.pending_length += len(tokens)
+        self.position += len(tokens)
+        new_rows = []
+        if self.pending_length >= self.seq_len:
+            stream = np.concatenate(self.pending)
+            full = len(stream) // self.seq_len * self.seq_len
+            for offset in range(0, full, self.seq_len):
+                new_rows.append(self.rows)
+                self._write_row(stream[offset:offset + self.seq_len])
+            self.pending = [stream[full:]]
+            self.pending_length = len(stream) - full
+        return start, new_rows
+
+    def close(self):
+        """Pad and write the last partial row; returns the number of pad tokens"""
+        padding = 0
+        new_rows = []
+        if self.pending_length:
+            stream = np.concatenate(self.pending)
+            padding = self.seq_len - len(stream)
+            new_rows.append(self.rows)
+            self._write_row(np.concatenate([stream, np.full(padding, self.pad_id, dtype=stream.dtype)]))
+        if self._file is not None:
+            self._file.close()
+        return padding, new_rows
+
+
+def pack_corpus(input_path=CURRICULUM_DIR, output_dir=TOKENS_DIR, tokenizer='bytes', seq_len=2048,
+                rows_per_shard=65536, processes=None, batch_size=64):
+    """Tokenize normalized documents in parallel and write packed memmap shards
+
+    Documents are packed per state group (MA, US, ...), separated by the
+    tokenizer's EOS token, into rows of ``seq_len`` tokens. Rows of one
+    group live contiguously in ``tokens-<group>-NNNNN.bin`` so a state slice
+    is a plain subset of rows; ``sequences.npy`` lists rows in the order they
+    filled, which follows the input (curriculum) order.
+    """
+    spec = tokenizer
+    tokenizer = load_tokenizer(spec)
+    dtype = np.uint16 if tokenizer.vocab_size <= 2 ** 16 else np.uint32
+    tmp_dir = f"{output_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    groups = {}                 # code -> GroupWriter
+    documents = []
+    doc_ids = []
+    sequences = []
+    separator = np.array([tokenizer.eos_id], dtype=np.int64)
+    start_time = time.monotonic()
+    total_tokens = 0
+
+    with Pool(processes, initializer=_init_worker, initargs=(spec,)) as pool:
+        batches = iter_batches(iter_jsonl_shards(input_path if os.path.isfile(input_path)
+                                                 else f"{input_path}/train-*.jsonl"), batch_size)
+        for batch in pool.imap(tokenize_batch, batches):
+            for doc_id, code, stage, year, tokens in batch:
+                writer = groups.get(code)
+                if writer is None:
+                    writer = groups[code] = GroupWriter(tmp_dir, len(groups), code, seq_len, dtype,
+                                                        rows_per_shard, tokenizer.eos_id)
+                start, new_rows = writer.append(np.concatenate([tokens.astype(np.int64), separator]))
+                sequences.extend((writer.group, row) for row in new_rows)
+                documents.append((writer.group, start, len(tokens), stage, min(year, 65535)))
+                doc_ids.append(doc_id)
+                total_tokens += len(tokens)
+
+    padding = 0
+    for writer in groups.values():
+        pad, new_rows = writer.close()
+        padding += pad
+        sequences.extend((writer.group, row) for row in new_rows)
+
+    np.save(f"{tmp_dir}/documents.npy", np.array(documents, dtype=DOCUMENT_DTYPE))
+    np.save(f"{tmp_dir}/sequences.npy", np.array(sequences, dtype=SEQUENCE_DTYPE))
+    with open(f"{tmp_dir}/documents.txt", 'w', encoding='utf-8') as f:
+        f.write(''.join(f"{doc_id}\n" for doc_id in doc_ids))
+    meta = {
+        'tokenizer': tokenizer.name, 'vocab_size': tokenizer.vocab_size, 'eos_id': int(tokenizer.eos_id),
+        'dtype': np.dtype(dtype).name, 'seq_len': seq_len, 'rows_per_shard': rows_per_shard,
+        'documents': len(documents), 'tokens': total_tokens, 'sequences': len(sequences), 'padding': padding,
+        'groups': [{'code': writer.code, 'rows': writer.rows, 'shards': writer.shard_rows}
+                   for writer in groups.values()],
+    }
+    with open(f"{tmp_dir}/meta.json", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    elapsed = max(time.monotonic() - start_time, 1e-9)
+    print(f"🧱 Packed {len(documents)} documents, {total_tokens:,} tokens ({total_tokens / elapsed:,.0f} tokens/s) "
+          f"into {len(sequences)} x {seq_len} {meta['dtype']} rows -> {output_dir}")
+    for group in meta['groups']:
+        print(f"   {group['code']:<6} {group['rows']:8d} rows in {len(group['shards'])} shard(s)")
+    return meta
+
+
+class PackedTokens:
+    """Zero-copy reader for packed token shards
+
+    ``tokens[i]`` is the i-th packed row (a read-only memmap view) in fill
+    order. ``select(state='MA')`` narrows to rows of one state group and
+    ``select(stages=..., years=...)`` to rows overlapping matching
+    documents, without copying or rewriting any shard.
+    """
+
+    def __init__(self, root=TOKENS_DIR, rows=None):
+        self.root = root
+        with open(f"{root}/meta.json", 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.seq_len = self.meta['seq_len']
+        self.rows_per_shard = self.meta['rows_per_shard']
+        self.dtype = np.dtype(self.meta['dtype'])
+        self.group_codes = [group['code'] for group in self.meta['groups']]
+        self.sequences = np.load(f"{root}/sequences.npy", mmap_mode='r')
+        self.documents = np.load(f"{root}/documents.npy", mmap_mode='r')
+        self.rows = np.arange(len(self.sequences)) if rows is None else rows
+        self._shards = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _shard(self, group, shard):
+        key = (group, shard)
+        if key not in self._shards:
+            path = f"{self.root}/tokens-{self.group_codes[group]}-{shard:05d}.bin"
+            self._shards[key] = np.memmap(path, dtype=self.dtype, mode='r').reshape(-1, self.seq_len)
+        return self._shards[key]
+
+    def __getitem__(self, i):
+        group, row = self.sequences[self.rows[i]]
+        return self._shard(int(group), int(row) // self.rows_per_shard)[int(row) % self.rows_per_shard]
+
+    def document_tokens(self, n):
+        """Tokens of document n (a view unless it straddles a shard boundary)"""
+        group, start, length = (int(value) for value in self.documents[n][['group', 'start', 'length']])
+        shard_tokens = self.rows_per_shard * self.seq_len
+        pieces = []
+        while length:
+            shard, offset = divmod(start, shard_tokens)
+            piece = self._shard(group, shard).reshape(-1)[offset:offset + length]
+            pieces.append(piece)
+            start += len(piece)
+            length -= len(piece)
+        return pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+
+    def select(self, state=None, stages=None, years=None):
+        """A view over rows of one state group and/or rows holding documents of given stages/years"""
+        mask = np.ones(len(self.sequences), dtype=bool)
+        if state is not None:
+            code = state_code(state)
+            if code not in self.group_codes:
+                return PackedTokens(self.root, rows=np.zeros(0, dtype=np.int64))
+            mask &= self.sequences['group'] == self.group_codes.index(code)
+        if stages is not None or years is not None:
+            docs = self.documents
+            matching = np.ones(len(docs), dtype=bool)
+            if stages is not None:
+                matching &= np.isin(docs['stage'], list(stages))
+            if years is not None:
+                low, high = years if isinstance(years, (tuple, list)) else (years, years)
+                matching &= (docs['year'] >= low) & (docs['year'] <= high)
+            covered = np.zeros(len(self.sequences), dtype=bool)
+            selected = docs[matching]
+            for group in range(len(self.group_codes)):
+                group_rows = np.flatnonzero(self.sequences['group'] == group)
+                in_group = selected[selected['group'] == group]
+                # Mark the row span of every matching document with a difference array
+                spans = np.zeros(len(group_rows) + 1, dtype=np.int64)
+                np.add.at(spans, in_group['start'] // self.seq_len, 1)
+                np.add.at(spans, (in_group['start'] + in_group['length']) // self.seq_len + 1, -1)
+                covered[group_rows] = np.cumsum(spans[:-1]) > 0
+            mask &= covered
+        return PackedTokens(self.root, rows=np.intersect1d(self.rows, np.flatnonzero(mask)))
+
+    def token_counts(self):
+        """Document count and tokens per state group"""
+        counts = {}
+        for group, code in enumerate(self.group_codes):
+            docs = self.documents[self.documents['group'] == group]
+            counts[code] = (len(docs), int(docs['length'].sum()))
+        return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack tokenized documents into fixed-length memmap shards")
+    parser.add_argument('command', choices=['pack', 'info'])
+    parser.add_argument('--input', default=CURRICULUM_DIR, help="Curriculum shard directory or a JSONL file")
+    parser.add_argument('--output', default=TOKENS_DIR)
+    parser.add_argument('--tokenizer', default='bytes', help="bytes, hf:<tokenizer.json>, tiktoken:<encoding> "
+                                                             "or module:<module>:<factory>")
+    parser.add_argument('--seq-len', type=int, default=2048)
+    parser.add_argument('--rows-per-shard', type=int, default=65536)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--state', default=None, help="info: count rows for one state group, e.g. MA")
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        pack_corpus(args.input, args.output, args.tokenizer, args.seq_len, args.rows_per_shard, args.processes)
+    else:
+        tokens = PackedTokens(args.output)
+        print(f"🧱 {len(tokens)} rows x {tokens.seq_len} ({tokens.meta['tokenizer']}, {tokens.dtype.name}), "
+              f"{tokens.meta['documents']} documents, {tokens.meta['tokens']:,} tokens")
+        for code, (docs, count) in tokens.token_counts().items():
+            print(f"   {code:<6} {docs:8d} documents {count:14,d} tokens")
+        if args.state:
+            print(f"   {args.state}: {len(tokens.select(state=args.state))} rows")